@@ -0,0 +1,4 @@
+# Celery app dimuat bersama Django agar @shared_task memakai konfigurasi ini
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
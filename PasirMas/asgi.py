@@ -3,6 +3,19 @@ ASGI config for PasirMas project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Entry point produksi untuk halaman pelanggan async (katalog, keranjang,
+riwayat, detail sewa, akun), dijalankan dengan daphne:
+
+    daphne -b 0.0.0.0 -p 8000 PasirMas.asgi:application
+
+Di jalur ini view async berjalan di event loop dan hanya query ORM-nya yang
+pindah ke thread, sehingga request yang sedang menunggu database tidak
+menahan worker thread. View sync tetap dilayani (dijalankan di thread).
+Jalur WSGI (PasirMas/wsgi.py) tetap bisa dipakai; view async di sana
+dijalankan lewat async_to_sync. Perbandingan keduanya:
+
+    python manage.py bench_asgi --konkurensi 100
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
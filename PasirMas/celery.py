@@ -0,0 +1,21 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PasirMas.settings')
+
+app = Celery('PasirMas')
+# Semua pengaturan CELERY_* dibaca dari settings.py
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+
+@app.on_after_configure.connect
+def siapkan_folder_broker(sender, **kwargs):
+    """Broker filesystem membutuhkan folder antreannya sudah ada."""
+    if not str(sender.conf.broker_url).startswith('filesystem://'):
+        return
+    for key in ('data_folder_in', 'data_folder_out', 'processed_folder', 'control_folder'):
+        folder = sender.conf.broker_transport_options.get(key)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
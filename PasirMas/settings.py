@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -56,10 +57,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.SQLProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PelangganMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +89,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'PasirMas.wsgi.application'
+ASGI_APPLICATION = 'PasirMas.asgi.application'
 
 
 # Database
@@ -95,8 +99,86 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {
+            # Database uji berupa file (bukan :memory:) agar WAL dan lock-nya
+            # sama seperti produksi; dipakai oleh uji checkout bersamaan.
+            # Disimpan di direktori sementara, bukan di repo.
+            'NAME': os.path.join(tempfile.gettempdir(), 'pasirmas_test.sqlite3'),
+        },
+    }
+}
+
+# Profil SQLite, dijalankan sebagai PRAGMA pada setiap koneksi baru
+# (core/signals.py). Nilai-nilai ini hanya berlaku untuk koneksi itu.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,        # ms menunggu lock sebelum "database is locked"
+    'mmap_size': 268435456,      # 256 MB dibaca lewat memory-mapped I/O
+    'cache_size': -65536,        # negatif = KiB, jadi 64 MB page cache per koneksi
+}
+
+# Profil produksi: WAL membuat pembaca tidak memblokir penulis;
+# synchronous=NORMAL aman untuk WAL dan jauh lebih cepat dari FULL. Mode WAL
+# tersimpan permanen di file database, jadi hanya diaktifkan jika diminta
+# (SQLITE_WAL=1 di server) agar db.sqlite3 di repo tidak ikut berubah.
+if os.environ.get('SQLITE_WAL') == '1':
+    SQLITE_PRAGMAS.update({'journal_mode': 'WAL', 'synchronous': 'NORMAL'})
+
+# Cache bersama untuk semua proses web dan worker Celery. Versi cache halaman
+# (core/page_cache.py) dan laporan (core/report_cache.py) dinaikkan oleh proses
+# yang menulis, jadi proses lain harus melihat backend yang sama: Redis jika
+# REDIS_URL diisi, selain itu file di var/cache (cukup untuk satu server).
+# Dengan LocMemCache kedua cache itu dilewati.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(BASE_DIR, 'var', 'cache'),
+        }
     }
+
+# Jalur tulis berurutan untuk checkout dan simpan di admin (core/write_lane.py)
+WRITE_LANE_RETRIES = 5
+WRITE_LANE_BACKOFF = 0.05
+WRITE_LANE_TIMEOUT = 10
+
+# Laporan admin atas tabel yang lebih besar dari ini menampilkan jumlah baris
+# perkiraan dulu; jumlah pastinya diambil terpisah (core/report_cache.py)
+REPORT_COUNT_ESTIMATE_THRESHOLD = 100_000
+
+# PDF dan ekspor laporan dibuat sebagai pekerjaan latar belakang
+# (core/report_jobs.py). Berkas hasil disimpan di REPORT_JOBS_DIR dan dihapus
+# setelah REPORT_JOB_RETENTION detik; permintaan dengan filter yang sama
+# memakai ulang pekerjaan yang masih berjalan, atau yang sudah selesai dalam
+# REPORT_JOB_REUSE detik terakhir selama datanya belum berubah. Pekerjaan yang
+# tidak selesai dalam REPORT_JOB_TIMEOUT detik dianggap gagal.
+REPORT_JOBS_DIR = os.path.join(BASE_DIR, 'var', 'laporan')
+REPORT_JOB_RETENTION = 60 * 60 * 24
+REPORT_JOB_REUSE = 60 * 10
+REPORT_JOB_TIMEOUT = 60 * 30
+
+# Celery (PasirMas/celery.py). Broker filesystem tidak membutuhkan server
+# tambahan; worker dijalankan dengan `celery -A PasirMas worker -l info`.
+# CELERY_TASK_ALWAYS_EAGER=1 menjalankan pekerjaan langsung di proses web
+# (tanpa worker), misalnya saat pengembangan. Worker terpisah hanya memakai
+# cache laporan (core/report_cache.py) bila CACHES di atas dipakai bersama;
+# dengan LocMemCache pekerjaan di worker membaca langsung dari database.
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'filesystem://')
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'data_folder_in': os.path.join(BASE_DIR, 'var', 'celery', 'antrean'),
+    'data_folder_out': os.path.join(BASE_DIR, 'var', 'celery', 'antrean'),
+    'processed_folder': os.path.join(BASE_DIR, 'var', 'celery', 'diproses'),
+    'control_folder': os.path.join(BASE_DIR, 'var', 'celery', 'kontrol'),
+    'store_processed': False,
 }
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER') == '1'
+CELERY_TASK_IGNORE_RESULT = True
 
 
 # Password validation
@@ -143,6 +225,15 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Lama cache (detik) untuk objek Pelanggan yang login; 0 untuk menonaktifkan
+PELANGGAN_CACHE_TIMEOUT = 30
+
+# Profil SQL per request (core/profiling.py): porsi request yang dicatat,
+# 0.0 = mati, 1.0 = semua request. Hasil terlihat di Admin > Laporan > Profil SQL.
+SQL_PROFILING_SAMPLE_RATE = 0.0
+SQL_PROFILING_BUFFER_SIZE = 200
+SQL_PROFILING_SLOWEST = 5
+
 # Custom Authentication Backend
 AUTHENTICATION_BACKENDS = [
     'core.auth_backend.PelangganAuthBackend',
@@ -1,12 +1,18 @@
 # core/admin.py
 
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
-from django.db.models import Sum, F
+from django.db.models import Count, Sum, F
 from .models import Pelanggan, Barang, Penyewaan, DetailSewa
+from .images import derivative_urls
+from .availability import bulk_set_status
 from django.contrib.auth.models import Group, User # Penting: Import User
 from django.contrib.admin.sites import NotRegistered 
-from django.urls import reverse # Diperlukan untuk membuat URL link laporan
+from django.urls import path, reverse # Diperlukan untuk membuat URL link laporan
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from . import profiling, write_lane
 from django.contrib.humanize.templatetags.humanize import intcomma
 
 # Asumsi: Anda memiliki file views.py dengan fungsi admin_dashboard_context
@@ -46,6 +52,28 @@ class CustomAdminSite(admin.AdminSite):
             
         return super().index(request, context)
 
+    def get_urls(self):
+        urls = [
+            path('profil-sql/', self.admin_view(self.profil_sql_view), name='profil_sql'),
+        ]
+        return urls + super().get_urls()
+
+    def profil_sql_view(self, request):
+        """Ringkasan profil SQL per request dari ring buffer (core/profiling.py)."""
+        if not request.user.is_superuser:
+            raise PermissionDenied
+        if request.method == 'POST':
+            profiling.clear()
+            return redirect('custom_admin:profil_sql')
+
+        context = {
+            **self.each_context(request),
+            'title': 'Profil SQL per Request',
+            'entries': profiling.entries(),
+            'sample_rate': profiling.sample_rate(),
+        }
+        return TemplateResponse(request, 'admin/profil_sql.html', context)
+
     # PERBAIKAN UTAMA: Memastikan app_list bukan None dan menambahkan Laporan
     def get_app_list(self, request, app_label=None):
         
@@ -82,6 +110,13 @@ class CustomAdminSite(admin.AdminSite):
                 'admin_url': reverse('report_pelanggan'),
             },
         ]
+        if request.user.is_superuser:
+            report_models.append({
+                'name': 'Profil SQL',
+                'object_name': 'profil_sql',
+                'perms': {'view': True},
+                'admin_url': reverse('custom_admin:profil_sql'),
+            })
 
         # 2. Buat "Aplikasi" baru untuk Laporan
         reports_app = {
@@ -111,6 +146,37 @@ admin.site = custom_admin_site
 
 # --- Langkah 3: PENDAFTARAN MODEL KE CUSTOM ADMIN SITE ---
 
+def aksi_link_html(model_name, pk):
+    """Ikon Edit & Hapus untuk kolom 'Aksi' di changelist."""
+    return format_html(
+        '<a href="/admin/core/{0}/{1}/change/" title="Edit"><i class="fas fa-edit"></i></a> &nbsp; '
+        '<a href="/admin/core/{0}/{1}/delete/" title="Hapus"><i class="fas fa-trash-alt" style="color: red;"></i></a>',
+        model_name, pk,
+    )
+
+
+class WriteLaneAdminMixin:
+    """
+    Request POST (simpan, hapus, action) dijalankan lewat jalur tulis berurutan
+    (core/write_lane.py). View admin sudah membuka transaksinya sendiri, jadi
+    yang diulang saat lock error adalah seluruh view.
+    """
+
+    def _lewat_jalur_tulis(self, view, request, *args):
+        if request.method == 'POST':
+            return write_lane.run(view, request, *args, atomic=False)
+        return view(request, *args)
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        return self._lewat_jalur_tulis(super().changeform_view, request, object_id, form_url, extra_context)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        return self._lewat_jalur_tulis(super().delete_view, request, object_id, extra_context)
+
+    def changelist_view(self, request, extra_context=None):
+        return self._lewat_jalur_tulis(super().changelist_view, request, extra_context)
+
+
 # Daftarkan User dan Group ke Custom Admin Site
 custom_admin_site.register(User)
 custom_admin_site.register(Group)
@@ -118,23 +184,19 @@ custom_admin_site.register(Group)
 
 # --- Admin Class untuk Pelanggan ---
 @admin.register(Pelanggan, site=custom_admin_site)
-class PelangganAdmin(admin.ModelAdmin):
+class PelangganAdmin(WriteLaneAdminMixin, admin.ModelAdmin):
     list_display = ('idPelanggan', 'namaPelanggan', 'noHp', 'aksi_link') 
     search_fields = ('namaPelanggan', 'noHp')
     list_filter = ('namaPelanggan',)
     
     def aksi_link(self, obj):
-        edit_url = f'/admin/core/pelanggan/{obj.idPelanggan}/change/' 
-        edit_icon = f'<a href="{edit_url}" title="Edit"><i class="fas fa-edit"></i></a>'
-        delete_url = f'/admin/core/pelanggan/{obj.idPelanggan}/delete/'
-        delete_icon = f'<a href="{delete_url}" title="Hapus"><i class="fas fa-trash-alt" style="color: red;"></i></a>'
-        return format_html(f'{edit_icon} &nbsp; {delete_icon}')
+        return aksi_link_html('pelanggan', obj.idPelanggan)
     aksi_link.short_description = 'Aksi'
 
 
 # --- Admin Class untuk Barang ---
 @admin.register(Barang, site=custom_admin_site)
-class BarangAdmin(admin.ModelAdmin):
+class BarangAdmin(WriteLaneAdminMixin, admin.ModelAdmin):
     list_display = ('idBarang', 'namaBarang', 'harga_formatted', 'stok', 'ukuran', 'foto_preview', 'aksi_link')
     search_fields = ('namaBarang',)
     list_filter = ('ukuran',)
@@ -146,16 +208,18 @@ class BarangAdmin(admin.ModelAdmin):
     
     def foto_preview(self, obj):
         if obj.foto:
-            return format_html('<img src="{}" width="50" height="50" style="object-fit: cover; border-radius: 5px;" />', obj.foto.url)
+            try:
+                urls = derivative_urls(obj)
+            except (OSError, ValueError):
+                urls = None
+            # Varian terkecil (thumb), atau foto asli jika turunannya belum ada
+            src = urls['jpeg'][0][0] if urls else obj.foto.url
+            return format_html('<img src="{}" width="50" height="50" style="object-fit: cover; border-radius: 5px;" />', src)
         return "No Image"
     foto_preview.short_description = 'Foto'
     
     def aksi_link(self, obj):
-        edit_url = f'/admin/core/barang/{obj.idBarang}/change/' 
-        edit_icon = f'<a href="{edit_url}" title="Edit"><i class="fas fa-edit"></i></a>'
-        delete_url = f'/admin/core/barang/{obj.idBarang}/delete/'
-        delete_icon = f'<a href="{delete_url}" title="Hapus"><i class="fas fa-trash-alt" style="color: red;"></i></a>'
-        return format_html(f'{edit_icon} &nbsp; {delete_icon}')
+        return aksi_link_html('barang', obj.idBarang)
     aksi_link.short_description = 'Aksi'
 
 
@@ -166,13 +230,25 @@ class DetailSewaInline(admin.TabularInline):
     readonly_fields = ('subTotal',) 
     extra = 1
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'idBarang':
+            # Semua baris inline memakai daftar pilihan Barang yang sama (satu query per request)
+            if not hasattr(request, '_pilihan_barang'):
+                request._pilihan_barang = list(field.choices)
+            field.choices = request._pilihan_barang
+        return field
+
     
 @admin.register(Penyewaan, site=custom_admin_site)
-class PenyewaanAdmin(admin.ModelAdmin):
+class PenyewaanAdmin(WriteLaneAdminMixin, admin.ModelAdmin):
     inlines = [DetailSewaInline]
     list_display = (
-         'idPenyewaan', 'tanggalPesan', 'tanggalAcara', 'durasiSewa', 'total_bayar_formatted', 'statusSewa', 'idPelanggan', 'aksi_link'
+         'idPenyewaan', 'tanggalPesan', 'tanggalAcara', 'durasiSewa', 'jumlah_item', 'total_item_formatted',
+         'total_bayar_formatted', 'statusSewa', 'idPelanggan', 'aksi_link'
     )
+    # Nama pelanggan ikut di-JOIN, bukan satu query per baris
+    list_select_related = ('idPelanggan',)
     search_fields = ('idPelanggan__namaPelanggan', 'statusSewa')
     list_filter = ('statusSewa', 'tanggalAcara')
     
@@ -186,6 +262,28 @@ class PenyewaanAdmin(admin.ModelAdmin):
         })
     )
     readonly_fields = ('totalBayar', 'tanggalPesan')
+    actions = ['konfirmasi_terpilih', 'selesaikan_terpilih', 'batalkan_terpilih']
+
+    def _ubah_status_massal(self, request, queryset, status):
+        # Satu transaksi untuk semua baris; unit dikembalikan dengan satu UPDATE
+        dipilih = queryset.count()
+        diubah = bulk_set_status(queryset, status)
+        pesan = f"{diubah} penyewaan diubah menjadi {status}."
+        if dipilih > diubah:
+            pesan += f" {dipilih - diubah} dilewati karena statusnya tidak bisa diubah ke {status}."
+        self.message_user(request, pesan, messages.SUCCESS if diubah else messages.WARNING)
+
+    def konfirmasi_terpilih(self, request, queryset):
+        self._ubah_status_massal(request, queryset, 'Confirmed')
+    konfirmasi_terpilih.short_description = 'Konfirmasi penyewaan terpilih'
+
+    def selesaikan_terpilih(self, request, queryset):
+        self._ubah_status_massal(request, queryset, 'Completed')
+    selesaikan_terpilih.short_description = 'Selesaikan penyewaan terpilih'
+
+    def batalkan_terpilih(self, request, queryset):
+        self._ubah_status_massal(request, queryset, 'Cancelled')
+    batalkan_terpilih.short_description = 'Batalkan penyewaan terpilih'
     
     def total_bayar_formatted(self, obj):
         if obj.totalBayar:
@@ -193,6 +291,26 @@ class PenyewaanAdmin(admin.ModelAdmin):
         return "Rp 0"
     total_bayar_formatted.short_description = 'Total Bayar'
     total_bayar_formatted.admin_order_field = 'totalBayar'
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('_changelist'):
+            # Jumlah item dan total per penyewaan dihitung dalam query changelist
+            queryset = queryset.annotate(
+                _jumlah_item=Count('detailsewa'),
+                _total_item=Sum('detailsewa__subTotal'),
+            )
+        return queryset
+
+    def jumlah_item(self, obj):
+        return obj._jumlah_item
+    jumlah_item.short_description = 'Jumlah Item'
+    jumlah_item.admin_order_field = '_jumlah_item'
+
+    def total_item_formatted(self, obj):
+        return f"Rp {intcomma(obj._total_item or 0)}"
+    total_item_formatted.short_description = 'Total Item'
+    total_item_formatted.admin_order_field = '_total_item'
     
     def calculate_total_bayar(self, penyewaan_instance):
         total_sum = penyewaan_instance.detailsewa_set.aggregate(
@@ -231,9 +349,5 @@ class PenyewaanAdmin(admin.ModelAdmin):
             self.calculate_total_bayar(form.instance)
             
     def aksi_link(self, obj):
-        edit_url = f'/admin/core/penyewaan/{obj.idPenyewaan}/change/' 
-        edit_icon = f'<a href="{edit_url}" title="Edit"><i class="fas fa-edit"></i></a>'
-        delete_url = f'/admin/core/penyewaan/{obj.idPenyewaan}/delete/'
-        delete_icon = f'<a href="{delete_url}" title="Hapus"><i class="fas fa-trash-alt" style="color: red;"></i></a>'
-        return format_html(f'{edit_icon} &nbsp; {delete_icon}')
+        return aksi_link_html('penyewaan', obj.idPenyewaan)
     aksi_link.short_description = 'Aksi'
\ No newline at end of file
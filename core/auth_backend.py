@@ -8,6 +8,9 @@ class PelangganAuthBackend(BaseBackend):
             if pelanggan.check_password(password):
                 return pelanggan
         except Pelanggan.DoesNotExist:
+            # Tetap jalankan hasher sekali agar waktu respons tidak membocorkan
+            # apakah nomor HP terdaftar
+            Pelanggan().set_password(password)
             return None
         return None
 
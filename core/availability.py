@@ -0,0 +1,328 @@
+# core/availability.py
+"""
+Mesin ketersediaan Barang berbasis rentang tanggal.
+
+`Barang.stok` adalah jumlah unit yang dimiliki. Unit yang sedang dipesan
+dicatat per Barang per hari di tabel `PemakaianHarian`, sehingga pertanyaan
+"berapa unit X yang bebas antara D1 dan D2" cukup dijawab dengan satu
+lookup ber-index pada (idBarang, tanggal), tanpa memindai semua penyewaan.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, Max, OuterRef, Subquery, Sum, Value, When
+
+from .models import Barang, DetailSewa, PemakaianHarian, Penyewaan
+
+# Status penyewaan yang menahan unit barang pada jadwalnya
+STATUS_AKTIF = ('Pending', 'Confirmed')
+
+# Perubahan status massal dari admin: status baru -> status asal yang boleh
+TRANSISI_MASSAL = {
+    'Confirmed': ('Pending',),
+    'Completed': ('Pending', 'Confirmed'),
+    'Cancelled': ('Pending', 'Confirmed'),
+}
+
+
+def _daftar_hari(mulai, selesai):
+    return [mulai + timedelta(days=i) for i in range((selesai - mulai).days + 1)]
+
+
+def _delta_expr(items):
+    """Ekspresi CASE idBarang -> jumlah, agar semua barang diubah dalam satu UPDATE."""
+    return Case(
+        *[When(idBarang_id=barang_id, then=Value(jumlah)) for barang_id, jumlah in items.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def apply_delta(items, mulai, selesai):
+    """
+    Tambahkan (positif) atau kurangi (negatif) jumlah dipesan untuk setiap
+    barang di `items` ({idBarang: jumlah}) pada semua hari mulai..selesai.
+    """
+    items = {barang_id: jumlah for barang_id, jumlah in items.items() if jumlah}
+    if not items or selesai < mulai:
+        return
+
+    hari = _daftar_hari(mulai, selesai)
+    if any(jumlah > 0 for jumlah in items.values()):
+        # Pastikan baris harian sudah ada sebelum di-increment
+        PemakaianHarian.objects.bulk_create(
+            [PemakaianHarian(idBarang_id=barang_id, tanggal=h)
+             for barang_id, jumlah in items.items() if jumlah > 0 for h in hari],
+            ignore_conflicts=True,
+        )
+
+    baris = PemakaianHarian.objects.filter(idBarang_id__in=items, tanggal__range=(mulai, selesai))
+    baris.update(jumlahDipesan=F('jumlahDipesan') + _delta_expr(items))
+
+    if any(jumlah < 0 for jumlah in items.values()):
+        # Buang baris yang sudah kosong agar tabel tetap kecil
+        baris.filter(jumlahDipesan=0).delete()
+
+
+def reserve(items, mulai, selesai):
+    apply_delta(items, mulai, selesai)
+
+
+class _HariPenuh(Exception):
+    """Dipakai untuk me-rollback savepoint pemesanan yang tidak muat."""
+
+
+def _pesan_bersyarat(items, mulai, selesai, stok):
+    """
+    Satu UPDATE bersyarat untuk semua barang di `items`: jumlahDipesan naik
+    sebesar delta CASE hanya di baris yang masih muat (jumlahDipesan + delta
+    <= stok). Savepoint-nya di-rollback (_HariPenuh) jika tidak semua baris
+    barang x hari ikut ter-update.
+    """
+    delta = _delta_expr(items)
+    with transaction.atomic():
+        terpesan = (
+            PemakaianHarian.objects
+            .filter(idBarang_id__in=items, tanggal__range=(mulai, selesai), jumlahDipesan__lte=stok - delta)
+            .update(jumlahDipesan=F('jumlahDipesan') + delta)
+        )
+        if terpesan != len(items) * len(_daftar_hari(mulai, selesai)):
+            raise _HariPenuh
+
+
+def try_reserve(items, mulai, selesai):
+    """
+    Pesan unit secara optimistis: tanpa membaca stok lebih dulu dan tanpa
+    mengunci baris. Semua barang di `items` ({idBarang: jumlah}) dipesan
+    dengan satu UPDATE bersyarat pada hari mulai..selesai, sehingga jumlah
+    query tidak bergantung pada jumlah barang. Hanya jika ada hari yang tidak
+    muat, UPDATE itu di-rollback lalu setiap barang dicoba sendiri (satu
+    savepoint per barang) untuk mengetahui barang mana yang kurang.
+
+    Mengembalikan set idBarang yang stoknya tidak cukup (kosong = semua
+    terpesan). Barang lain tetap terpesan; pemanggil yang butuh semua atau
+    tidak sama sekali membatalkan transaksinya jika set tidak kosong.
+    """
+    items = {barang_id: jumlah for barang_id, jumlah in items.items() if jumlah > 0}
+    if not items or selesai < mulai:
+        return set()
+
+    hari = _daftar_hari(mulai, selesai)
+    PemakaianHarian.objects.bulk_create(
+        [PemakaianHarian(idBarang_id=barang_id, tanggal=h) for barang_id in items for h in hari],
+        ignore_conflicts=True,
+    )
+    stok = Subquery(Barang.objects.filter(pk=OuterRef('idBarang_id')).values('stok')[:1])
+
+    try:
+        _pesan_bersyarat(items, mulai, selesai, stok)
+        return set()
+    except _HariPenuh:
+        pass
+
+    gagal = set()
+    for barang_id, jumlah in items.items():
+        try:
+            _pesan_bersyarat({barang_id: jumlah}, mulai, selesai, stok)
+        except _HariPenuh:
+            gagal.add(barang_id)
+
+    if gagal:
+        # Baris kosong yang baru dibuat untuk barang yang gagal tidak perlu disimpan
+        PemakaianHarian.objects.filter(idBarang_id__in=gagal, tanggal__range=(mulai, selesai), jumlahDipesan=0).delete()
+    return gagal
+
+
+def release(items, mulai, selesai):
+    apply_delta({barang_id: -jumlah for barang_id, jumlah in items.items()}, mulai, selesai)
+
+
+def _peak_rows(barang_ids, mulai, selesai):
+    return (
+        PemakaianHarian.objects
+        .filter(idBarang_id__in=barang_ids, tanggal__range=(mulai, selesai))
+        .values('idBarang_id')
+        .annotate(puncak=Max('jumlahDipesan'))
+    )
+
+
+def release_penyewaan(penyewaan_qs):
+    """
+    Lepaskan semua unit milik penyewaan di `penyewaan_qs` dengan satu UPDATE.
+
+    Jumlah yang dilepas per baris pemakaian harian dihitung oleh subquery
+    berkorelasi: SUM jumlahBarang dari DetailSewa penyewaan terpilih untuk
+    barang baris itu yang jadwalnya mencakup tanggal baris itu. Hanya baris
+    yang punya DetailSewa seperti itu (EXISTS) yang diubah. Query berjalan di
+    database yang sama dengan `penyewaan_qs`.
+    """
+    db = penyewaan_qs.db
+    penyewaan_ids = penyewaan_qs.values('pk')
+    detail = DetailSewa.objects.using(db).filter(
+        idPenyewaan__in=penyewaan_ids,
+        idBarang=OuterRef('idBarang'),
+        idPenyewaan__tanggalAcara__lte=OuterRef('tanggal'),
+        idPenyewaan__tanggalPembongkaran__gte=OuterRef('tanggal'),
+    )
+    dilepas = detail.order_by().values('idBarang').annotate(total=Sum('jumlahBarang')).values('total')[:1]
+    PemakaianHarian.objects.using(db).filter(Exists(detail)).update(
+        jumlahDipesan=F('jumlahDipesan') - Subquery(dilepas, output_field=IntegerField()),
+    )
+
+    # Buang baris yang sudah kosong agar tabel tetap kecil
+    PemakaianHarian.objects.using(db).filter(
+        jumlahDipesan=0,
+        idBarang_id__in=DetailSewa.objects.using(db).filter(idPenyewaan__in=penyewaan_ids).values('idBarang'),
+    ).delete()
+
+
+def bulk_set_status(penyewaan_qs, status_baru):
+    """
+    Ubah status semua penyewaan di `penyewaan_qs` yang boleh berpindah ke
+    `status_baru` (lihat TRANSISI_MASSAL) dalam satu transaksi, tanpa save()
+    per baris. Unit penyewaan yang selesai/batal dilepas lewat
+    release_penyewaan() dan snapshot dashboard disesuaikan per status & bulan.
+    Mengembalikan jumlah penyewaan yang berubah.
+    """
+    from . import report_cache, revenue
+    from .dashboard import penyewaan_status_changed
+
+    # Pilih ulang berdasarkan pk agar anotasi/urutan queryset asal tidak ikut ke UPDATE
+    target = Penyewaan.objects.filter(
+        pk__in=penyewaan_qs.order_by().values('pk'), statusSewa__in=TRANSISI_MASSAL[status_baru],
+    )
+    with transaction.atomic():
+        if status_baru not in STATUS_AKTIF:
+            release_penyewaan(target.filter(statusSewa__in=STATUS_AKTIF))
+        penyewaan_status_changed(target, status_baru)
+        revenue.penyewaan_status_changed(target, status_baru)
+        # UPDATE massal tidak memicu signal post_save
+        report_cache.invalidate(Penyewaan)
+        return target.update(statusSewa=status_baru)
+
+
+def peak_reserved(barang_ids, mulai, selesai):
+    """Jumlah dipesan tertinggi per barang dalam rentang tanggal (satu query)."""
+    return {row['idBarang_id']: row['puncak'] for row in _peak_rows(barang_ids, mulai, selesai)}
+
+
+def available_quantities(barang_list, mulai, selesai):
+    """
+    Hitung unit bebas untuk setiap Barang pada rentang mulai..selesai.
+    `barang_list` berisi instance Barang (stok sudah dimuat).
+    Mengembalikan dict {idBarang: unit_bebas}.
+    """
+    barang_list = list(barang_list)
+    puncak = peak_reserved([b.pk for b in barang_list], mulai, selesai)
+    return {b.pk: max(b.stok - puncak.get(b.pk, 0), 0) for b in barang_list}
+
+
+def free_units(barang, mulai, selesai):
+    """Berapa unit `barang` yang bebas antara `mulai` dan `selesai` (inklusif)."""
+    return available_quantities([barang], mulai, selesai)[barang.pk]
+
+
+def annotate_available(queryset, mulai, selesai):
+    """Tempelkan atribut `tersedia` pada setiap Barang di queryset untuk rentang tertentu."""
+    barang_list = list(queryset)
+    tersedia = available_quantities(barang_list, mulai, selesai)
+    for barang in barang_list:
+        barang.tersedia = tersedia[barang.pk]
+    return barang_list
+
+
+async def aannotate_available(queryset, mulai, selesai):
+    """Versi async annotate_available() (ORM async, tanpa pindah thread manual)."""
+    barang_list = [barang async for barang in queryset]
+    puncak = {
+        row['idBarang_id']: row['puncak']
+        async for row in _peak_rows([b.pk for b in barang_list], mulai, selesai)
+    }
+    for barang in barang_list:
+        barang.tersedia = max(barang.stok - puncak.get(barang.pk, 0), 0)
+    return barang_list
+
+
+def jumlah_per_barang(penyewaan_id):
+    """Total jumlahBarang per idBarang untuk satu penyewaan."""
+    rows = (
+        DetailSewa.objects.filter(idPenyewaan_id=penyewaan_id)
+        .values('idBarang_id')
+        .annotate(total=Sum('jumlahBarang'))
+    )
+    return {row['idBarang_id']: row['total'] for row in rows}
+
+
+# -----------------------------------------------------------------
+# Sinkronisasi dari Model (dipanggil oleh save()/signal)
+# -----------------------------------------------------------------
+
+def sync_penyewaan(penyewaan, lama):
+    """
+    Sesuaikan pemakaian harian ketika status atau jadwal penyewaan berubah.
+    `lama` adalah dict nilai sebelum disimpan (None untuk data baru).
+    """
+    if lama is None:
+        # Penyewaan baru belum punya DetailSewa
+        return
+
+    aktif_lama = lama['statusSewa'] in STATUS_AKTIF
+    aktif_baru = penyewaan.statusSewa in STATUS_AKTIF
+    jadwal_lama = (lama['tanggalAcara'], lama['tanggalPembongkaran'])
+    jadwal_baru = (penyewaan.tanggalAcara, penyewaan.tanggalPembongkaran)
+
+    if aktif_lama == aktif_baru and (not aktif_baru or jadwal_lama == jadwal_baru):
+        return
+
+    items = jumlah_per_barang(penyewaan.pk)
+    if aktif_lama:
+        release(items, *jadwal_lama)
+    if aktif_baru:
+        reserve(items, *jadwal_baru)
+
+
+def sync_detail(detail, lama):
+    """
+    Sesuaikan pemakaian harian ketika DetailSewa dibuat atau diubah.
+    `lama` adalah dict {'idBarang_id', 'jumlahBarang'} sebelum disimpan.
+    """
+    penyewaan = detail.idPenyewaan
+    if penyewaan.statusSewa not in STATUS_AKTIF:
+        return
+
+    items = defaultdict(int)
+    if lama is not None:
+        items[lama['idBarang_id']] -= lama['jumlahBarang']
+    items[detail.idBarang_id] += detail.jumlahBarang
+    apply_delta(items, penyewaan.tanggalAcara, penyewaan.tanggalPembongkaran)
+
+
+def release_detail(detail):
+    """Lepaskan pemakaian harian milik DetailSewa yang dihapus."""
+    jadwal = (
+        Penyewaan.objects
+        .filter(pk=detail.idPenyewaan_id, statusSewa__in=STATUS_AKTIF)
+        .values_list('tanggalAcara', 'tanggalPembongkaran')
+        .first()
+    )
+    if jadwal:
+        release({detail.idBarang_id: detail.jumlahBarang}, *jadwal)
+
+
+def rebuild():
+    """Bangun ulang seluruh tabel PemakaianHarian dari penyewaan yang aktif."""
+    PemakaianHarian.objects.all().delete()
+    per_hari = defaultdict(int)
+    rows = (
+        DetailSewa.objects
+        .filter(idPenyewaan__statusSewa__in=STATUS_AKTIF)
+        .values_list('idBarang_id', 'jumlahBarang', 'idPenyewaan__tanggalAcara', 'idPenyewaan__tanggalPembongkaran')
+    )
+    for barang_id, jumlah, mulai, selesai in rows.iterator():
+        for h in _daftar_hari(mulai, selesai):
+            per_hari[(barang_id, h)] += jumlah
+    PemakaianHarian.objects.bulk_create(
+        [PemakaianHarian(idBarang_id=b, tanggal=h, jumlahDipesan=j) for (b, h), j in per_hari.items()],
+        batch_size=1000,
+    )
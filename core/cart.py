@@ -0,0 +1,123 @@
+# core/cart.py
+"""
+Keranjang pelanggan di tabel `ItemKeranjang`, satu baris per (Pelanggan, Barang).
+
+Setiap operasi adalah satu UPDATE/DELETE bersyarat pada baris item itu saja,
+sehingga dua tab yang mengubah keranjang bersamaan tidak saling menimpa dan
+session tidak perlu ditulis ulang. Nama dan harga tidak disalin; keduanya
+selalu dibaca dari Barang.
+"""
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Barang, ItemKeranjang
+
+
+def _item(pelanggan_id, barang_id):
+    return ItemKeranjang.objects.filter(idPelanggan_id=pelanggan_id, idBarang_id=barang_id)
+
+
+def get_items(pelanggan_id):
+    """Isi keranjang sebagai dict {idBarang: jumlah}."""
+    return dict(
+        ItemKeranjang.objects.filter(idPelanggan_id=pelanggan_id).values_list('idBarang_id', 'jumlah')
+    )
+
+
+def _lines(pelanggan_id):
+    return ItemKeranjang.objects.filter(idPelanggan_id=pelanggan_id).select_related('idBarang').order_by('pk')
+
+
+def get_lines(pelanggan_id):
+    """Item keranjang beserta Barang-nya (satu query JOIN), urut sesuai waktu ditambahkan."""
+    return list(_lines(pelanggan_id))
+
+
+async def aget_lines(pelanggan_id):
+    """Versi async get_lines()."""
+    return [item async for item in _lines(pelanggan_id)]
+
+
+def get_quantity(pelanggan_id, barang_id):
+    return _item(pelanggan_id, barang_id).values_list('jumlah', flat=True).first() or 0
+
+
+def total_quantity(pelanggan_id):
+    return ItemKeranjang.objects.filter(idPelanggan_id=pelanggan_id).aggregate(total=Sum('jumlah'))['total'] or 0
+
+
+def add(pelanggan_id, barang_id, jumlah, batas):
+    """
+    Tambahkan `jumlah` unit, selama total di keranjang tidak melebihi `batas`.
+    Mengembalikan False (tanpa perubahan) jika batas terlampaui.
+    """
+    with transaction.atomic():
+        ItemKeranjang.objects.bulk_create(
+            [ItemKeranjang(idPelanggan_id=pelanggan_id, idBarang_id=barang_id, jumlah=0)],
+            ignore_conflicts=True,
+        )
+        item = _item(pelanggan_id, barang_id)
+        berhasil = item.filter(jumlah__lte=batas - jumlah).update(
+            jumlah=F('jumlah') + jumlah, diperbarui=timezone.now(),
+        )
+        if not berhasil:
+            # Buang baris kosong yang baru saja dibuat
+            item.filter(jumlah=0).delete()
+    return bool(berhasil)
+
+
+def increment(pelanggan_id, barang_id, batas):
+    """Tambah satu unit jika item ada di keranjang dan jumlahnya masih di bawah `batas`."""
+    return bool(_item(pelanggan_id, barang_id).filter(jumlah__lt=batas).update(
+        jumlah=F('jumlah') + 1, diperbarui=timezone.now(),
+    ))
+
+
+def decrement(pelanggan_id, barang_id):
+    """
+    Kurangi satu unit; item dengan satu unit dihapus dari keranjang.
+    Mengembalikan 'dikurangi', 'dihapus' atau None jika item tidak ada.
+    """
+    item = _item(pelanggan_id, barang_id)
+    if item.filter(jumlah__gt=1).update(jumlah=F('jumlah') - 1, diperbarui=timezone.now()):
+        return 'dikurangi'
+    if item.delete()[0]:
+        return 'dihapus'
+    return None
+
+
+def set_quantity(pelanggan_id, barang_id, jumlah):
+    """Ganti jumlah item yang sudah ada di keranjang. False jika item tidak ada."""
+    return bool(_item(pelanggan_id, barang_id).update(jumlah=jumlah, diperbarui=timezone.now()))
+
+
+def remove(pelanggan_id, barang_id):
+    """Hapus item dari keranjang. False jika item tidak ada."""
+    return bool(_item(pelanggan_id, barang_id).delete()[0])
+
+
+def clear(pelanggan_id):
+    ItemKeranjang.objects.filter(idPelanggan_id=pelanggan_id).delete()
+
+
+def import_session_cart(request):
+    """
+    Pindahkan keranjang format lama (request.session['cart']) ke tabel,
+    lalu hapus dari session. Dipanggil sekali untuk session yang masih menyimpannya.
+    """
+    lama = request.session.pop('cart', None)
+    pelanggan_id = request.session.get('pelanggan_id')
+    if not lama or not pelanggan_id:
+        return
+    # Barang yang sudah dihapus dilewati
+    ada = set(Barang.objects.filter(pk__in=[item['barang_id'] for item in lama.values()]).values_list('pk', flat=True))
+    with transaction.atomic():
+        for item in lama.values():
+            if item['barang_id'] not in ada:
+                continue
+            ItemKeranjang.objects.bulk_create(
+                [ItemKeranjang(idPelanggan_id=pelanggan_id, idBarang_id=item['barang_id'], jumlah=0)],
+                ignore_conflicts=True,
+            )
+            _item(pelanggan_id, item['barang_id']).update(jumlah=F('jumlah') + item['quantity'])
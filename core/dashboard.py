@@ -0,0 +1,148 @@
+# core/dashboard.py
+"""
+Snapshot dashboard admin.
+
+Angka kartu dan pendapatan bulanan disimpan di `RingkasanDashboard` dan
+diperbarui secara inkremental oleh save()/signal Pelanggan, Barang dan
+Penyewaan. Halaman /admin/ cukup membaca snapshot ini dengan satu query.
+Gunakan `python manage.py rebuild_dashboard` untuk membangun ulang penuh.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Barang, Pelanggan, Penyewaan, RingkasanDashboard
+
+# Penyewaan yang dihitung sebagai pendapatan
+STATUS_SUKSES = ('Confirmed', 'Completed')
+
+# Penanda bahwa snapshot sudah pernah dibangun penuh
+KUNCI_DIBANGUN = 'dibangun'
+
+
+def kunci_bulan(tanggal):
+    return f'pendapatan:{tanggal:%Y-%m}'
+
+
+def is_built():
+    return RingkasanDashboard.objects.filter(kunci=KUNCI_DIBANGUN).exists()
+
+
+def apply_deltas(deltas):
+    """
+    Tambahkan nilai pada kunci snapshot secara atomik ({kunci: delta}).
+    Diabaikan jika snapshot belum dibangun, karena total awalnya belum ada.
+    """
+    deltas = {kunci: nilai for kunci, nilai in deltas.items() if nilai}
+    if not deltas or not is_built():
+        return
+
+    sekarang = timezone.now()
+    with transaction.atomic():
+        RingkasanDashboard.objects.bulk_create(
+            [RingkasanDashboard(kunci=kunci, diperbarui=sekarang) for kunci in deltas],
+            ignore_conflicts=True,
+        )
+        for kunci, nilai in deltas.items():
+            RingkasanDashboard.objects.filter(kunci=kunci).update(nilai=F('nilai') + nilai, diperbarui=sekarang)
+
+
+def _kontribusi(status, total_bayar, tanggal_pesan):
+    """Kontribusi satu penyewaan terhadap snapshot."""
+    if status not in STATUS_SUKSES or tanggal_pesan is None:
+        return {}
+    total_bayar = total_bayar or Decimal('0')
+    return {
+        'total_penyewaan': 1,
+        'total_pendapatan': total_bayar,
+        kunci_bulan(tanggal_pesan): total_bayar,
+    }
+
+
+def penyewaan_changed(penyewaan, lama):
+    """Terapkan selisih kontribusi penyewaan sebelum dan sesudah disimpan."""
+    deltas = defaultdict(Decimal)
+    if lama is not None:
+        for kunci, nilai in _kontribusi(lama['statusSewa'], lama['totalBayar'], lama['tanggalPesan']).items():
+            deltas[kunci] -= nilai
+    for kunci, nilai in _kontribusi(penyewaan.statusSewa, penyewaan.totalBayar, penyewaan.tanggalPesan).items():
+        deltas[kunci] += nilai
+    apply_deltas(deltas)
+
+
+def penyewaan_status_changed(penyewaan_qs, status_baru):
+    """
+    Terapkan selisih snapshot untuk perubahan status massal. Dipanggil sebelum
+    UPDATE; kontribusi dihitung per (status lama, bulan) dalam satu query.
+    """
+    sukses_baru = status_baru in STATUS_SUKSES
+    rows = (
+        penyewaan_qs.order_by()
+        .values('statusSewa', bulan=TruncMonth('tanggalPesan'))
+        .annotate(jumlah=Count('pk'), total=Sum('totalBayar'))
+    )
+    deltas = defaultdict(Decimal)
+    for row in rows:
+        if (row['statusSewa'] in STATUS_SUKSES) == sukses_baru or row['bulan'] is None:
+            continue
+        tanda = 1 if sukses_baru else -1
+        total = row['total'] or Decimal('0')
+        deltas['total_penyewaan'] += tanda * row['jumlah']
+        deltas['total_pendapatan'] += tanda * total
+        deltas[kunci_bulan(row['bulan'])] += tanda * total
+    apply_deltas(deltas)
+
+
+def penyewaan_deleted(penyewaan):
+    kontribusi = _kontribusi(penyewaan.statusSewa, penyewaan.totalBayar, penyewaan.tanggalPesan)
+    apply_deltas({kunci: -nilai for kunci, nilai in kontribusi.items()})
+
+
+def rebuild():
+    """Hitung ulang seluruh snapshot dari data sumber."""
+    sekarang = timezone.now()
+    penyewaan_sukses = Penyewaan.objects.filter(statusSewa__in=STATUS_SUKSES)
+    agregat = penyewaan_sukses.aggregate(jumlah=Count('pk'), total=Sum('totalBayar'))
+
+    nilai = {
+        'total_pelanggan': Pelanggan.objects.count(),
+        'total_barang': Barang.objects.count(),
+        'total_penyewaan': agregat['jumlah'],
+        'total_pendapatan': agregat['total'] or 0,
+        KUNCI_DIBANGUN: 1,
+    }
+    per_bulan = (
+        penyewaan_sukses.annotate(bulan=TruncMonth('tanggalPesan'))
+        .values('bulan').annotate(total=Sum('totalBayar'))
+    )
+    for row in per_bulan:
+        nilai[kunci_bulan(row['bulan'])] = row['total'] or 0
+
+    with transaction.atomic():
+        RingkasanDashboard.objects.all().delete()
+        RingkasanDashboard.objects.bulk_create(
+            [RingkasanDashboard(kunci=kunci, nilai=n, diperbarui=sekarang) for kunci, n in nilai.items()]
+        )
+
+
+def read_snapshot(bulan_list):
+    """
+    Baca kartu total dan pendapatan untuk bulan-bulan yang diminta (satu query).
+    Mengembalikan (nilai_per_kunci, waktu_snapshot).
+    """
+    kunci = ['total_pelanggan', 'total_barang', 'total_penyewaan', 'total_pendapatan', KUNCI_DIBANGUN]
+    kunci += [kunci_bulan(b) for b in bulan_list]
+    rows = list(RingkasanDashboard.objects.filter(kunci__in=kunci).values_list('kunci', 'nilai', 'diperbarui'))
+
+    if not any(row[0] == KUNCI_DIBANGUN for row in rows):
+        # Snapshot belum ada (misalnya database baru): bangun sekali
+        rebuild()
+        rows = list(RingkasanDashboard.objects.filter(kunci__in=kunci).values_list('kunci', 'nilai', 'diperbarui'))
+
+    nilai = {k: n for k, n, _ in rows}
+    diperbarui = max(d for _, _, d in rows)
+    return nilai, diperbarui
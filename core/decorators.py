@@ -1,25 +1,42 @@
 from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.shortcuts import redirect
 from django.contrib import messages
 
+def _reject_unless_logged_in(request):
+    """Return a redirect to the login page, or None if a valid pelanggan is logged in"""
+    # Check if pelanggan is in session
+    if 'pelanggan_id' not in request.session:
+        messages.error(request, 'Anda harus login terlebih dahulu.')
+        return redirect('login_pelanggan')
+
+    # Check if pelanggan exists in database (shared with the view via request cache)
+    from .middleware import get_pelanggan
+    if get_pelanggan(request) is None:
+        # Remove invalid session
+        if 'pelanggan_id' in request.session:
+            del request.session['pelanggan_id']
+        messages.error(request, 'Sesi anda tidak valid. Silakan login kembali.')
+        return redirect('login_pelanggan')
+    return None
+
 def pelanggan_required(view_func):
+    """Works on both sync and async views; async views get the check run in a thread"""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # Session and pelanggan are loaded once here, so the view can use
+            # get_pelanggan() and request.session without touching the database
+            response = await sync_to_async(_reject_unless_logged_in)(request)
+            if response is not None:
+                return response
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        # Check if pelanggan is in session
-        if 'pelanggan_id' not in request.session:
-            messages.error(request, 'Anda harus login terlebih dahulu.')
-            return redirect('login_pelanggan')
-        
-        # Check if pelanggan exists in database
-        try:
-            from .models import Pelanggan
-            pelanggan = Pelanggan.objects.get(idPelanggan=request.session['pelanggan_id'])
-        except Pelanggan.DoesNotExist:
-            # Remove invalid session
-            if 'pelanggan_id' in request.session:
-                del request.session['pelanggan_id']
-            messages.error(request, 'Sesi anda tidak valid. Silakan login kembali.')
-            return redirect('login_pelanggan')
-            
+        response = _reject_unless_logged_in(request)
+        if response is not None:
+            return response
         return view_func(request, *args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -50,17 +50,24 @@ class PelangganLoginForm(forms.Form):
         widget=forms.PasswordInput(attrs={'class': 'form-control', 'placeholder': 'Password'})
     )
 
+    def __init__(self, request=None, *args, **kwargs):
+        self.request = request
+        self.pelanggan_cache = None
+        super().__init__(*args, **kwargs)
+
     def clean(self):
         cleaned_data = super().clean()
         noHp = cleaned_data.get('noHp')
         password = cleaned_data.get('password')
 
         if noHp and password:
-            try:
-                pelanggan = Pelanggan.objects.get(noHp=noHp)
-                if not pelanggan.check_password(password):
-                    raise forms.ValidationError("Nomor HP atau password salah.")
-            except Pelanggan.DoesNotExist:
+            # Verifikasi password hanya sekali; hasilnya dipakai ulang oleh view
+            from django.contrib.auth import authenticate
+            self.pelanggan_cache = authenticate(self.request, noHp=noHp, password=password)
+            if self.pelanggan_cache is None:
                 raise forms.ValidationError("Nomor HP atau password salah.")
         
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+    def get_user(self):
+        return self.pelanggan_cache
\ No newline at end of file
@@ -0,0 +1,127 @@
+# core/images.py
+"""
+Turunan gambar (thumbnail/card/detail) untuk Barang.foto.
+
+Setiap foto diubah ukurannya dengan Pillow menjadi beberapa lebar tetap,
+masing-masing dalam WebP dan JPEG progresif. Nama file turunan memakai hash
+isi foto, sehingga foto yang sama tidak diproses dua kali. Turunan dibuat
+oleh task Celery core.tasks.buat_turunan_foto setelah Barang disimpan (di
+luar transaksi penyimpanan); halaman hanya membaca URL-nya (derivative_urls)
+dan memakai foto asli, dengan catatan di log, selama turunannya belum ada.
+"""
+import hashlib
+import io
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Nama varian -> lebar (px)
+VARIANTS = {
+    'thumb': 120,
+    'card': 480,
+    'detail': 960,
+}
+
+# Format turunan -> (ekstensi, opsi Image.save)
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DERIVATIVE_DIR = 'foto_barang/turunan'
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(field_file):
+    """Hash SHA-1 (16 karakter) dari isi file foto."""
+    digest = hashlib.sha1()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()[:16]
+
+
+def derivative_name(foto_hash, variant, fmt):
+    return f'{DERIVATIVE_DIR}/{foto_hash}_{variant}.{FORMATS[fmt][0]}'
+
+
+def _load_image(field_file):
+    field_file.open('rb')
+    try:
+        image = Image.open(field_file)
+        # Foto dari HP sering menyimpan orientasi di EXIF
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    finally:
+        field_file.close()
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # JPEG tidak mendukung transparansi: tempel di atas latar putih
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB')
+
+
+def generate_derivatives(field_file, foto_hash=None, force=False):
+    """
+    Buat semua turunan yang belum ada di storage. Mengembalikan hash isi foto.
+    """
+    foto_hash = foto_hash or content_hash(field_file)
+    missing = [
+        (variant, fmt) for variant in VARIANTS for fmt in FORMATS
+        if force or not default_storage.exists(derivative_name(foto_hash, variant, fmt))
+    ]
+    if not missing:
+        return foto_hash
+
+    image = _load_image(field_file)
+    for variant, fmt in missing:
+        width = min(VARIANTS[variant], image.width)  # Jangan memperbesar gambar kecil
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+
+        buffer = io.BytesIO()
+        resized.save(buffer, **FORMATS[fmt][1])
+        name = derivative_name(foto_hash, variant, fmt)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(buffer.getvalue()))
+    return foto_hash
+
+
+def derivative_urls(barang):
+    """
+    URL turunan foto Barang: {fmt: [(url, lebar), ...]} diurutkan dari yang terkecil.
+    Hanya membaca storage: None jika Barang tanpa foto, fotoHash belum diisi
+    atau ada turunan yang hilang (pemanggil memakai foto asli). Turunan dibuat
+    setelah Barang disimpan (core.tasks.buat_turunan_foto), oleh migrasi 0010
+    dan `manage.py generate_thumbnails`.
+    """
+    if not barang.foto:
+        return None
+    if not barang.fotoHash:
+        logger.warning('Barang %s: turunan foto belum dibuat, memakai foto asli', barang.pk)
+        return None
+
+    names = {(variant, fmt): derivative_name(barang.fotoHash, variant, fmt) for variant in VARIANTS for fmt in FORMATS}
+    hilang = [name for name in names.values() if not default_storage.exists(name)]
+    if hilang:
+        logger.warning(
+            'Barang %s: %d turunan foto hilang (%s), memakai foto asli; jalankan `manage.py generate_thumbnails`',
+            barang.pk, len(hilang), ', '.join(hilang),
+        )
+        return None
+
+    return {
+        fmt: [(default_storage.url(names[variant, fmt]), width)
+              for variant, width in sorted(VARIANTS.items(), key=lambda item: item[1])]
+        for fmt in FORMATS
+    }
@@ -0,0 +1,321 @@
+import copy
+import json
+import math
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
+
+from PasirMas.celery import app as celery_app
+from core import customer_urls, report_jobs, urls as core_urls
+from core.models import Barang, ItemKeranjang, Pelanggan, Penyewaan
+from core.report_cache import result_version
+
+from .seed_bench import PASSWORD_BENCH
+
+
+def _nilai(nilai, konteks):
+    """Nilai skenario boleh berupa fungsi dari konteks bench (id data hasil seed)."""
+    return nilai(konteks) if callable(nilai) else nilai
+
+
+class Skenario:
+    """
+    Satu permintaan yang diukur: route bernama, method, data dan peran pengguna
+    ('anonim', 'pelanggan' dengan keranjang berisi, atau 'admin'). Dengan
+    `ikuti_pekerjaan` redirect PDF/ekspor diikuti sampai berkasnya terunduh
+    (halaman pekerjaan, status, lalu unduhan), sehingga pembuatan berkasnya
+    ikut terukur.
+    """
+
+    def __init__(self, label, route, peran='anonim', method='get', kwargs=None, query='', data=None,
+                 ikuti_pekerjaan=False):
+        self.label = label
+        self.route = route
+        self.peran = peran
+        self.method = method
+        self.kwargs = kwargs or {}
+        self.query = query
+        self.data = data
+        self.ikuti_pekerjaan = ikuti_pekerjaan
+
+    def url(self, konteks):
+        url = reverse(self.route, kwargs={k: _nilai(v, konteks) for k, v in self.kwargs.items()})
+        return f'{url}?{self.query}' if self.query else url
+
+    def post_data(self, konteks):
+        return {k: _nilai(v, konteks) for k, v in (self.data or {}).items()}
+
+
+def daftar_skenario():
+    """Semua skenario bench. Setiap route bernama di core/urls.py dan core/customer_urls.py wajib tercakup."""
+    besok = (date.today() + timedelta(days=30)).isoformat()
+    barang_id = {'pk': lambda konteks: konteks['barang_id']}
+    pekerjaan_id = {'pk': lambda konteks: konteks['pekerjaan_id']}
+    return [
+        # --- Halaman pelanggan (anonim) ---
+        Skenario('home', 'home_pelanggan'),
+        Skenario('katalog', 'katalog_barang'),
+        Skenario('katalog (jadwal)', 'katalog_barang', query=f'tanggalAcara={besok}&durasiSewa=2'),
+        Skenario('register (form)', 'register_pelanggan'),
+        Skenario('register (POST)', 'register_pelanggan', method='post', data={
+            'namaPelanggan': 'Bench Baru', 'noHp': '089999999999',
+            'password1': 'bench-rahasia-1', 'password2': 'bench-rahasia-1',
+        }),
+        Skenario('login (form)', 'login_pelanggan'),
+        Skenario('login (POST)', 'login_pelanggan', method='post', data={'noHp': lambda konteks: konteks['noHp'], 'password': PASSWORD_BENCH}),
+
+        # --- Halaman pelanggan (login, keranjang berisi) ---
+        Skenario('keranjang', 'view_cart', peran='pelanggan'),
+        Skenario('tambah ke keranjang', 'add_to_cart', peran='pelanggan', method='post',
+                 kwargs=barang_id, data={'quantity': 1}),
+        Skenario('ubah keranjang', 'update_cart', peran='pelanggan', method='post',
+                 kwargs=barang_id, data={'action': 'increase'}),
+        Skenario('hapus dari keranjang', 'remove_from_cart', peran='pelanggan', method='post',
+                 kwargs=barang_id),
+        Skenario('checkout', 'checkout', peran='pelanggan'),
+        Skenario('proses checkout', 'process_checkout', peran='pelanggan', method='post', data={
+            'alamatPemasangan': 'Jl. Bench No. 1', 'tanggalAcara': besok, 'durasiSewa': 2,
+        }),
+        Skenario('riwayat sewa', 'rental_history', peran='pelanggan'),
+        Skenario('detail sewa', 'rental_detail', peran='pelanggan', kwargs={'pk': lambda konteks: konteks['penyewaan_id']}),
+        Skenario('akun', 'akun_pelanggan', peran='pelanggan'),
+        Skenario('logout', 'logout_pelanggan', peran='pelanggan'),
+
+        # --- Laporan admin (HTML, PDF, ekspor) ---
+        *[Skenario(f'laporan {nama}', f'report_{nama}', peran='admin') for nama in ('penyewaan', 'keuangan', 'barang', 'pelanggan')],
+        *[Skenario(f'laporan {nama} (pdf)', f'report_{nama}_pdf', peran='admin', ikuti_pekerjaan=True)
+          for nama in ('penyewaan', 'keuangan', 'barang', 'pelanggan')],
+        *[Skenario(f'laporan {nama} (csv)', f'report_{nama}_export', peran='admin', query='format=csv', ikuti_pekerjaan=True)
+          for nama in ('penyewaan', 'keuangan', 'barang', 'pelanggan')],
+
+        # --- Pekerjaan laporan (satu pekerjaan CSV yang sudah selesai) ---
+        Skenario('pekerjaan laporan', 'report_job', peran='admin', kwargs=pekerjaan_id),
+        Skenario('pekerjaan laporan (status)', 'report_job_status', peran='admin', kwargs=pekerjaan_id),
+        Skenario('pekerjaan laporan (unduh)', 'report_job_download', peran='admin', kwargs=pekerjaan_id),
+
+        # --- Admin ---
+        Skenario('admin index', 'custom_admin:index', peran='admin'),
+        *[Skenario(f'admin {model}', f'custom_admin:core_{model}_changelist', peran='admin')
+          for model in ('pelanggan', 'barang', 'penyewaan')],
+    ]
+
+
+def persentil(nilai, p):
+    """Persentil nearest-rank dari daftar yang sudah diurutkan."""
+    return nilai[max(math.ceil(p / 100 * len(nilai)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Ukur latensi (p50/p95/p99), jumlah query, ukuran respons dan puncak memori setiap route "
+        "pelanggan, laporan dan admin dengan test client, lalu bandingkan dengan baseline. "
+        "Jalankan seed_bench terlebih dahulu. Semua perubahan data selama bench di-rollback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterasi', type=int, default=20, help="Jumlah permintaan terukur per route (default 20).")
+        parser.add_argument('--pemanasan', type=int, default=2, help="Permintaan pemanasan per route (default 2).")
+        parser.add_argument('--filter', default='', help="Hanya jalankan skenario yang labelnya mengandung teks ini.")
+        parser.add_argument('--output', default='bench/hasil.json', help="File JSON hasil (default bench/hasil.json).")
+        parser.add_argument('--baseline', default='bench/baseline.json', help="File JSON baseline (default bench/baseline.json).")
+        parser.add_argument('--simpan-baseline', action='store_true', help="Simpan hasil kali ini sebagai baseline baru.")
+        parser.add_argument('--ambang', type=float, default=0.2,
+                            help="Kenaikan relatif p95/memori yang dianggap regresi (default 0.2 = 20%%).")
+        parser.add_argument('--min-ms', type=float, default=5.0,
+                            help="Kenaikan p95 absolut minimum (ms) sebelum dianggap regresi (default 5).")
+
+    def handle(self, *args, **options):
+        skenario = daftar_skenario()
+        self.periksa_cakupan(skenario)
+        if options['filter']:
+            skenario = [s for s in skenario if options['filter'] in s.label]
+
+        hasil = {
+            'meta': {
+                'waktu': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'iterasi': options['iterasi'],
+                'jumlah_data': {
+                    'pelanggan': Pelanggan.objects.count(),
+                    'barang': Barang.objects.count(),
+                    'penyewaan': Penyewaan.objects.count(),
+                },
+            },
+            'routes': {},
+        }
+        self.stdout.write(f"Data: {hasil['meta']['jumlah_data']}")
+        self.stdout.write(f"{'route':<28} {'p50':>8} {'p95':>8} {'p99':>8} {'query':>6} {'bytes':>10} {'mem KB':>8}")
+
+        # Pekerjaan laporan dijalankan langsung di proses ini (worker tidak
+        # melihat transaksi bench yang belum di-commit), berkasnya ditulis ke
+        # folder sementara, dan tidak ada pemakaian ulang hasil sebelumnya
+        # sehingga setiap permintaan PDF/ekspor mengukur pembuatan berkas penuh.
+        eager = celery_app.conf.CELERY_TASK_ALWAYS_EAGER
+        celery_app.conf.CELERY_TASK_ALWAYS_EAGER = True
+        try:
+            with tempfile.TemporaryDirectory() as folder_laporan, override_settings(
+                ALLOWED_HOSTS=['testserver'], REPORT_JOBS_DIR=folder_laporan, REPORT_JOB_REUSE=0,
+            ), transaction.atomic():
+                konteks = self.siapkan_konteks()
+                for s in skenario:
+                    hasil['routes'][s.label] = baris = self.ukur(s, konteks, options['iterasi'], options['pemanasan'])
+                    self.stdout.write(
+                        f"{s.label:<28} {baris['p50_ms']:>8.1f} {baris['p95_ms']:>8.1f} {baris['p99_ms']:>8.1f} "
+                        f"{baris['queries']:>6} {baris['bytes']:>10} {baris['peak_kb']:>8.0f}"
+                    )
+                # Data bantu bench (admin, sesi, pekerjaan laporan) tidak disimpan
+                transaction.set_rollback(True)
+        finally:
+            celery_app.conf.CELERY_TASK_ALWAYS_EAGER = eager
+
+        self.tulis_json(options['output'], hasil)
+        if options['simpan_baseline']:
+            self.tulis_json(options['baseline'], hasil)
+            self.stdout.write(self.style.SUCCESS(f"Baseline disimpan ke {options['baseline']}"))
+            return
+
+        self.bandingkan(hasil, options)
+
+    def periksa_cakupan(self, skenario):
+        routes = {s.route for s in skenario}
+        nama = {p.name for p in core_urls.urlpatterns + customer_urls.urlpatterns if p.name}
+        tanpa_skenario = sorted(nama - routes)
+        if tanpa_skenario:
+            raise CommandError(f"Route tanpa skenario bench: {', '.join(tanpa_skenario)}")
+
+    def siapkan_konteks(self):
+        penyewaan = Penyewaan.objects.order_by('pk').select_related('idPelanggan').first()
+        barang = list(Barang.objects.filter(stok__gt=0).order_by('pk')[:3])
+        if penyewaan is None or not barang:
+            raise CommandError("Database kosong. Jalankan 'python manage.py seed_bench' terlebih dahulu.")
+
+        pelanggan = penyewaan.idPelanggan
+        admin = User.objects.create_superuser('bench-admin', 'bench@example.com', 'bench-admin-123')
+        ItemKeranjang.objects.filter(idPelanggan=pelanggan).delete()
+        ItemKeranjang.objects.bulk_create([ItemKeranjang(idPelanggan=pelanggan, idBarang=b, jumlah=1) for b in barang])
+
+        klien = {'anonim': Client(), 'pelanggan': Client(), 'admin': Client()}
+        session = klien['pelanggan'].session
+        session['pelanggan_id'] = pelanggan.pk
+        session.save()
+        klien['pelanggan'].cookies['sessionid'] = session.session_key
+        klien['admin'].force_login(admin, backend='django.contrib.auth.backends.ModelBackend')
+        pekerjaan = report_jobs.enqueue('report_penyewaan', 'csv', {}, '', result_version(Penyewaan), user=admin)
+
+        return {
+            'klien': klien,
+            'barang_id': barang[0].pk,
+            'penyewaan_id': penyewaan.pk,
+            'pekerjaan_id': pekerjaan.pk,
+            'noHp': pelanggan.noHp,
+        }
+
+    def kirim(self, s, konteks, url):
+        """Satu permintaan di dalam savepoint yang di-rollback, dengan cookie klien dipulihkan."""
+        client = konteks['klien'][s.peran]
+        cookies = copy.deepcopy(client.cookies)
+        try:
+            with transaction.atomic():
+                if s.method == 'post':
+                    response = client.post(url, s.post_data(konteks))
+                else:
+                    response = client.get(url)
+                if s.ikuti_pekerjaan:
+                    response = self.ikuti_pekerjaan(client, response)
+                ukuran = len(b''.join(response.streaming_content)) if response.streaming else len(response.content)
+                transaction.set_rollback(True)
+        finally:
+            client.cookies = cookies
+        return response, ukuran
+
+    def ikuti_pekerjaan(self, client, response):
+        """Dari redirect PDF/ekspor: buka halaman pekerjaan, baca statusnya, lalu unduh berkasnya."""
+        pk = resolve(response['Location']).kwargs['pk']
+        client.get(response['Location'])
+        status = client.get(reverse('report_job_status', kwargs={'pk': pk})).json()
+        if status['status'] != 'Selesai':
+            raise CommandError(f"Pekerjaan laporan {pk} tidak selesai: {status['status']} {status['pesan']}")
+        return client.get(status['unduh'])
+
+    def ukur(self, s, konteks, iterasi, pemanasan):
+        url = s.url(konteks)
+        for _ in range(pemanasan):
+            self.kirim(s, konteks, url)
+
+        latensi = []
+        for _ in range(iterasi):
+            mulai = time.perf_counter()
+            self.kirim(s, konteks, url)
+            latensi.append((time.perf_counter() - mulai) * 1000)
+        latensi.sort()
+
+        # Query dan ukuran respons diukur terpisah agar pencatatan query tidak ikut menambah latensi
+        with CaptureQueriesContext(connection) as ctx:
+            response, ukuran = self.kirim(s, konteks, url)
+        # Savepoint bench sendiri tidak dihitung
+        queries = sum(1 for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql'])
+
+        tracemalloc.start()
+        try:
+            self.kirim(s, konteks, url)
+            _, puncak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(persentil(latensi, 50), 2),
+            'p95_ms': round(persentil(latensi, 95), 2),
+            'p99_ms': round(persentil(latensi, 99), 2),
+            'mean_ms': round(statistics.fmean(latensi), 2),
+            'queries': queries,
+            'bytes': ukuran,
+            'peak_kb': round(puncak / 1024, 1),
+        }
+
+    def tulis_json(self, path, data):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+
+    def bandingkan(self, hasil, options):
+        path = Path(options['baseline'])
+        if not path.exists():
+            self.stdout.write(self.style.WARNING(
+                f"Baseline {path} belum ada; jalankan dengan --simpan-baseline untuk membuatnya."
+            ))
+            return
+
+        baseline = json.loads(path.read_text())['routes']
+        ambang = options['ambang']
+        regresi = []
+        for label, baru in hasil['routes'].items():
+            lama = baseline.get(label)
+            if lama is None:
+                continue
+            if baru['p95_ms'] > lama['p95_ms'] * (1 + ambang) and baru['p95_ms'] - lama['p95_ms'] > options['min_ms']:
+                regresi.append(f"{label}: p95 {lama['p95_ms']} -> {baru['p95_ms']} ms")
+            if baru['queries'] > lama['queries']:
+                regresi.append(f"{label}: query {lama['queries']} -> {baru['queries']}")
+            if baru['peak_kb'] > lama['peak_kb'] * (1 + ambang) and baru['peak_kb'] - lama['peak_kb'] > 256:
+                regresi.append(f"{label}: memori {lama['peak_kb']} -> {baru['peak_kb']} KB")
+
+        if regresi:
+            for baris in regresi:
+                self.stderr.write(self.style.ERROR(f"REGRESI {baris}"))
+            raise CommandError(f"{len(regresi)} regresi dibanding baseline {path}.")
+        self.stdout.write(self.style.SUCCESS(f"Tidak ada regresi dibanding baseline {path}."))
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import platform
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core.models import Penyewaan
+
+from .bench import persentil
+
+
+def daftar_halaman(penyewaan_id):
+    """Halaman pelanggan yang dilayani view async (label, path). Semua diminta sebagai pelanggan yang login."""
+    return [
+        ('katalog', reverse('katalog_barang')),
+        ('riwayat', reverse('rental_history')),
+        ('detail sewa', reverse('rental_detail', kwargs={'pk': penyewaan_id})),
+        ('keranjang', reverse('view_cart')),
+        ('akun', reverse('akun_pelanggan')),
+    ]
+
+
+def port_bebas(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+async def _get(host, port, path, cookie):
+    """Satu GET HTTP/1.1 mentah; mengembalikan (status, durasi_ms)."""
+    mulai = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((
+        f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nCookie: {cookie}\r\n'
+        'Connection: close\r\n\r\n'
+    ).encode())
+    await writer.drain()
+    baris_status = await reader.readline()
+    await reader.read()  # Sisa header dan body
+    writer.close()
+    await writer.wait_closed()
+    status = int(baris_status.split()[1]) if baris_status else 0
+    return status, (time.perf_counter() - mulai) * 1000
+
+
+async def serang(host, port, path, cookie, jumlah, konkurensi):
+    """Kirim `jumlah` GET dengan paling banyak `konkurensi` koneksi terbuka bersamaan."""
+    antrean = iter(range(jumlah))
+    latensi, gagal = [], 0
+
+    async def pekerja():
+        nonlocal gagal
+        for _ in antrean:
+            try:
+                status, ms = await _get(host, port, path, cookie)
+            except OSError:
+                gagal += 1
+                continue
+            if status != 200:
+                gagal += 1
+            latensi.append(ms)
+
+    mulai = time.perf_counter()
+    await asyncio.gather(*(pekerja() for _ in range(konkurensi)))
+    durasi = time.perf_counter() - mulai
+    latensi.sort()
+    return {
+        'rps': round(jumlah / durasi, 1),
+        'p50_ms': round(persentil(latensi, 50), 1) if latensi else None,
+        'p95_ms': round(persentil(latensi, 95), 1) if latensi else None,
+        'p99_ms': round(persentil(latensi, 99), 1) if latensi else None,
+        'gagal': gagal,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Bandingkan halaman pelanggan async di jalur ASGI (daphne) dengan jalur WSGI "
+        "(server WSGI ber-thread bawaan Django) pada konkurensi tinggi. Kedua server dijalankan "
+        "sebagai subprocess dengan settings yang sama. Jalankan seed_bench terlebih dahulu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--konkurensi', type=int, default=100, help="Koneksi bersamaan per halaman (default 100).")
+        parser.add_argument('--permintaan', type=int, default=1000, help="Jumlah GET per halaman per server (default 1000).")
+        parser.add_argument('--pemanasan', type=int, default=20, help="GET pemanasan per halaman (default 20).")
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--output', default='bench/asgi.json', help="File JSON hasil (default bench/asgi.json).")
+
+    def handle(self, *args, **options):
+        penyewaan = Penyewaan.objects.order_by('pk').first()
+        if penyewaan is None:
+            raise CommandError("Database kosong. Jalankan 'python manage.py seed_bench' terlebih dahulu.")
+
+        # Sesi pelanggan sungguhan di database, dihapus lagi setelah bench
+        session = SessionStore()
+        session['pelanggan_id'] = penyewaan.idPelanggan_id
+        session.create()
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+        halaman = daftar_halaman(penyewaan.pk)
+        host = options['host']
+
+        manage = str(Path(settings.BASE_DIR) / 'manage.py')
+        server = {
+            'wsgi': lambda port: [sys.executable, manage, 'runserver', f'{host}:{port}',
+                                  '--noreload', '--skip-checks'],
+            'asgi': lambda port: [sys.executable, '-m', 'daphne', '-b', host, '-p', str(port),
+                                  'PasirMas.asgi:application'],
+        }
+
+        hasil = {
+            'meta': {
+                'waktu': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'konkurensi': options['konkurensi'],
+                'permintaan': options['permintaan'],
+            },
+            'wsgi': {},
+            'asgi': {},
+        }
+        try:
+            for jalur, perintah in server.items():
+                port = port_bebas(host)
+                proses = subprocess.Popen(perintah(port), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                try:
+                    self.tunggu_siap(host, port, proses)
+                    for label, path in halaman:
+                        asyncio.run(serang(host, port, path, cookie, options['pemanasan'], 4))
+                        hasil[jalur][label] = asyncio.run(
+                            serang(host, port, path, cookie, options['permintaan'], options['konkurensi'])
+                        )
+                finally:
+                    proses.terminate()
+                    proses.wait(timeout=10)
+        finally:
+            session.delete()
+
+        self.laporkan(hasil, halaman)
+        path = Path(options['output'])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(hasil, indent=2, ensure_ascii=False))
+
+    def tunggu_siap(self, host, port, proses, batas=30):
+        mulai = time.monotonic()
+        while time.monotonic() - mulai < batas:
+            if proses.poll() is not None:
+                raise CommandError(f"Server berhenti saat start (kode {proses.returncode}): {' '.join(proses.args)}")
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Server di port {port} tidak siap dalam {batas} detik.")
+
+    def laporkan(self, hasil, halaman):
+        self.stdout.write(
+            f"Konkurensi {hasil['meta']['konkurensi']}, {hasil['meta']['permintaan']} GET per halaman"
+        )
+        self.stdout.write(
+            f"{'halaman':<14} {'jalur':<5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'gagal':>6}"
+        )
+        for label, _ in halaman:
+            for jalur in ('wsgi', 'asgi'):
+                baris = hasil[jalur][label]
+                p50, p95, p99 = (baris[k] if baris[k] is not None else '-' for k in ('p50_ms', 'p95_ms', 'p99_ms'))
+                self.stdout.write(
+                    f"{label:<14} {jalur:<5} {baris['rps']:>8.1f} {p50:>8} {p95:>8} {p99:>8} {baris['gagal']:>6}"
+                )
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management.base import BaseCommand
+
+from core.models import Pelanggan
+
+
+class Command(BaseCommand):
+    help = (
+        "Ukur berapa login pelanggan per detik per core yang bisa dilayani "
+        "dengan setting PASSWORD_HASHERS saat ini (satu verifikasi password per login)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=3.0, help="Lama pengukuran dalam detik (default 3).")
+
+    def handle(self, *args, **options):
+        hasher = get_hasher()
+        password = 'bench-password-123'
+        pelanggan = Pelanggan(namaPelanggan='bench', noHp='0', password=make_password(password))
+
+        # Pemanasan agar import/hasher siap sebelum diukur
+        pelanggan.check_password(password)
+
+        jumlah = 0
+        mulai = time.perf_counter()
+        batas = mulai + options['duration']
+        while time.perf_counter() < batas:
+            pelanggan.check_password(password)
+            jumlah += 1
+        durasi = time.perf_counter() - mulai
+
+        per_detik = jumlah / durasi
+        self.stdout.write(f"Hasher        : {hasher.algorithm} ({settings.PASSWORD_HASHERS[0]})")
+        self.stdout.write(f"Iterasi       : {getattr(hasher, 'iterations', getattr(hasher, 'rounds', '-'))}")
+        self.stdout.write(f"Waktu/verif.  : {1000 / per_detik:.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Login/detik/core : {per_detik:.1f}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import report_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Terapkan masa simpan pekerjaan laporan: hapus pekerjaan dan berkas PDF/ekspor yang lebih tua "
+        "dari REPORT_JOB_RETENTION, dan tandai pekerjaan yang macet sebagai gagal."
+    )
+
+    def handle(self, *args, **options):
+        jumlah = report_jobs.purge()
+        self.stdout.write(self.style.SUCCESS(f"{jumlah} pekerjaan laporan kedaluwarsa dihapus."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import revenue
+
+
+class Command(BaseCommand):
+    help = (
+        "Bandingkan tabel fakta pendapatan harian (jumlah, total dan kumulatifnya) dengan "
+        "tabel Penyewaan. Keluar dengan kode 1 jika ada selisih."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perbaiki', action='store_true', help="Bangun ulang fakta harian jika ada selisih.")
+        parser.add_argument('--tampilkan', type=int, default=20, help="Jumlah selisih yang ditampilkan (default 20).")
+
+    def handle(self, *args, **options):
+        selisih = revenue.check()
+        if not selisih:
+            self.stdout.write(self.style.SUCCESS("Pendapatan harian konsisten dengan tabel Penyewaan."))
+            return
+
+        self.stdout.write(self.style.WARNING(f"{len(selisih)} baris pendapatan harian berbeda:"))
+        self.stdout.write(f"{'status':<10} {'tanggal':<10}  tersimpan -> seharusnya (jumlah, total, kumulatif jumlah, kumulatif total)")
+        for status, tanggal, tersimpan, seharusnya in selisih[:options['tampilkan']]:
+            self.stdout.write(f"{status:<10} {tanggal}  {tersimpan} -> {seharusnya}")
+
+        if options['perbaiki']:
+            revenue.rebuild()
+            self.stdout.write(self.style.SUCCESS("Pendapatan harian berhasil dibangun ulang."))
+            return
+        raise CommandError("Pendapatan harian tidak konsisten. Jalankan dengan --perbaiki untuk membangun ulang.")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.images import generate_derivatives
+from core.models import Barang
+
+
+class Command(BaseCommand):
+    help = "Buat turunan foto (thumb/card/detail, WebP dan JPEG) untuk semua Barang yang memiliki foto."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Buat ulang turunan meskipun sudah ada.")
+
+    def handle(self, *args, **options):
+        jumlah = gagal = 0
+        for barang in Barang.objects.exclude(foto='').exclude(foto__isnull=True).only('pk', 'foto', 'fotoHash'):
+            try:
+                foto_hash = generate_derivatives(barang.foto, force=options['force'])
+            except (OSError, ValueError) as e:
+                gagal += 1
+                self.stderr.write(f"Barang {barang.pk}: {e}")
+                continue
+            if foto_hash != barang.fotoHash:
+                Barang.objects.filter(pk=barang.pk).update(fotoHash=foto_hash)
+            jumlah += 1
+        self.stdout.write(self.style.SUCCESS(f"Turunan foto dibuat untuk {jumlah} barang ({gagal} gagal)."))
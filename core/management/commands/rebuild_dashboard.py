@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.dashboard import rebuild
+
+
+class Command(BaseCommand):
+    help = "Bangun ulang snapshot dashboard admin (kartu total dan pendapatan bulanan) dari data sumber."
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write(self.style.SUCCESS("Snapshot dashboard berhasil dibangun ulang."))
@@ -0,0 +1,255 @@
+import random
+import string
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from core import availability, dashboard, page_cache, revenue
+from core.availability import STATUS_AKTIF
+from core.models import (
+    Barang, DetailSewa, ItemKeranjang, PemakaianHarian, Pelanggan, PendapatanHarian, Penyewaan, RingkasanDashboard,
+)
+
+# Password semua pelanggan hasil seed (hash dihitung sekali saja)
+PASSWORD_BENCH = 'bench12345'
+
+NAMA_DEPAN = [
+    'Andi', 'Budi', 'Citra', 'Dewi', 'Eka', 'Fajar', 'Gita', 'Hendra', 'Indah', 'Joko', 'Kartika', 'Lestari',
+    'Maria', 'Novi', 'Oktavia', 'Putra', 'Rina', 'Sari', 'Teguh', 'Umar', 'Vina', 'Wahyu', 'Yohanes', 'Zainal',
+]
+NAMA_BELAKANG = [
+    'Saputra', 'Wijaya', 'Lestari', 'Pratama', 'Siregar', 'Nainggolan', 'Manafe', 'Ndun', 'Lado', 'Bria',
+    'Fanggidae', 'Kase', 'Tanone', 'Riwu', 'Messakh', 'Pello',
+]
+JALAN = ['Jl. El Tari', 'Jl. Timor Raya', 'Jl. Frans Seda', 'Jl. W.J. Lalamentik', 'Jl. Soekarno', 'Jl. Adisucipto']
+
+# (nama, harga_min, harga_maks, stok_min, stok_maks, daftar ukuran)
+JENIS_BARANG = [
+    ('Tenda', 250000, 1500000, 5, 40, ['3x3 m', '4x6 m', '5x10 m', '10x20 m']),
+    ('Kursi Futura', 3000, 8000, 100, 1500, ['Standar']),
+    ('Kursi Tiffany', 10000, 25000, 50, 400, ['Standar']),
+    ('Meja Bulat', 25000, 60000, 20, 150, ['120 cm', '150 cm']),
+    ('Meja Prasmanan', 40000, 90000, 10, 60, ['180 cm', '240 cm']),
+    ('Panggung', 500000, 3000000, 2, 15, ['4x6 m', '6x8 m']),
+    ('Sound System', 300000, 2500000, 2, 20, ['500 W', '1000 W', '3000 W']),
+    ('Lampu Sorot', 50000, 200000, 10, 80, ['Kecil', 'Besar']),
+    ('Karpet', 20000, 75000, 20, 200, ['2x3 m', '3x4 m']),
+    ('Kipas Angin', 35000, 90000, 10, 100, ['Berdiri', 'Blower']),
+    ('Genset', 400000, 1500000, 2, 10, ['5 kVA', '10 kVA']),
+    ('Dekorasi Pelaminan', 750000, 5000000, 1, 10, ['Adat', 'Modern']),
+]
+
+# Bulan ramai acara (pernikahan/akhir tahun) mendapat bobot lebih besar
+BOBOT_BULAN = {1: 0.8, 2: 0.7, 3: 0.8, 4: 0.9, 5: 1.1, 6: 1.3, 7: 1.4, 8: 1.2, 9: 1.0, 10: 1.1, 11: 1.2, 12: 1.6}
+# Acara lebih sering di akhir pekan (Senin=0 ... Minggu=6)
+BOBOT_HARI = [0.5, 0.5, 0.6, 0.6, 1.0, 2.2, 2.0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Isi database dengan data sintetis berukuran besar (Pelanggan, Barang, Penyewaan, DetailSewa) "
+        "untuk pengukuran performa. Hasilnya deterministik untuk --seed dan --tanggal-akhir yang sama."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pelanggan', type=int, default=2000, help="Jumlah pelanggan (default 2000).")
+        parser.add_argument('--barang', type=int, default=120, help="Jumlah barang (default 120).")
+        parser.add_argument('--penyewaan', type=int, default=20000, help="Jumlah penyewaan (default 20000).")
+        parser.add_argument('--item-maks', type=int, default=5, help="Maksimum DetailSewa per penyewaan (default 5).")
+        parser.add_argument('--tahun', type=int, default=3, help="Rentang riwayat penyewaan dalam tahun (default 3).")
+        parser.add_argument('--tanggal-akhir', type=date.fromisoformat, default=None,
+                            help="Tanggal 'hari ini' untuk data (YYYY-MM-DD, default hari ini).")
+        parser.add_argument('--seed', type=int, default=42, help="Seed generator acak (default 42).")
+        parser.add_argument('--batch', type=int, default=5000, help="Ukuran batch bulk_create (default 5000).")
+        parser.add_argument('--flush', action='store_true',
+                            help="Hapus semua data Pelanggan/Barang/Penyewaan yang ada sebelum mengisi.")
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            self.flush()
+        elif Pelanggan.objects.exists() or Barang.objects.exists() or Penyewaan.objects.exists():
+            raise CommandError("Database sudah berisi data. Gunakan --flush untuk mengosongkannya terlebih dahulu.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch = options['batch']
+        self.hari_ini = options['tanggal_akhir'] or date.today()
+        mulai = time.perf_counter()
+
+        pelanggan_ids = self.seed_pelanggan(options['pelanggan'])
+        barang = self.seed_barang(options['barang'])
+        jumlah_sewa, jumlah_detail = self.seed_penyewaan(
+            options['penyewaan'], pelanggan_ids, barang, options['item_maks'], options['tahun'],
+        )
+
+        self.stdout.write("Membangun ulang pemakaian harian, snapshot dashboard, pendapatan harian dan cache halaman...")
+        availability.rebuild()
+        dashboard.rebuild()
+        revenue.rebuild()
+        page_cache.invalidate()
+
+        durasi = time.perf_counter() - mulai
+        self.stdout.write(self.style.SUCCESS(
+            f"Selesai dalam {durasi:.1f} detik: {len(pelanggan_ids)} pelanggan, {len(barang)} barang, "
+            f"{jumlah_sewa} penyewaan, {jumlah_detail} detail sewa. Password pelanggan: {PASSWORD_BENCH}"
+        ))
+
+    def flush(self):
+        self.stdout.write("Menghapus data lama...")
+        # DELETE langsung tanpa signal per baris; urutan mengikuti FK
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in (DetailSewa, PemakaianHarian, ItemKeranjang, Penyewaan, Barang, Pelanggan,
+                          RingkasanDashboard, PendapatanHarian):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+
+    def next_pk(self, model):
+        return (model.objects.aggregate(terakhir=Max('pk'))['terakhir'] or 0) + 1
+
+    def seed_pelanggan(self, jumlah):
+        rng = self.rng
+        # Salt dari generator acak juga, agar hash password ikut deterministik
+        password = make_password(PASSWORD_BENCH, salt=''.join(rng.choices(string.ascii_letters + string.digits, k=22)))
+        awal = self.next_pk(Pelanggan)
+        with transaction.atomic():
+            for mulai in range(0, jumlah, self.batch):
+                Pelanggan.objects.bulk_create([
+                    Pelanggan(
+                        idPelanggan=awal + i,
+                        namaPelanggan=f'{rng.choice(NAMA_DEPAN)} {rng.choice(NAMA_BELAKANG)}',
+                        noHp=f'08{awal + i:011d}',
+                        password=password,
+                    )
+                    for i in range(mulai, min(mulai + self.batch, jumlah))
+                ])
+        self.stdout.write(f"  {jumlah} pelanggan")
+        return list(range(awal, awal + jumlah))
+
+    def seed_barang(self, jumlah):
+        rng = self.rng
+        awal = self.next_pk(Barang)
+        daftar = []
+        for i in range(jumlah):
+            nama, harga_min, harga_maks, stok_min, stok_maks, ukuran = JENIS_BARANG[i % len(JENIS_BARANG)]
+            seri = i // len(JENIS_BARANG) + 1
+            harga = Decimal(rng.randint(harga_min // 1000, harga_maks // 1000) * 1000)
+            ukuran_barang = rng.choice(ukuran)
+            daftar.append(Barang(
+                idBarang=awal + i,
+                namaBarang=f'{nama} {seri:03d}',
+                harga=harga,
+                stok=rng.randint(stok_min, stok_maks),
+                deskripsi=f'{nama} untuk acara, ukuran {ukuran_barang}.',
+                ukuran=ukuran_barang,
+            ))
+        with transaction.atomic():
+            Barang.objects.bulk_create(daftar, batch_size=self.batch)
+        self.stdout.write(f"  {jumlah} barang")
+        return daftar
+
+    def tanggal_acara(self, hari_list, bobot_kumulatif):
+        return self.rng.choices(hari_list, cum_weights=bobot_kumulatif)[0]
+
+    def status_sewa(self, tanggal_acara, tanggal_pesan):
+        """Campuran status yang masuk akal terhadap 'hari ini'."""
+        r = self.rng.random()
+        if tanggal_acara < self.hari_ini - timedelta(days=3):
+            # Acara sudah lewat: sebagian besar selesai
+            return 'Completed' if r < 0.86 else 'Cancelled'
+        if tanggal_acara < self.hari_ini:
+            return 'Confirmed' if r < 0.6 else ('Completed' if r < 0.9 else 'Cancelled')
+        # Acara mendatang: pesanan yang baru masuk lebih sering masih Pending
+        if (self.hari_ini - tanggal_pesan).days < 3:
+            return 'Pending' if r < 0.7 else ('Confirmed' if r < 0.95 else 'Cancelled')
+        return 'Confirmed' if r < 0.65 else ('Pending' if r < 0.9 else 'Cancelled')
+
+    def seed_penyewaan(self, jumlah, pelanggan_ids, barang, item_maks, tahun):
+        rng = self.rng
+        # Jadwal acara: dari `tahun` tahun lalu sampai 120 hari ke depan, berbobot bulan dan hari
+        pertama = self.hari_ini - timedelta(days=365 * tahun)
+        hari_list = [pertama + timedelta(days=i) for i in range((self.hari_ini - pertama).days + 121)]
+        bobot_kumulatif = []
+        total = 0.0
+        for h in hari_list:
+            total += BOBOT_BULAN[h.month] * BOBOT_HARI[h.weekday()]
+            bobot_kumulatif.append(total)
+
+        # Barang murah/kecil (kursi, meja) jauh lebih sering disewa daripada panggung/genset
+        bobot_barang = []
+        total = 0.0
+        for b in barang:
+            total += 1.0 / (float(b.harga) ** 0.35)
+            bobot_barang.append(total)
+        # Unit yang sudah dipesan penyewaan aktif per (barang, hari), agar data tidak overbooking
+        terpakai = defaultdict(int)
+
+        field_tanggal_pesan = Penyewaan._meta.get_field('tanggalPesan')
+        awal_pk_sewa = self.next_pk(Penyewaan)
+        awal_pk_detail = self.next_pk(DetailSewa)
+        jumlah_detail = 0
+
+        # tanggalPesan memakai auto_now_add; dimatikan sementara agar tanggal historis tersimpan
+        field_tanggal_pesan.auto_now_add = False
+        try:
+            for mulai in range(0, jumlah, self.batch):
+                sewa_batch, detail_batch = [], []
+                for i in range(mulai, min(mulai + self.batch, jumlah)):
+                    pk = awal_pk_sewa + i
+                    acara = self.tanggal_acara(hari_list, bobot_kumulatif)
+                    durasi = rng.choices((1, 2, 3, 4, 5), weights=(50, 25, 13, 7, 5))[0]
+                    bongkar = acara + timedelta(days=durasi + 1)
+                    pesan = min(acara - timedelta(days=int(rng.expovariate(1 / 14))), self.hari_ini)
+                    status = self.status_sewa(acara, pesan)
+                    hari_sewa = [acara + timedelta(days=d) for d in range((bongkar - acara).days + 1)]
+
+                    total_bayar = Decimal('0')
+                    dipilih = set()
+                    for _ in range(rng.randint(1, item_maks)):
+                        b = rng.choices(barang, cum_weights=bobot_barang)[0]
+                        if b.pk in dipilih:
+                            continue
+                        jumlah_barang = max(1, min(b.stok, int(rng.paretovariate(1.5) * b.stok / 20)))
+                        if status in STATUS_AKTIF:
+                            bebas = b.stok - max(terpakai[(b.pk, h)] for h in hari_sewa)
+                            jumlah_barang = min(jumlah_barang, bebas)
+                            if jumlah_barang <= 0:
+                                continue
+                            for h in hari_sewa:
+                                terpakai[(b.pk, h)] += jumlah_barang
+                        dipilih.add(b.pk)
+
+                        status_barang, bermasalah = 'Baik', 0
+                        if status == 'Completed' and rng.random() < 0.04:
+                            status_barang = 'Rusak' if rng.random() < 0.8 else 'Hilang'
+                            bermasalah = rng.randint(1, jumlah_barang)
+                        sub_total = b.harga * jumlah_barang
+                        total_bayar += sub_total
+                        detail_batch.append(DetailSewa(
+                            idDetailSewa=awal_pk_detail + jumlah_detail,
+                            idPenyewaan_id=pk, idBarang_id=b.pk, jumlahBarang=jumlah_barang,
+                            statusBarang=status_barang, jumlahBermasalah=bermasalah, subTotal=sub_total,
+                        ))
+                        jumlah_detail += 1
+
+                    sewa_batch.append(Penyewaan(
+                        idPenyewaan=pk, tanggalPesan=pesan, tanggalAcara=acara, durasiSewa=durasi,
+                        tanggalPembongkaran=bongkar, totalBayar=total_bayar, statusSewa=status,
+                        feedback='Pelayanan memuaskan.' if status == 'Completed' and rng.random() < 0.2 else None,
+                        alamatPemasangan=f'{rng.choice(JALAN)} No. {rng.randint(1, 250)}, Kupang',
+                        idPelanggan_id=rng.choice(pelanggan_ids),
+                    ))
+
+                # bulk_create melewati DetailSewa.save(), sehingga tidak ada logika stok per baris;
+                # pemakaian harian dibangun ulang sekali di akhir. Satu transaksi per batch besar.
+                with transaction.atomic():
+                    Penyewaan.objects.bulk_create(sewa_batch)
+                    DetailSewa.objects.bulk_create(detail_batch, batch_size=self.batch)
+                self.stdout.write(f"  {min(mulai + self.batch, jumlah)}/{jumlah} penyewaan")
+        finally:
+            field_tanggal_pesan.auto_now_add = True
+
+        return jumlah, jumlah_detail
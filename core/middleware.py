@@ -0,0 +1,141 @@
+# core/middleware.py
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from . import profiling
+from .models import Pelanggan
+
+
+def pelanggan_cache_key(pelanggan_id):
+    return f'pelanggan:{pelanggan_id}'
+
+
+def _load_pelanggan(request):
+    pelanggan_id = request.session.get('pelanggan_id')
+    if not pelanggan_id:
+        return None
+
+    # Cache singkat (opsional) agar request berikutnya tidak perlu query
+    timeout = getattr(settings, 'PELANGGAN_CACHE_TIMEOUT', 0)
+    if timeout:
+        pelanggan = cache.get(pelanggan_cache_key(pelanggan_id))
+        if pelanggan is not None:
+            return pelanggan
+
+    try:
+        pelanggan = Pelanggan.objects.get(idPelanggan=pelanggan_id)
+    except Pelanggan.DoesNotExist:
+        return None
+
+    if timeout:
+        cache.set(pelanggan_cache_key(pelanggan_id), pelanggan, timeout)
+    return pelanggan
+
+
+def get_pelanggan(request):
+    """Pelanggan yang login pada request ini, dimuat paling banyak sekali per request."""
+    if not hasattr(request, '_cached_pelanggan'):
+        request._cached_pelanggan = _load_pelanggan(request)
+    return request._cached_pelanggan
+
+
+async def aload_session(request):
+    """
+    Muat session request ini di thread. View async memanggilnya sebelum membaca
+    request.session (template juga membacanya), karena memuat session adalah
+    query database yang tidak boleh dijalankan dari event loop.
+    """
+    await sync_to_async(request.session.get)('pelanggan_id')
+
+
+async def aget_pelanggan(request):
+    """Versi async get_pelanggan() untuk view async."""
+    if not hasattr(request, '_cached_pelanggan'):
+        request._cached_pelanggan = await sync_to_async(_load_pelanggan)(request)
+    return request._cached_pelanggan
+
+
+class PelangganMiddleware:
+    """
+    Menyediakan `request.pelanggan` secara lazy (bernilai falsy jika belum login).
+    Harus diletakkan setelah SessionMiddleware. Mendukung mode sync dan async
+    agar rantai middleware di bawah ASGI tetap async sampai ke view async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.pelanggan = SimpleLazyObject(lambda: get_pelanggan(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.pelanggan = SimpleLazyObject(lambda: get_pelanggan(request))
+        return await self.get_response(request)
+
+
+class SQLProfilingMiddleware:
+    """
+    Catat jumlah query, waktu SQL, query berulang dan statement terlambat
+    untuk sebagian request (SQL_PROFILING_SAMPLE_RATE), lihat core/profiling.py.
+    Hasilnya bisa dilihat di halaman admin "Profil SQL".
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        rate = profiling.sample_rate()
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+
+        recorder = profiling.QueryRecorder()
+        mulai = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        profiling.record(request, response, recorder, (time.perf_counter() - mulai) * 1000)
+        return response
+
+    async def __acall__(self, request):
+        rate = profiling.sample_rate()
+        if rate <= 0 or random.random() >= rate:
+            return await self.get_response(request)
+
+        # Query ORM async berjalan di thread milik request (thread_sensitive),
+        # jadi execute_wrapper dipasang dan dilepas di thread yang sama
+        recorder = profiling.QueryRecorder()
+        stack = ExitStack()
+
+        def pasang():
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+
+        mulai = time.perf_counter()
+        await sync_to_async(pasang)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        profiling.record(request, response, recorder, (time.perf_counter() - mulai) * 1000)
+        return response
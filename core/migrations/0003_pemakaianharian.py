@@ -0,0 +1,64 @@
+# Generated by Django 4.2 on 2026-10-18 07:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import timedelta
+
+
+def isi_pemakaian_harian(apps, schema_editor):
+    """
+    Sebelumnya stok dikurangi saat checkout dan baru dikembalikan saat status
+    'Completed'. Kembalikan unit tersebut ke stok (stok = jumlah unit dimiliki)
+    lalu catat pemesanan aktif sebagai pemakaian harian.
+    """
+    Barang = apps.get_model('core', 'Barang')
+    DetailSewa = apps.get_model('core', 'DetailSewa')
+    PemakaianHarian = apps.get_model('core', 'PemakaianHarian')
+
+    belum_kembali = defaultdict(int)
+    per_hari = defaultdict(int)
+    rows = DetailSewa.objects.exclude(idPenyewaan__statusSewa='Completed').values_list(
+        'idBarang_id', 'jumlahBarang', 'idPenyewaan__statusSewa',
+        'idPenyewaan__tanggalAcara', 'idPenyewaan__tanggalPembongkaran',
+    )
+    for barang_id, jumlah, status, mulai, selesai in rows:
+        belum_kembali[barang_id] += jumlah
+        if status in ('Pending', 'Confirmed'):
+            for i in range((selesai - mulai).days + 1):
+                per_hari[(barang_id, mulai + timedelta(days=i))] += jumlah
+
+    for barang_id, jumlah in belum_kembali.items():
+        Barang.objects.filter(pk=barang_id).update(stok=models.F('stok') + jumlah)
+
+    PemakaianHarian.objects.bulk_create(
+        [PemakaianHarian(idBarang_id=b, tanggal=h, jumlahDipesan=j) for (b, h), j in per_hari.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_detailsewa_jumlahbermasalah'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PemakaianHarian',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tanggal', models.DateField()),
+                ('jumlahDipesan', models.PositiveIntegerField(default=0)),
+                ('idBarang', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.barang')),
+            ],
+            options={
+                'verbose_name': 'Pemakaian Harian',
+                'verbose_name_plural': 'Pemakaian Harian',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pemakaianharian',
+            constraint=models.UniqueConstraint(fields=('idBarang', 'tanggal'), name='unik_pemakaian_barang_tanggal'),
+        ),
+        migrations.RunPython(isi_pemakaian_harian, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_pemakaianharian'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RingkasanDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kunci', models.CharField(max_length=40, unique=True)),
+                ('nilai', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('diperbarui', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Ringkasan Dashboard',
+                'verbose_name_plural': 'Ringkasan Dashboard',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_ringkasandashboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='barang',
+            name='fotoHash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_barang_fotohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='barang',
+            index=models.Index(condition=models.Q(('stok__gt', 0)), fields=['namaBarang'], name='barang_tersedia_nama_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detailsewa',
+            index=models.Index(fields=['statusBarang', 'idPenyewaan'], name='detail_status_sewa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='penyewaan',
+            index=models.Index(fields=['statusSewa', 'tanggalPesan'], name='sewa_status_tglpesan_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='penyewaan',
+            index=models.Index(fields=['tanggalPesan'], name='sewa_tglpesan_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='penyewaan',
+            index=models.Index(fields=['idPelanggan', '-tanggalPesan'], name='sewa_pelanggan_tglpesan_idx'),
+        ),
+    ]
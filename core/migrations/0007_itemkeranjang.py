@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 07:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_index_laporan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemKeranjang',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jumlah', models.PositiveIntegerField(default=0)),
+                ('diperbarui', models.DateTimeField(auto_now=True)),
+                ('idBarang', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.barang')),
+                ('idPelanggan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.pelanggan')),
+            ],
+            options={
+                'verbose_name': 'Item Keranjang',
+                'verbose_name_plural': 'Item Keranjang',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='itemkeranjang',
+            constraint=models.UniqueConstraint(fields=('idPelanggan', 'idBarang'), name='unik_keranjang_pelanggan_barang'),
+        ),
+    ]
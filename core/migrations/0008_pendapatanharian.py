@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-18 07:56
+
+from django.db import migrations, models
+
+
+def isi_pendapatan_harian(apps, schema_editor):
+    # Bangun fakta awal dari Penyewaan yang sudah ada (lihat core/revenue.py)
+    from django.db.models import Count, Sum
+
+    Penyewaan = apps.get_model('core', 'Penyewaan')
+    PendapatanHarian = apps.get_model('core', 'PendapatanHarian')
+    rows = []
+    kumulatif = {}
+    per_hari = (
+        Penyewaan.objects.order_by('statusSewa', 'tanggalPesan')
+        .values('statusSewa', 'tanggalPesan')
+        .annotate(jumlah=Count('pk'), total=Sum('totalBayar'))
+    )
+    for row in per_hari:
+        status = row['statusSewa']
+        total = row['total'] or 0
+        awal_jumlah, awal_total = kumulatif.get(status, (0, 0))
+        kumulatif[status] = (awal_jumlah + row['jumlah'], awal_total + total)
+        rows.append(PendapatanHarian(
+            statusSewa=status, tanggal=row['tanggalPesan'], jumlah=row['jumlah'], total=total,
+            kumulatifJumlah=kumulatif[status][0], kumulatifTotal=kumulatif[status][1],
+        ))
+    PendapatanHarian.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_itemkeranjang'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendapatanHarian',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tanggal', models.DateField()),
+                ('statusSewa', models.CharField(max_length=20)),
+                ('jumlah', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('kumulatifJumlah', models.IntegerField(default=0)),
+                ('kumulatifTotal', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'verbose_name': 'Pendapatan Harian',
+                'verbose_name_plural': 'Pendapatan Harian',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pendapatanharian',
+            constraint=models.UniqueConstraint(fields=('statusSewa', 'tanggal'), name='unik_pendapatan_status_tanggal'),
+        ),
+        migrations.RunPython(isi_pendapatan_harian, migrations.RunPython.noop),
+    ]
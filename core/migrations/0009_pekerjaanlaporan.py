@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-18 08:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0008_pendapatanharian'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PekerjaanLaporan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('laporan', models.CharField(max_length=50)),
+                ('format', models.CharField(max_length=10)),
+                ('parameter', models.TextField(blank=True)),
+                ('kunci', models.CharField(max_length=64)),
+                ('versiData', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('Menunggu', 'Menunggu'), ('Berjalan', 'Berjalan'), ('Selesai', 'Selesai'), ('Gagal', 'Gagal')], default='Menunggu', max_length=10)),
+                ('barisSelesai', models.IntegerField(default=0)),
+                ('barisTotal', models.IntegerField(blank=True, null=True)),
+                ('berkas', models.CharField(blank=True, max_length=255)),
+                ('pesanGalat', models.TextField(blank=True)),
+                ('dibuat', models.DateTimeField(auto_now_add=True)),
+                ('selesai', models.DateTimeField(blank=True, null=True)),
+                ('dimintaOleh', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Pekerjaan Laporan',
+                'verbose_name_plural': 'Pekerjaan Laporan',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pekerjaanlaporan',
+            index=models.Index(fields=['kunci', 'dibuat'], name='pekerjaan_laporan_kunci_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pekerjaanlaporan',
+            index=models.Index(fields=['status', 'dibuat'], name='pekerjaan_laporan_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='pekerjaanlaporan',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['Menunggu', 'Berjalan'])), fields=('kunci',), name='unik_pekerjaan_laporan_aktif'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def isi_foto_hash(apps, schema_editor):
+    """Buat turunan dan isi fotoHash untuk foto Barang yang diunggah sebelum migrasi 0005."""
+    from core.images import generate_derivatives
+
+    Barang = apps.get_model('core', 'Barang')
+    for barang in Barang.objects.exclude(foto='').exclude(foto__isnull=True).filter(fotoHash='').only('pk', 'foto'):
+        try:
+            foto_hash = generate_derivatives(barang.foto)
+        except (OSError, ValueError):
+            # File hilang atau tidak bisa dibaca: halaman tetap memakai foto asli
+            continue
+        Barang.objects.filter(pk=barang.pk).update(fotoHash=foto_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_pekerjaanlaporan'),
+    ]
+
+    operations = [
+        migrations.RunPython(isi_foto_hash, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,56 @@
-from django.db import models
-from django.db.models import F
+from django.db import models, transaction
+from django.conf import settings
 from django.contrib.auth.hashers import make_password, check_password
 from datetime import timedelta
 
+
+class TrackedFieldsMixin:
+    """
+    Mengingat nilai field di `tracked_fields` (attname) seperti yang ada di
+    database: saat dimuat, setelah save() dan setelah refresh_from_db().
+    save() pada model bisa membandingkan nilai lama dan baru lewat
+    stored_values() tanpa SELECT ulang. Perubahan lewat QuerySet.update()
+    tidak terlihat oleh instance yang sudah dimuat.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._ingat_nilai()
+        return instance
+
+    def _ingat_nilai(self, fields=None):
+        if not hasattr(self, '_nilai_tersimpan'):
+            self._nilai_tersimpan = {}
+        for nama in self.tracked_fields:
+            # Field yang di-defer (only()/defer()) belum ada di __dict__
+            if (fields is None or nama in fields) and nama in self.__dict__:
+                self._nilai_tersimpan[nama] = self.__dict__[nama]
+
+    def stored_values(self):
+        """
+        Dict nilai field terlacak sebelum save ini, None untuk baris baru.
+        Jika nilainya tidak lengkap diketahui (instance dibuat manual dengan
+        pk, atau field di-defer), dibaca dengan satu SELECT seperti biasa.
+        """
+        if not self.pk:
+            return None
+        tersimpan = getattr(self, '_nilai_tersimpan', {})
+        if not self._state.adding and len(tersimpan) == len(self.tracked_fields):
+            return dict(tersimpan)
+        return type(self)._default_manager.filter(pk=self.pk).values(*self.tracked_fields).first()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self._ingat_nilai(None if update_fields is None else set(update_fields))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._ingat_nilai(None if fields is None else set(fields))
+
+
 class Pelanggan(models.Model):
     idPelanggan = models.AutoField(primary_key=True)
     namaPelanggan = models.CharField(max_length=50)
@@ -25,7 +73,12 @@ class Pelanggan(models.Model):
         self.password = make_password(raw_password)
     
     def check_password(self, raw_password):
-        return check_password(raw_password, self.password)
+        def setter(raw_password):
+            # Hash lama (hasher/iterasi berbeda dari setting) diperbarui otomatis
+            self.set_password(raw_password)
+            if self.pk:
+                Pelanggan.objects.filter(pk=self.pk).update(password=self.password)
+        return check_password(raw_password, self.password, setter)
     
 
 class Barang(models.Model):
@@ -36,15 +89,36 @@ class Barang(models.Model):
     deskripsi = models.CharField(max_length=200)
     ukuran = models.CharField(max_length=30)
     foto = models.ImageField(upload_to='foto_barang/',blank=True,null=True,verbose_name="Foto Produk")
+    # Hash isi foto, dipakai sebagai nama file turunan (thumbnail/card/detail)
+    fotoHash = models.CharField(max_length=40, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Barang"
         verbose_name_plural = "Barang"
+        indexes = [
+            # Katalog pelanggan: stok > 0 diurutkan per nama
+            models.Index(fields=['namaBarang'], condition=models.Q(stok__gt=0), name='barang_tersedia_nama_idx'),
+        ]
     
     def __str__(self):
         return self.namaBarang
+
+    def save(self, *args, **kwargs):
+        # Foto baru diunggah (belum tersimpan di storage) atau foto dihapus:
+        # turunan lama tidak berlaku, halaman memakai foto asli dulu
+        foto_baru = bool(self.foto) and not self.foto._committed
+        if foto_baru or not self.foto:
+            self.fotoHash = ''
+
+        super().save(*args, **kwargs)
+
+        # Turunan gambar dibuat oleh task Celery setelah transaksi commit,
+        # bukan di dalam transaksi (dan jalur tulis) yang sedang menyimpan
+        if self.foto and not self.fotoHash:
+            from .tasks import buat_turunan_foto
+            transaction.on_commit(lambda: buat_turunan_foto.delay(self.pk))
     
-class Penyewaan(models.Model):
+class Penyewaan(TrackedFieldsMixin, models.Model):
     idPenyewaan = models.AutoField(primary_key=True)
     tanggalPesan = models.DateField(auto_now_add=True)
     tanggalAcara = models.DateField()
@@ -65,32 +139,51 @@ class Penyewaan(models.Model):
     class Meta:
         verbose_name = "Penyewaan"
         verbose_name_plural = "Penyewaan"
+        indexes = [
+            # Laporan penyewaan/keuangan: filter status + rentang tanggal pesan
+            models.Index(fields=['statusSewa', 'tanggalPesan'], name='sewa_status_tglpesan_idx'),
+            # Laporan dengan filter rentang tanggal saja
+            models.Index(fields=['tanggalPesan'], name='sewa_tglpesan_idx'),
+            # Riwayat sewa pelanggan, terbaru lebih dulu
+            models.Index(fields=['idPelanggan', '-tanggalPesan'], name='sewa_pelanggan_tglpesan_idx'),
+        ]
     
     def __str__(self):
-        return f'Sewa {self.idPenyewaan} oleh {self.idPelanggan.namaPelanggan}'
+        # Nama pelanggan hanya dipakai jika sudah dimuat (select_related),
+        # agar __str__ tidak memicu query per baris
+        if Penyewaan.idPelanggan.is_cached(self):
+            return f'Sewa {self.idPenyewaan} oleh {self.idPelanggan.namaPelanggan}'
+        return f'Sewa {self.idPenyewaan} oleh Pelanggan {self.idPelanggan_id}'
     
+    # Nilai lama yang dibutuhkan sync_penyewaan() dan snapshot dashboard
+    tracked_fields = ('statusSewa', 'tanggalAcara', 'tanggalPembongkaran', 'totalBayar', 'tanggalPesan')
+
     def save(self, *args, **kwargs):
-        # Simpan status lama jika ini adalah update
-        if self.pk:
-            old_status = Penyewaan.objects.get(pk=self.pk).statusSewa
-        else:
-            old_status = None
+        # Status, jadwal dan total lama jika ini adalah update (tanpa SELECT
+        # bila instance dimuat dari database)
+        lama = self.stored_values()
             
         super().save(*args, **kwargs)
         
-        # Jika status berubah menjadi 'Completed', kembalikan stok barang
-        if old_status != 'Completed' and self.statusSewa == 'Completed':
-            # Iterasi melalui semua DetailSewa yang terhubung dengan Penyewaan ini
-            for detail in self.detailsewa_set.all():
-                # Kembalikan jumlahBarang yang disewa ke Barang.stok
-                Barang.objects.filter(pk=detail.idBarang.pk).update(stok=F('stok') + detail.jumlahBarang)
+        # Jika status atau jadwal berubah, sesuaikan pemakaian harian barang.
+        # Penyewaan yang Completed/Cancelled otomatis melepaskan unitnya.
+        from .availability import sync_penyewaan
+        sync_penyewaan(self, lama)
+
+        # Perbarui snapshot dashboard admin secara inkremental
+        from .dashboard import penyewaan_changed
+        penyewaan_changed(self, lama)
+
+        # Fakta pendapatan harian untuk laporan keuangan
+        from . import revenue
+        revenue.penyewaan_changed(self, lama)
     
     @property
     def tanggalPembongkaranTerhitung(self):
         """Calculate the actual tanggal pembongkaran (H + durasi + 1)"""
         return self.tanggalAcara + timedelta(days=self.durasiSewa + 1)
 
-class DetailSewa(models.Model):
+class DetailSewa(TrackedFieldsMixin, models.Model):
     idDetailSewa = models.AutoField(primary_key=True)
     idPenyewaan = models.ForeignKey(Penyewaan, on_delete=models.CASCADE)
     idBarang = models.ForeignKey(Barang, on_delete=models.CASCADE)
@@ -103,52 +196,174 @@ class DetailSewa(models.Model):
     jumlahBermasalah = models.PositiveIntegerField(default=0, verbose_name="Jumlah Rusak/Hilang")
     # Null=True dan blank=True agar bisa dihitung otomatis di Admin
     subTotal = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    tracked_fields = ('idBarang_id', 'jumlahBarang')
     
     def save(self, *args, **kwargs):
-        # Pastikan idBarang tersedia sebelum melakukan operasi stok
-        if not self.idBarang:
+        # Pastikan idBarang tersedia sebelum melakukan operasi ketersediaan
+        if not self.idBarang_id:
             super().save(*args, **kwargs)
             return
 
-        # --- Logika Penyesuaian Stok ---
-        if self.pk:
-            # Kasus Update/Edit
-            # Ambil objek lama untuk mengetahui jumlah barang sebelumnya
-            original_detail = DetailSewa.objects.get(pk=self.pk)
-            old_jumlah = original_detail.jumlahBarang
-            
-            # Hitung perubahan stok: Stok harus berkurang sebesar (jumlahBarang baru - jumlahBarang lama)
-            # Contoh: Dari 5 menjadi 8. Perubahan = 3 (stok berkurang 3). 
-            # Contoh: Dari 8 menjadi 5. Perubahan = -3 (stok bertambah 3).
-            stok_adjustment = old_jumlah - self.jumlahBarang
-        else:
-            # Kasus Create/Baru
-            # Stok berkurang sebesar jumlahBarang yang baru
-            stok_adjustment = -self.jumlahBarang
+        # Barang & jumlah lama (jika update) untuk menghitung perubahan pemakaian
+        lama = self.stored_values()
         
         # --- Logika SubTotal ---
-        if self.idBarang and self.jumlahBarang is not None:
+        if self.jumlahBarang is not None:
             self.subTotal = self.idBarang.harga * self.jumlahBarang
 
         # Simpan DetailSewa
         super().save(*args, **kwargs)
 
-        # --- Update Stok Barang secara Atomik ---
-        # Menggunakan F() expression untuk menghindari race condition
-        Barang.objects.filter(pk=self.idBarang.pk).update(stok=F('stok') + stok_adjustment)
-
-    def delete(self, *args, **kwargs):
-        # --- Logika Pengembalian Stok saat DetailSewa dihapus ---
-        barang = self.idBarang
-        # Kembalikan jumlah barang yang disewa ke stok
-        Barang.objects.filter(pk=barang.pk).update(stok=F('stok') + self.jumlahBarang)
-        
-        # Hapus DetailSewa
-        super().delete(*args, **kwargs)
+        # --- Catat Pemakaian Harian Barang ---
+        # Stok tidak lagi dikurangi; unit dipesan pada rentang tanggal penyewaan
+        from .availability import sync_detail
+        sync_detail(self, lama)
 
     class Meta:
         verbose_name = "Detail Sewa"
         verbose_name_plural = "Detail Sewa"
+        indexes = [
+            # Laporan status barang: filter statusBarang, urut per penyewaan
+            models.Index(fields=['statusBarang', 'idPenyewaan'], name='detail_status_sewa_idx'),
+        ]
+
+    def __str__(self):
+        return f'Detail Sewa {self.idDetailSewa} untuk Sewa {self.idPenyewaan_id}'
+
+
+class PemakaianHarian(models.Model):
+    """Jumlah unit Barang yang dipesan (Pending/Confirmed) pada satu tanggal."""
+    idBarang = models.ForeignKey(Barang, on_delete=models.CASCADE)
+    tanggal = models.DateField()
+    jumlahDipesan = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Pemakaian Harian"
+        verbose_name_plural = "Pemakaian Harian"
+        constraints = [
+            # Sekaligus menjadi index (idBarang, tanggal) untuk lookup rentang
+            models.UniqueConstraint(fields=['idBarang', 'tanggal'], name='unik_pemakaian_barang_tanggal'),
+        ]
+
+    def __str__(self):
+        return f'{self.idBarang_id} @ {self.tanggal}: {self.jumlahDipesan}'
+
+
+class PendapatanHarian(models.Model):
+    """
+    Fakta harian Penyewaan per tanggalPesan dan status: jumlah penyewaan dan
+    total bayarnya, ditambah jumlah kumulatif (prefix sum) sampai tanggal itu
+    untuk status yang sama. Dikelola oleh core/revenue.py.
+    """
+    tanggal = models.DateField()
+    statusSewa = models.CharField(max_length=20)
+    jumlah = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    kumulatifJumlah = models.IntegerField(default=0)
+    kumulatifTotal = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Pendapatan Harian"
+        verbose_name_plural = "Pendapatan Harian"
+        constraints = [
+            # Sekaligus menjadi index (statusSewa, tanggal) untuk mencari
+            # baris kumulatif terakhir sebelum suatu tanggal
+            models.UniqueConstraint(fields=['statusSewa', 'tanggal'], name='unik_pendapatan_status_tanggal'),
+        ]
+
+    def __str__(self):
+        return f'{self.statusSewa} @ {self.tanggal}: {self.jumlah} / {self.total}'
+
+
+class RingkasanDashboard(models.Model):
+    """
+    Snapshot angka dashboard admin (kartu total dan pendapatan per bulan).
+    Satu baris per kunci, misalnya 'total_pelanggan' atau 'pendapatan:2025-06'.
+    """
+    kunci = models.CharField(max_length=40, unique=True)
+    nilai = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    diperbarui = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Ringkasan Dashboard"
+        verbose_name_plural = "Ringkasan Dashboard"
+
+    def __str__(self):
+        return f'{self.kunci} = {self.nilai}'
+
+
+class PekerjaanLaporan(models.Model):
+    """
+    Pembuatan PDF/ekspor laporan admin di latar belakang (core/report_jobs.py).
+    Berkas hasilnya disimpan di REPORT_JOBS_DIR dan dihapus setelah
+    REPORT_JOB_RETENTION detik.
+    """
+    STATUS_CHOICES = [
+        ('Menunggu', 'Menunggu'),
+        ('Berjalan', 'Berjalan'),
+        ('Selesai', 'Selesai'),
+        ('Gagal', 'Gagal'),
+    ]
+    STATUS_AKTIF = ('Menunggu', 'Berjalan')
+
+    laporan = models.CharField(max_length=50)  # Nama URL laporan, mis. 'report_penyewaan'
+    format = models.CharField(max_length=10)  # pdf, csv, jsonl atau xlsx
+    parameter = models.TextField(blank=True)  # Query string GET halaman laporan
+    # Hash laporan + format + filter ternormalisasi, untuk memakai ulang pekerjaan yang sama
+    kunci = models.CharField(max_length=64)
+    versiData = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Menunggu')
+    barisSelesai = models.IntegerField(default=0)
+    barisTotal = models.IntegerField(null=True, blank=True)
+    berkas = models.CharField(max_length=255, blank=True)  # Nama file di REPORT_JOBS_DIR
+    pesanGalat = models.TextField(blank=True)
+    dimintaOleh = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    dibuat = models.DateTimeField(auto_now_add=True)
+    selesai = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Pekerjaan Laporan"
+        verbose_name_plural = "Pekerjaan Laporan"
+        indexes = [
+            models.Index(fields=['kunci', 'dibuat'], name='pekerjaan_laporan_kunci_idx'),
+            models.Index(fields=['status', 'dibuat'], name='pekerjaan_laporan_status_idx'),
+        ]
+        constraints = [
+            # Paling banyak satu pekerjaan berjalan untuk laporan + filter yang sama
+            models.UniqueConstraint(
+                fields=['kunci'], condition=models.Q(status__in=['Menunggu', 'Berjalan']),
+                name='unik_pekerjaan_laporan_aktif',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.laporan}.{self.format} ({self.status})'
+
+    @property
+    def progres(self):
+        """Persentase baris yang sudah ditulis (0-100)."""
+        if self.status == 'Selesai':
+            return 100
+        if not self.barisTotal:
+            return 0
+        return min(99, self.barisSelesai * 100 // self.barisTotal)
+
+
+class ItemKeranjang(models.Model):
+    """Satu jenis Barang di keranjang seorang Pelanggan (lihat core/cart.py)."""
+    idPelanggan = models.ForeignKey(Pelanggan, on_delete=models.CASCADE)
+    idBarang = models.ForeignKey(Barang, on_delete=models.CASCADE)
+    jumlah = models.PositiveIntegerField(default=0)
+    diperbarui = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Item Keranjang"
+        verbose_name_plural = "Item Keranjang"
+        constraints = [
+            # Sekaligus menjadi index untuk membaca keranjang per pelanggan
+            models.UniqueConstraint(fields=['idPelanggan', 'idBarang'], name='unik_keranjang_pelanggan_barang'),
+        ]
 
     def __str__(self):
-        return f'Detail Sewa {self.idDetailSewa} untuk Sewa {self.idPenyewaan.idPenyewaan}'
\ No newline at end of file
+        return f'{self.idPelanggan_id}: {self.idBarang_id} x {self.jumlah}'
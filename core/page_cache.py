@@ -0,0 +1,116 @@
+# core/page_cache.py
+"""
+Cache halaman penuh untuk pengunjung anonim (beranda dan katalog).
+
+Halaman hanya di-cache untuk pengunjung yang belum login, tanpa pesan
+(django.contrib.messages) yang tertunda dan tanpa pilihan jadwal sewa, karena
+hanya pada kondisi itu HTML-nya identik untuk semua orang. Setiap perubahan
+Barang (termasuk stok dan foto) menaikkan versi cache sehingga semua halaman
+lama otomatis tidak terpakai lagi.
+
+Versi itu hanya terlihat oleh proses yang memakai backend cache yang sama.
+Dengan LocMemCache setiap worker WSGI/ASGI punya cache sendiri dan akan terus
+menyajikan halaman lama setelah Barang diubah di worker lain, sehingga cache
+halaman hanya dipakai bila report_cache.shared_cache() benar (lihat CACHES di
+settings).
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .report_cache import shared_cache
+
+VERSION_KEY = 'halaman:versi'
+HITS_KEY = 'halaman:hit'
+MISSES_KEY = 'halaman:miss'
+
+# Lama maksimum halaman disimpan (detik); invalidasi utama lewat versi
+PAGE_TIMEOUT = 60 * 15
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Kunci belum ada (atau sudah kedaluwarsa)
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def invalidate():
+    """Tandai semua halaman ter-cache sebagai usang."""
+    _incr(VERSION_KEY)
+
+
+def stats():
+    """Jumlah hit dan miss cache halaman sejak server berjalan."""
+    return {
+        'hit': cache.get(HITS_KEY, 0),
+        'miss': cache.get(MISSES_KEY, 0),
+    }
+
+
+def _is_cacheable(request):
+    if not shared_cache():
+        return False
+    if request.method not in ('GET', 'HEAD') or request.GET:
+        return False
+    if 'pelanggan_id' in request.session or 'jadwal_sewa' in request.session:
+        return False
+    # Pesan tertunda membuat HTML berbeda per pengunjung
+    return len(get_messages(request)) == 0
+
+
+def _lookup(request):
+    """
+    (key, response): key None jika request ini tidak boleh memakai cache,
+    response None jika halaman belum ada di cache.
+    """
+    if not _is_cacheable(request):
+        return None, None
+    key = f'halaman:{cache.get_or_set(VERSION_KEY, 0, timeout=None)}:{request.path}'
+    cached = cache.get(key)
+    if cached is None:
+        _incr(MISSES_KEY)
+        return key, None
+    _incr(HITS_KEY)
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'HIT'
+    return key, response
+
+
+def _store(key, response):
+    if response.status_code == 200 and not response.streaming:
+        cache.set(key, (response.content, response['Content-Type']), PAGE_TIMEOUT)
+    response['X-Page-Cache'] = 'MISS'
+
+
+def anonymous_page_cache(view_func):
+    """Sajikan HTML yang sama untuk semua pengunjung anonim dari cache."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # Session dan pesan mungkin dibaca dari database: cek di thread
+            key, cached = await sync_to_async(_lookup)(request)
+            if cached is not None:
+                return cached
+            response = await view_func(request, *args, **kwargs)
+            if key is not None:
+                await sync_to_async(_store)(key, response)
+            return response
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key, cached = _lookup(request)
+        if cached is not None:
+            return cached
+        response = view_func(request, *args, **kwargs)
+        if key is not None:
+            _store(key, response)
+        return response
+    return wrapper
@@ -0,0 +1,145 @@
+# core/pagination.py
+"""
+Pagination keyset (cursor) untuk laporan admin.
+
+LIMIT/OFFSET membuat SQLite membaca lalu membuang semua baris sebelum halaman
+yang diminta, ditambah COUNT(*) di setiap halaman. Di sini halaman berikutnya
+dicari langsung dari kunci urutan baris terakhir, misalnya
+(tanggalPesan, idPenyewaan), lewat index yang sama dengan urutannya, sehingga
+halaman ke-N sama murahnya dengan halaman pertama. Kunci urutan harus unik
+(akhiri dengan primary key) dan tidak boleh NULL.
+
+Cursor ditandatangani (django.core.signing) dan membawa parameter filter,
+sehingga tautan berikutnya/sebelumnya cukup berisi ?cursor=...
+"""
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+MAJU = 'next'
+MUNDUR = 'prev'
+
+
+class Cursor:
+    """Isi cursor: parameter filter, nilai kunci baris acuan dan arah halaman."""
+
+    def __init__(self, params, kunci, arah):
+        self.params = params
+        self.kunci = kunci
+        self.arah = arah
+
+
+class CursorPage:
+    """Satu halaman hasil keyset beserta token cursor ke halaman sebelah."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, is_first=True):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        # False jika halaman ini dibuka lewat cursor (tampilkan tautan ke awal)
+        self.is_first = is_first
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _balik(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def _setelah(ordering, kunci):
+    """
+    Q untuk baris yang berada setelah `kunci` dalam urutan `ordering`:
+    (a > x) OR (a = x AND b > y) ..., ditambah batas a >= x di depan agar
+    SQLite bisa langsung melompat ke posisi itu di index.
+    """
+    kondisi = Q()
+    sama = {}
+    for field, nilai in zip(ordering, kunci):
+        nama = field.lstrip('-')
+        op = 'lt' if field.startswith('-') else 'gt'
+        kondisi |= Q(**sama, **{f'{nama}__{op}': nilai})
+        sama[nama] = nilai
+    pertama = ordering[0]
+    batas = 'lte' if pertama.startswith('-') else 'gte'
+    return Q(**{f'{pertama.lstrip("-")}__{batas}': kunci[0]}) & kondisi
+
+
+def _nilai_kunci(obj, ordering):
+    """Nilai kunci urutan `obj` dalam bentuk yang bisa di-JSON-kan (tanggal/Decimal jadi string)."""
+    nilai = []
+    for field in ordering:
+        attname = obj._meta.get_field(field.lstrip('-')).attname
+        value = getattr(obj, attname)
+        nilai.append(value if isinstance(value, (int, str)) else str(value))
+    return nilai
+
+
+class KeysetPaginator:
+    """
+    Pagination keyset atas queryset dengan urutan `ordering` (tuple field,
+    awali '-' untuk menurun). `salt` membedakan cursor antar laporan.
+    """
+
+    def __init__(self, ordering, per_page, salt):
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.salt = salt
+
+    def dump(self, params, kunci, arah):
+        return signing.dumps({'f': params, 'k': kunci, 'a': arah}, salt=self.salt, compress=True)
+
+    def load(self, token):
+        """Cursor dari token, atau None jika token rusak/bukan untuk laporan ini."""
+        try:
+            data = signing.loads(token, salt=self.salt)
+            cursor = Cursor([tuple(pair) for pair in data['f']], data['k'], data['a'])
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+        if len(cursor.kunci) != len(self.ordering) or cursor.arah not in (MAJU, MUNDUR):
+            return None
+        return cursor
+
+    def page(self, queryset, cursor=None, params=()):
+        """
+        Ambil satu halaman. Tanpa cursor: halaman pertama. Satu baris ekstra
+        dibaca untuk mengetahui apakah masih ada halaman di arah yang sama.
+        """
+        if cursor is None or cursor.arah == MAJU:
+            qs = queryset.order_by(*self.ordering)
+            if cursor is not None:
+                qs = qs.filter(_setelah(self.ordering, cursor.kunci))
+            rows = list(qs[:self.per_page + 1])
+            ada_lagi = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            ada_berikutnya, ada_sebelumnya = ada_lagi, cursor is not None
+        else:
+            # Mundur: baca dengan urutan terbalik lalu balik lagi hasilnya
+            terbalik = _balik(self.ordering)
+            qs = queryset.order_by(*terbalik).filter(_setelah(terbalik, cursor.kunci))
+            rows = list(qs[:self.per_page + 1])
+            ada_lagi = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            ada_berikutnya, ada_sebelumnya = True, ada_lagi
+
+        params = list(params)
+        next_cursor = previous_cursor = None
+        if rows and ada_berikutnya:
+            next_cursor = self.dump(params, _nilai_kunci(rows[-1], self.ordering), MAJU)
+        if rows and ada_sebelumnya:
+            previous_cursor = self.dump(params, _nilai_kunci(rows[0], self.ordering), MUNDUR)
+        return CursorPage(rows, next_cursor, previous_cursor, is_first=cursor is None)
+
+
+class KnownCountPaginator(Paginator):
+    """Paginator LIMIT/OFFSET dengan jumlah baris yang sudah diketahui (dari cache), tanpa COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        # Mengisi cached_property Paginator.count
+        self.__dict__['count'] = count
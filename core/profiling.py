@@ -0,0 +1,116 @@
+# core/profiling.py
+"""
+Profil SQL per request (opsional, dengan sampling).
+
+`SQLProfilingMiddleware` (core/middleware.py) memasang execute_wrapper pada
+koneksi database untuk request yang terpilih sampel, lalu menyimpan
+ringkasannya ke ring buffer di memori proses: jumlah query, total waktu SQL,
+bentuk query yang berulang (pola N+1) dan statement paling lambat. Hanya
+bentuk query (SQL dengan placeholder) yang disimpan, tanpa nilai parameter.
+
+Buffer bersifat per proses; di deployment multi-worker setiap worker
+menyimpan sampelnya sendiri. Setting:
+
+    SQL_PROFILING_SAMPLE_RATE   0.0 (mati) sampai 1.0 (semua request)
+    SQL_PROFILING_BUFFER_SIZE   jumlah request yang disimpan (default 200)
+    SQL_PROFILING_SLOWEST       jumlah statement terlambat per request (default 5)
+"""
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.utils import timezone
+
+_lock = threading.Lock()
+_buffer = None
+
+# Daftar placeholder pada IN (...) diringkas agar panjang list tidak membuat bentuk baru
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_SPACES = re.compile(r'\s+')
+
+
+def sample_rate():
+    return getattr(settings, 'SQL_PROFILING_SAMPLE_RATE', 0.0)
+
+
+def _get_buffer():
+    global _buffer
+    size = getattr(settings, 'SQL_PROFILING_BUFFER_SIZE', 200)
+    if _buffer is None or _buffer.maxlen != size:
+        _buffer = deque(_buffer or (), maxlen=size)
+    return _buffer
+
+
+def query_shape(sql):
+    """Bentuk query: placeholder IN diringkas, angka literal diganti '?'."""
+    sql = _IN_LIST.sub('(%s, ...)', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper yang mencatat bentuk dan durasi setiap statement."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        mulai = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append((sql, (time.perf_counter() - mulai) * 1000))
+
+    def summary(self):
+        per_bentuk = {}
+        for sql, ms in self.statements:
+            bentuk = query_shape(sql)
+            jumlah, total = per_bentuk.get(bentuk, (0, 0.0))
+            per_bentuk[bentuk] = (jumlah + 1, total + ms)
+
+        duplikat = sorted(
+            ({'sql': bentuk, 'jumlah': jumlah, 'total_ms': round(total, 2)}
+             for bentuk, (jumlah, total) in per_bentuk.items() if jumlah > 1),
+            key=lambda item: (-item['jumlah'], -item['total_ms']),
+        )
+        slowest = getattr(settings, 'SQL_PROFILING_SLOWEST', 5)
+        terlambat = [
+            {'sql': query_shape(sql), 'ms': round(ms, 2)}
+            for sql, ms in sorted(self.statements, key=lambda item: -item[1])[:slowest]
+        ]
+        return {
+            'jumlah_query': len(self.statements),
+            'sql_ms': round(sum(ms for _, ms in self.statements), 2),
+            'duplikat': duplikat,
+            'terlambat': terlambat,
+        }
+
+
+def record(request, response, recorder, durasi_ms):
+    """Simpan ringkasan satu request ke ring buffer."""
+    match = getattr(request, 'resolver_match', None)
+    entry = {
+        'waktu': timezone.now(),
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else '',
+        'status': response.status_code,
+        'durasi_ms': round(durasi_ms, 2),
+        **recorder.summary(),
+    }
+    with _lock:
+        _get_buffer().append(entry)
+
+
+def entries():
+    """Isi ring buffer, terbaru lebih dulu."""
+    with _lock:
+        return list(reversed(_get_buffer()))
+
+
+def clear():
+    with _lock:
+        _get_buffer().clear()
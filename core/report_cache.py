@@ -0,0 +1,173 @@
+# core/report_cache.py
+"""
+Cache jumlah baris dan hasil terfilter laporan admin.
+
+Jumlah baris (COUNT(*)) disimpan di cache Django dengan kunci nama laporan +
+parameter filter yang sudah dinormalisasi (hasil cleaned_data FilterSet,
+tanpa nilai kosong, diurutkan), sehingga pindah halaman atau klik urutan
+kolom tidak menghitung ulang. Setiap model punya nomor versi yang dinaikkan
+setelah commit oleh penulisan ke model itu (signal post_save/post_delete dan
+pemanggilan invalidate() di jalur UPDATE massal); jumlah dengan versi lama
+otomatis tidak terpakai lagi.
+
+Untuk tabel besar (perkiraan jumlah baris di atas
+REPORT_COUNT_ESTIMATE_THRESHOLD) jumlah yang belum ada di cache tidak
+dihitung di request halaman: tanpa filter ditampilkan perkiraan dari primary
+key terbesar, lalu jumlah pastinya diambil browser lewat ?hitung=1.
+
+Hasil terfilter (report_result) menyimpan daftar pk berurutan untuk satu
+laporan + filter, dipakai bersama oleh pekerjaan PDF dan ekspor laporan yang
+sama: PDF lalu CSV dengan filter yang sama hanya sekali menjalankan query
+filternya. Halaman HTML tidak mengisinya, karena itu berarti membaca semua
+baris terfilter hanya untuk menampilkan satu halaman; halaman hanya memakai
+cache jumlah. Total pendapatan laporan keuangan diambil dari fakta harian
+(core/revenue.py), bukan dari cache ini. Versinya mengikuti model laporan
+itu sendiri serta Penyewaan dan DetailSewa.
+
+Nomor versi hanya berlaku di antara proses yang memakai backend cache yang
+sama (CACHES di settings). Dengan LocMemCache setiap proses punya cache
+sendiri: worker web lain dan worker Celery tidak melihat invalidasi dari
+proses yang menulis dan akan memakai jumlah serta daftar pk lama. Karena itu
+jumlah dan hasil hanya di-cache bila shared_cache() benar; selain itu
+dihitung langsung dari database setiap kali.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Max
+from django.utils.http import urlencode
+
+from .models import DetailSewa, Penyewaan
+
+# Lama maksimum jumlah/hasil disimpan (detik); invalidasi utama lewat versi
+COUNT_TIMEOUT = 60 * 60
+RESULT_TIMEOUT = 60 * 15
+
+# Daftar pk yang lebih panjang dari ini tidak disimpan, agar satu entri
+# cache tetap kecil; pemakainya kembali ke queryset
+MAX_CACHED_IDS = 100_000
+
+
+def shared_cache():
+    """Apakah cache default dipakai bersama oleh semua proses (bukan LocMemCache/DummyCache)."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _version_key(model):
+    return f'laporan:versi:{model._meta.label_lower}'
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Kunci belum ada (atau sudah kedaluwarsa)
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def invalidate(model):
+    """Tandai semua jumlah laporan atas `model` sebagai usang (setelah transaksi commit)."""
+    transaction.on_commit(lambda: _incr(_version_key(model)))
+
+
+def normalize_params(params):
+    """Parameter filter sebagai string kanonik: tanpa nilai kosong, urut per nama."""
+    return urlencode(sorted((str(k), str(v)) for k, v in params if v not in (None, '')))
+
+
+def _versions(*models):
+    keys = list(dict.fromkeys(_version_key(model) for model in models))
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, 0, timeout=None)
+            found[key] = cache.get(key, 0)
+    return '.'.join(str(found.get(key, 0)) for key in keys)
+
+
+def _digest(params):
+    return hashlib.md5(normalize_params(params).encode()).hexdigest()
+
+
+def count_key(report, model, params):
+    return f'laporan:jumlah:{report}:{_versions(model)}:{_digest(params)}'
+
+
+def result_version(model):
+    """Versi data hasil laporan atas `model` (berubah setiap ada penulisan yang memengaruhinya)."""
+    return _versions(model, Penyewaan, DetailSewa)
+
+
+def result_key(report, model, params):
+    return f'laporan:hasil:{report}:{result_version(model)}:{_digest(params)}'
+
+
+def estimated_count(model):
+    """
+    Perkiraan jumlah baris tabel dari primary key terbesar (satu lompatan di
+    index primary key). Bisa lebih besar dari jumlah sebenarnya jika ada baris
+    yang dihapus.
+    """
+    return model.objects.aggregate(maks=Max('pk'))['maks'] or 0
+
+
+def exact_count(report, queryset, params):
+    """Jumlah baris pasti; dihitung dengan COUNT(*) hanya jika belum ada di cache."""
+    if not shared_cache():
+        return queryset.count()
+    key = count_key(report, queryset.model, params)
+    jumlah = cache.get(key)
+    if jumlah is None:
+        jumlah = queryset.count()
+        cache.set(key, jumlah, COUNT_TIMEOUT)
+    return jumlah
+
+
+def row_count(report, queryset, params, estimate=True):
+    """
+    Jumlah baris untuk halaman laporan tanpa menunggu COUNT(*) di tabel besar.
+
+    Mengembalikan (jumlah, perkiraan): (n, False) jika jumlah pasti diketahui,
+    (n, True) untuk perkiraan tabel tanpa filter, atau (None, True) jika
+    jumlah belum dihitung. Dua yang terakhir dilengkapi lewat exact_count()
+    (?hitung=1). estimate=False untuk laporan yang queryset dasarnya sudah
+    tersaring, sehingga jumlah baris tabel bukan perkiraan yang wajar.
+    """
+    jumlah = cache.get(count_key(report, queryset.model, params)) if shared_cache() else None
+    if jumlah is not None:
+        return jumlah, False
+    perkiraan = estimated_count(queryset.model)
+    if perkiraan <= getattr(settings, 'REPORT_COUNT_ESTIMATE_THRESHOLD', 100_000):
+        # Tabel kecil: COUNT(*) murah, langsung dihitung dan disimpan
+        return exact_count(report, queryset, params), False
+    if estimate and not normalize_params(params):
+        return perkiraan, True
+    return None, True
+
+
+def report_result(report, queryset, params):
+    """
+    Daftar pk hasil terfilter laporan sesuai urutan queryset, atau None jika
+    melebihi MAX_CACHED_IDS atau cache tidak dipakai bersama (pemakainya
+    kembali ke queryset). Dihitung sekali per laporan + filter + versi data;
+    jumlah barisnya sekaligus mengisi cache jumlah.
+    """
+    if not shared_cache():
+        return None
+    key = result_key(report, queryset.model, params)
+    hasil = cache.get(key)
+    if hasil is not None:
+        return hasil['ids']
+
+    ids = list(queryset.values_list('pk', flat=True)[:MAX_CACHED_IDS + 1])
+    if len(ids) > MAX_CACHED_IDS:
+        ids = None
+    cache.set(key, {'ids': ids}, RESULT_TIMEOUT)
+    if ids is not None:
+        cache.set(count_key(report, queryset.model, params), len(ids), COUNT_TIMEOUT)
+    return ids
@@ -0,0 +1,175 @@
+# core/report_jobs.py
+"""
+Pekerjaan laporan (PDF dan ekspor) di latar belakang.
+
+Halaman PDF/ekspor tidak membuat berkas di thread request: enqueue() mencatat
+PekerjaanLaporan lalu mengirim task Celery core.tasks.buat_laporan, dan
+browser diarahkan ke halaman pekerjaan yang menampilkan progres sampai
+berkasnya siap diunduh. Worker menulis berkas ke REPORT_JOBS_DIR lewat file
+sementara yang di-rename setelah selesai, sehingga berkas setengah jadi tidak
+pernah terunduh.
+
+Permintaan dengan laporan, format dan filter ternormalisasi yang sama memakai
+ulang pekerjaan yang masih menunggu/berjalan, atau yang sudah selesai dalam
+REPORT_JOB_REUSE detik terakhir selama versi datanya (core/report_cache.py)
+belum berubah. purge() menghapus pekerjaan dan berkas yang lebih tua dari
+REPORT_JOB_RETENTION detik serta menandai pekerjaan macet sebagai gagal;
+dipanggil setiap kali pekerjaan dibuat dan lewat
+`python manage.py bersihkan_laporan`.
+"""
+import hashlib
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from .models import PekerjaanLaporan
+from .report_cache import normalize_params
+
+logger = logging.getLogger(__name__)
+
+# Progres disimpan ke database paling sering sekali per interval ini (detik)
+PROGRESS_INTERVAL = 1.0
+
+
+def jobs_dir():
+    return getattr(settings, 'REPORT_JOBS_DIR', os.path.join(settings.BASE_DIR, 'var', 'laporan'))
+
+
+def job_path(job):
+    """Path berkas hasil pekerjaan, atau None jika belum ada."""
+    return os.path.join(jobs_dir(), job.berkas) if job.berkas else None
+
+
+def job_key(report, fmt, params):
+    """Kunci pekerjaan: hash nama laporan, format dan filter ternormalisasi."""
+    return hashlib.sha256(f'{report}:{fmt}:{normalize_params(params)}'.encode()).hexdigest()
+
+
+def _reusable(kunci, version):
+    """Pekerjaan dengan kunci yang sama yang masih berjalan atau hasilnya masih berlaku."""
+    jobs = PekerjaanLaporan.objects.filter(kunci=kunci)
+    aktif = jobs.filter(status__in=PekerjaanLaporan.STATUS_AKTIF).first()
+    if aktif is not None:
+        return aktif
+    batas = timezone.now() - timedelta(seconds=getattr(settings, 'REPORT_JOB_REUSE', 60 * 10))
+    for job in jobs.filter(status='Selesai', versiData=version, selesai__gte=batas).order_by('-selesai'):
+        if os.path.exists(job_path(job)):
+            return job
+    return None
+
+
+def enqueue(report, fmt, params, query, version, user=None):
+    """
+    Pekerjaan untuk laporan `report` dalam format `fmt`. `params` adalah filter
+    ternormalisasi (kunci pemakaian ulang), `query` query string GET halaman
+    laporan yang dipakai worker untuk membangun ulang FilterSet, dan `version`
+    versi data laporan saat ini. Memakai ulang pekerjaan yang sama bila ada;
+    jika tidak, membuat pekerjaan baru dan mengirimnya ke antrean Celery.
+    """
+    purge()
+    kunci = job_key(report, fmt, params)
+    job = _reusable(kunci, version)
+    if job is not None:
+        return job
+
+    try:
+        with transaction.atomic():
+            job = PekerjaanLaporan.objects.create(
+                laporan=report, format=fmt, parameter=query, kunci=kunci, versiData=version, dimintaOleh=user,
+            )
+    except IntegrityError:
+        # Permintaan lain dengan filter yang sama baru saja membuat pekerjaannya
+        return _reusable(kunci, version) or enqueue(report, fmt, params, query, version, user)
+
+    from .tasks import buat_laporan
+    buat_laporan.delay(job.pk)
+    return job
+
+
+class Progress:
+    """Mencatat jumlah baris yang sudah ditulis sebuah pekerjaan ke database."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.count = 0
+
+    def track(self, rows, total):
+        """Bungkus iterator baris; progres disimpan paling sering sekali per PROGRESS_INTERVAL."""
+        PekerjaanLaporan.objects.filter(pk=self.job_id).update(barisTotal=total)
+        terakhir = time.monotonic()
+        for row in rows:
+            yield row
+            self.count += 1
+            if time.monotonic() - terakhir >= PROGRESS_INTERVAL:
+                PekerjaanLaporan.objects.filter(pk=self.job_id).update(barisSelesai=self.count)
+                terakhir = time.monotonic()
+
+
+def run(job_id, use_cache=True):
+    """
+    Buat berkas untuk satu pekerjaan (dipanggil oleh task Celery). Dengan
+    `use_cache` False daftar pk dan jumlah baris dihitung langsung dari
+    database, tanpa cache laporan (core/report_cache.py).
+    """
+    # Hanya satu worker yang mengambil pekerjaan yang sama
+    if not PekerjaanLaporan.objects.filter(pk=job_id, status='Menunggu').update(status='Berjalan'):
+        return
+    job = PekerjaanLaporan.objects.get(pk=job_id)
+    # views mengimpor modul ini, jadi diimpor saat dipakai
+    from .views import write_report
+
+    folder = jobs_dir()
+    os.makedirs(folder, exist_ok=True)
+    nama = f'{job.pk}-{job.kunci[:12]}.{job.format}'
+    path = os.path.join(folder, nama)
+    sementara = f'{path}.tmp'
+    progress = Progress(job.pk)
+    try:
+        with open(sementara, 'wb') as fileobj:
+            write_report(job.laporan, job.format, QueryDict(job.parameter), fileobj, progress, use_cache=use_cache)
+        os.replace(sementara, path)
+    except Exception as exc:
+        logger.exception('Pekerjaan laporan %s gagal', job.pk)
+        if os.path.exists(sementara):
+            os.remove(sementara)
+        PekerjaanLaporan.objects.filter(pk=job.pk, status='Berjalan').update(
+            status='Gagal', pesanGalat=str(exc) or type(exc).__name__, selesai=timezone.now(),
+        )
+        return
+
+    PekerjaanLaporan.objects.filter(pk=job.pk, status='Berjalan').update(
+        status='Selesai', berkas=nama, barisSelesai=progress.count, selesai=timezone.now(),
+    )
+
+
+def purge():
+    """
+    Terapkan masa simpan: pekerjaan aktif yang melewati REPORT_JOB_TIMEOUT
+    ditandai gagal, pekerjaan lain dan berkas di REPORT_JOBS_DIR yang lebih tua
+    dari REPORT_JOB_RETENTION dihapus. Mengembalikan jumlah pekerjaan yang dihapus.
+    """
+    sekarang = timezone.now()
+    retention = getattr(settings, 'REPORT_JOB_RETENTION', 60 * 60 * 24)
+    timeout = getattr(settings, 'REPORT_JOB_TIMEOUT', 60 * 30)
+
+    PekerjaanLaporan.objects.filter(
+        status__in=PekerjaanLaporan.STATUS_AKTIF, dibuat__lt=sekarang - timedelta(seconds=timeout),
+    ).update(status='Gagal', pesanGalat='Melebihi batas waktu pembuatan laporan.', selesai=sekarang)
+    jumlah, _ = PekerjaanLaporan.objects.filter(
+        dibuat__lt=sekarang - timedelta(seconds=retention),
+    ).exclude(status__in=PekerjaanLaporan.STATUS_AKTIF).delete()
+
+    # Berkas dihapus menurut umurnya, termasuk sisa pekerjaan yang sudah tidak tercatat
+    batas = time.time() - retention
+    if os.path.isdir(jobs_dir()):
+        with os.scandir(jobs_dir()) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < batas:
+                    os.remove(entry.path)
+    return jumlah
@@ -0,0 +1,299 @@
+# core/reports.py
+"""
+Pipeline data laporan admin yang hemat memori.
+
+Kolom laporan diambil dari Table class django_tables2, lalu diterjemahkan
+menjadi proyeksi `values_list` sehingga baris dibaca per-chunk sebagai tuple
+biasa (tanpa instance model maupun BoundRow). PDF digambar per halaman dan
+CSV/JSON-lines ditulis per batch ke file tujuan; XLSX dibuat dengan tablib.
+Berkas ditulis oleh pekerjaan laporan di latar belakang (core/report_jobs.py).
+"""
+import csv
+import io
+import json
+import re
+
+import tablib
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.defaultfilters import date as format_date
+from django_tables2 import DateColumn
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+
+# Jumlah baris yang diambil dari database per putaran
+CHUNK_SIZE = 2000
+
+# Jumlah pk per query saat baris diambil dari daftar pk (di bawah batas 999
+# parameter SQLite lama)
+PKS_PER_QUERY = 900
+
+# Tata letak halaman PDF (satuan point)
+PAGE_SIZE = A4
+MARGIN_LEFT = MARGIN_RIGHT = 72
+MARGIN_TOP = 72
+MARGIN_BOTTOM = 36
+FONT_SIZE = 8
+ROW_HEIGHT = 16
+CELL_PADDING = 6
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007bff')),  # Header Biru
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),  # Baris data
+])
+
+
+class ReportColumn:
+    """Satu kolom laporan: judul, path ORM untuk values_list dan cara format nilai."""
+
+    def __init__(self, bound_column):
+        self.name = bound_column.name
+        self.header = str(bound_column.header)
+        self.field = str(bound_column.accessor).replace('.', '__')
+        self.default = bound_column.default
+        self.date_format = None
+        if isinstance(bound_column.column, DateColumn):
+            match = re.search(r'date:"([^"]*)"', bound_column.column.template_code)
+            self.date_format = match.group(1) if match else None
+
+    def format(self, value):
+        if value is None:
+            return str(self.default)
+        if self.date_format:
+            return format_date(value, self.date_format)
+        return str(value)
+
+
+def report_columns(table_class):
+    """Daftar ReportColumn sesuai urutan kolom di Table class."""
+    return [ReportColumn(column) for column in table_class([]).columns]
+
+
+def report_ordering(table_class):
+    """Field pengurutan aman: Meta.order_by atau kolom pertama Table class."""
+    try:
+        ordering_field = getattr(table_class.Meta, 'order_by', None)
+        if ordering_field is None:
+            ordering_field = table_class.Meta.fields[0]
+    except (AttributeError, IndexError):
+        ordering_field = 'pk'
+    return ordering_field
+
+
+def iter_values(queryset, columns, chunk_size=CHUNK_SIZE, pks=None):
+    """
+    Baris laporan sebagai tuple nilai mentah, dibaca per-chunk dengan proyeksi values_list.
+    Jika `pks` diberikan (daftar pk hasil terfilter dari core/report_cache.py),
+    baris diambil per potongan pk dengan urutan daftar itu, tanpa menjalankan
+    ulang filter dan pengurutan queryset.
+    """
+    fields = [column.field for column in columns]
+    if pks is None:
+        return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    return _iter_values_by_pk(queryset.model, fields, pks)
+
+
+def _iter_values_by_pk(model, fields, pks):
+    for i in range(0, len(pks), PKS_PER_QUERY):
+        potongan = pks[i:i + PKS_PER_QUERY]
+        rows = {row[0]: row[1:] for row in model._default_manager.filter(pk__in=potongan).values_list('pk', *fields)}
+        for pk in potongan:
+            # Baris yang sudah dihapus dilewati
+            if pk in rows:
+                yield rows[pk]
+
+
+def format_rows(columns, values):
+    """Baris nilai mentah (hasil iter_values) sebagai list string yang diformat seperti di tabel HTML."""
+    for row in values:
+        yield [column.format(value) for column, value in zip(columns, row)]
+
+
+def iter_rows(queryset, columns, chunk_size=CHUNK_SIZE, pks=None):
+    """Baris laporan sebagai list string yang sudah diformat seperti di tabel HTML."""
+    return format_rows(columns, iter_values(queryset, columns, chunk_size, pks=pks))
+
+
+# -----------------------------------------------------------------
+# PDF
+# -----------------------------------------------------------------
+
+def _fit(text, width):
+    """Potong teks agar muat dalam lebar sel (satu baris)."""
+    if stringWidth(text, 'Helvetica', FONT_SIZE) <= width:
+        return text
+    while text and stringWidth(text + '…', 'Helvetica', FONT_SIZE) > width:
+        text = text[:-1]
+    return text + '…'
+
+
+def _column_widths(headers, sample_rows, total_width):
+    """Lebar kolom proporsional terhadap teks terpanjang pada header dan contoh baris."""
+    widest = [stringWidth(h, 'Helvetica-Bold', FONT_SIZE) for h in headers]
+    for row in sample_rows:
+        for i, text in enumerate(row):
+            widest[i] = max(widest[i], stringWidth(text, 'Helvetica', FONT_SIZE))
+    widest = [w + 2 * CELL_PADDING for w in widest]
+    scale = total_width / sum(widest)
+    return [w * scale for w in widest]
+
+
+def write_pdf(fileobj, title, columns, rows, footer_text=None):
+    """
+    Gambar laporan ke `fileobj` halaman demi halaman. Setiap halaman berisi
+    satu Table dengan header yang diulang, sehingga hanya baris untuk satu
+    halaman yang ada di memori pada satu waktu.
+    """
+    page_width, page_height = PAGE_SIZE
+    frame_width = page_width - MARGIN_LEFT - MARGIN_RIGHT
+    styles = getSampleStyleSheet()
+    headers = [column.header for column in columns]
+
+    c = canvas.Canvas(fileobj, pagesize=PAGE_SIZE, pageCompression=1)
+    c.setTitle(title)
+
+    rows = iter(rows)
+    # Ambil contoh baris (maksimal satu chunk) untuk menentukan lebar kolom
+    sample = []
+    for row in rows:
+        sample.append(row)
+        if len(sample) >= CHUNK_SIZE:
+            break
+    col_widths = _column_widths(headers, sample, frame_width)
+    cell_widths = [w - 2 * CELL_PADDING for w in col_widths]
+
+    def all_rows():
+        yield from sample
+        yield from rows
+
+    page_number = 0
+
+    def start_page():
+        nonlocal page_number
+        page_number += 1
+        y = page_height - MARGIN_TOP
+        if page_number == 1:
+            p_title = Paragraph(title, styles['Title'])
+            _, h = p_title.wrap(frame_width, page_height)
+            p_title.drawOn(c, MARGIN_LEFT, y - h)
+            y -= h + 18
+        c.setFont('Helvetica', FONT_SIZE)
+        c.drawRightString(page_width - MARGIN_RIGHT, MARGIN_BOTTOM / 2, f'Halaman {page_number}')
+        return y
+
+    def draw_table(page_rows, y):
+        data = [headers] + [[_fit(text, w) for text, w in zip(row, cell_widths)] for row in page_rows]
+        table = Table(data, colWidths=col_widths, rowHeights=ROW_HEIGHT)
+        table.setStyle(TABLE_STYLE)
+        _, h = table.wrapOn(c, frame_width, y - MARGIN_BOTTOM)
+        table.drawOn(c, MARGIN_LEFT, y - h)
+        return y - h
+
+    top = start_page()
+    page_rows = []
+    capacity = int((top - MARGIN_BOTTOM) // ROW_HEIGHT) - 1
+    for row in all_rows():
+        if len(page_rows) >= capacity:
+            # Halaman penuh: gambar lalu lanjut ke halaman berikutnya
+            draw_table(page_rows, top)
+            c.showPage()
+            page_rows = []
+            top = start_page()
+            capacity = int((top - MARGIN_BOTTOM) // ROW_HEIGHT) - 1
+        page_rows.append(row)
+
+    bottom = draw_table(page_rows, top)
+
+    if footer_text:
+        footer = Paragraph(footer_text, styles['Normal'])
+        _, h = footer.wrap(frame_width, page_height)
+        if bottom - 36 - h < MARGIN_BOTTOM:
+            c.showPage()
+            bottom = start_page()
+        footer.drawOn(c, MARGIN_LEFT, bottom - 36 - h)
+
+    c.showPage()
+    c.save()
+
+
+# -----------------------------------------------------------------
+# Ekspor data mentah (CSV, JSON-lines, XLSX)
+# -----------------------------------------------------------------
+
+# Jumlah baris yang dikumpulkan sebelum ditulis ke berkas
+STREAM_BATCH = 500
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'xlsx')
+
+try:
+    # tablib membutuhkan openpyxl untuk format xlsx
+    import openpyxl  # noqa: F401
+    XLSX_AVAILABLE = True
+except ImportError:
+    XLSX_AVAILABLE = False
+
+
+# Content-Type berkas hasil per format, untuk unduhan
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def stream_csv(columns, values):
+    """CSV dengan header kolom, dihasilkan per batch baris."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM agar Excel membaca file sebagai UTF-8
+    buffer.write('\ufeff')
+    writer.writerow([column.header for column in columns])
+    for i, row in enumerate(values, 1):
+        writer.writerow(row)
+        if i % STREAM_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_jsonl(columns, values):
+    """Satu objek JSON per baris, dengan nama kolom Table sebagai key."""
+    names = [column.name for column in columns]
+    batch = []
+    for row in values:
+        batch.append(json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder))
+        if len(batch) >= STREAM_BATCH:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+
+def write_export(fileobj, fmt, title, columns, values):
+    """
+    Tulis ekspor format `fmt` (csv, jsonl atau xlsx) ke `fileobj` biner.
+    `values` adalah baris nilai mentah seperti hasil iter_values().
+    """
+    if fmt == 'xlsx':
+        # tablib membangun workbook di memori
+        dataset = tablib.Dataset(headers=[column.header for column in columns], title=title[:31])
+        for row in values:
+            dataset.append(row)
+        fileobj.write(dataset.export('xlsx'))
+        return
+
+    chunks = stream_jsonl(columns, values) if fmt == 'jsonl' else stream_csv(columns, values)
+    for chunk in chunks:
+        fileobj.write(chunk.encode('utf-8'))
@@ -0,0 +1,184 @@
+# core/revenue.py
+"""
+Tabel fakta pendapatan harian (`PendapatanHarian`).
+
+Satu baris per (statusSewa, tanggalPesan) berisi jumlah penyewaan dan total
+bayarnya, ditambah kolom kumulatif: jumlah semua baris status itu sampai
+tanggal tersebut. Total untuk rentang [mulai, selesai] cukup dihitung dari
+dua baris kumulatif per status (baris terakhir <= selesai dikurangi baris
+terakhir < mulai), masing-masing satu lompatan di index
+(statusSewa, tanggal), berapa pun banyaknya penyewaan di rentang itu.
+
+Fakta diperbarui oleh Penyewaan.save(), signal post_delete dan perubahan
+status massal. Perubahan pada satu tanggal menggeser kumulatif semua tanggal
+sesudahnya dengan satu UPDATE; karena tanggalPesan penyewaan baru adalah
+hari ini, biasanya hanya baris terakhir yang tersentuh. Gunakan
+`python manage.py cek_pendapatan` untuk membandingkan fakta dengan tabel
+Penyewaan (dan --perbaiki untuk membangun ulang).
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import CharField, Count, F, Func, Sum
+
+from .dashboard import STATUS_SUKSES
+from .models import PendapatanHarian, Penyewaan
+
+
+class _TanpaIndex(Func):
+    """`+kolom`: nilainya sama, tetapi SQLite tidak memakai index kolom itu."""
+    template = '+%(expressions)s'
+    output_field = CharField()
+
+
+def penyewaan_sukses(queryset):
+    """
+    Penyewaan berstatus STATUS_SUKSES: predikat yang sama dengan fakta
+    pendapatan, dipakai oleh halaman, PDF dan ekspor laporan keuangan.
+    Status ditulis sebagai +statusSewa IN (...) agar SQLite menelusuri index
+    tanggalPesan sesuai urutan laporan (berhenti setelah satu halaman) alih-alih
+    index status yang memaksa semua baris cocok diurutkan dulu.
+    """
+    return queryset.alias(status_sukses=_TanpaIndex('statusSewa')).filter(status_sukses__in=STATUS_SUKSES)
+
+
+def _kumulatif(status, sampai):
+    """(jumlah, total) kumulatif status sampai tanggal `sampai` (None = semua)."""
+    baris = PendapatanHarian.objects.filter(statusSewa=status)
+    if sampai is not None:
+        baris = baris.filter(tanggal__lte=sampai)
+    return baris.order_by('-tanggal').values_list('kumulatifJumlah', 'kumulatifTotal').first() or (0, Decimal('0'))
+
+
+def revenue(mulai=None, selesai=None, statuses=STATUS_SUKSES):
+    """
+    (jumlah, total) Penyewaan berstatus `statuses` dengan tanggalPesan dalam
+    [mulai, selesai]; batas None berarti tanpa batas. Dua query kecil per status.
+    """
+    jumlah, total = 0, Decimal('0')
+    for status in statuses:
+        akhir_jumlah, akhir_total = _kumulatif(status, selesai)
+        awal_jumlah, awal_total = (0, Decimal('0'))
+        if mulai is not None:
+            awal_jumlah, awal_total = _kumulatif(status, mulai - timedelta(days=1))
+        jumlah += akhir_jumlah - awal_jumlah
+        total += akhir_total - awal_total
+    return jumlah, total
+
+
+def apply_deltas(deltas):
+    """Tambahkan {(status, tanggal): (jumlah, total)} ke fakta harian dan kumulatifnya."""
+    deltas = {kunci: nilai for kunci, nilai in deltas.items() if any(nilai)}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        for (status, tanggal), (jumlah, total) in deltas.items():
+            if not PendapatanHarian.objects.filter(statusSewa=status, tanggal=tanggal).exists():
+                # Baris baru mewarisi kumulatif tanggal sebelumnya
+                awal_jumlah, awal_total = _kumulatif(status, tanggal - timedelta(days=1))
+                PendapatanHarian.objects.create(
+                    statusSewa=status, tanggal=tanggal,
+                    kumulatifJumlah=awal_jumlah, kumulatifTotal=awal_total,
+                )
+            PendapatanHarian.objects.filter(statusSewa=status, tanggal=tanggal).update(
+                jumlah=F('jumlah') + jumlah, total=F('total') + total,
+            )
+            PendapatanHarian.objects.filter(statusSewa=status, tanggal__gte=tanggal).update(
+                kumulatifJumlah=F('kumulatifJumlah') + jumlah, kumulatifTotal=F('kumulatifTotal') + total,
+            )
+            # Baris kosong tidak mengubah kumulatif sesudahnya, jadi aman dibuang
+            PendapatanHarian.objects.filter(statusSewa=status, tanggal=tanggal, jumlah=0).delete()
+
+
+def _kontribusi(status, total_bayar, tanggal_pesan):
+    if not status or tanggal_pesan is None:
+        return {}
+    return {(status, tanggal_pesan): (1, total_bayar or Decimal('0'))}
+
+
+def _gabung(deltas, kontribusi, tanda):
+    for kunci, (jumlah, total) in kontribusi.items():
+        lama_jumlah, lama_total = deltas[kunci]
+        deltas[kunci] = (lama_jumlah + tanda * jumlah, lama_total + tanda * total)
+
+
+def penyewaan_changed(penyewaan, lama):
+    """Terapkan selisih fakta penyewaan sebelum dan sesudah disimpan."""
+    deltas = defaultdict(lambda: (0, Decimal('0')))
+    if lama is not None:
+        _gabung(deltas, _kontribusi(lama['statusSewa'], lama['totalBayar'], lama['tanggalPesan']), -1)
+    _gabung(deltas, _kontribusi(penyewaan.statusSewa, penyewaan.totalBayar, penyewaan.tanggalPesan), 1)
+    apply_deltas(deltas)
+
+
+def penyewaan_deleted(penyewaan):
+    deltas = defaultdict(lambda: (0, Decimal('0')))
+    _gabung(deltas, _kontribusi(penyewaan.statusSewa, penyewaan.totalBayar, penyewaan.tanggalPesan), -1)
+    apply_deltas(deltas)
+
+
+def penyewaan_status_changed(penyewaan_qs, status_baru):
+    """
+    Pindahkan fakta untuk perubahan status massal. Dipanggil sebelum UPDATE;
+    kontribusi dihitung per (status lama, tanggal) dalam satu query.
+    """
+    deltas = defaultdict(lambda: (0, Decimal('0')))
+    for row in _per_status_tanggal(penyewaan_qs.exclude(statusSewa=status_baru)):
+        nilai = (row['jumlah'], row['total'] or Decimal('0'))
+        _gabung(deltas, {(row['statusSewa'], row['tanggalPesan']): nilai}, -1)
+        _gabung(deltas, {(status_baru, row['tanggalPesan']): nilai}, 1)
+    apply_deltas(deltas)
+
+
+def _per_status_tanggal(penyewaan_qs):
+    return (
+        penyewaan_qs.order_by()
+        .values('statusSewa', 'tanggalPesan')
+        .annotate(jumlah=Count('pk'), total=Sum('totalBayar'))
+    )
+
+
+def expected_rows():
+    """Fakta harian yang seharusnya, dihitung ulang dari tabel Penyewaan (urut status, tanggal)."""
+    rows = []
+    kumulatif = {}
+    for row in _per_status_tanggal(Penyewaan.objects.all()).order_by('statusSewa', 'tanggalPesan'):
+        status = row['statusSewa']
+        total = row['total'] or Decimal('0')
+        awal_jumlah, awal_total = kumulatif.get(status, (0, Decimal('0')))
+        kumulatif[status] = (awal_jumlah + row['jumlah'], awal_total + total)
+        rows.append(PendapatanHarian(
+            statusSewa=status, tanggal=row['tanggalPesan'], jumlah=row['jumlah'], total=total,
+            kumulatifJumlah=kumulatif[status][0], kumulatifTotal=kumulatif[status][1],
+        ))
+    return rows
+
+
+def _nilai(row):
+    return (row.jumlah, Decimal(row.total), row.kumulatifJumlah, Decimal(row.kumulatifTotal))
+
+
+def check():
+    """
+    Bandingkan fakta harian dengan tabel Penyewaan. Mengembalikan daftar
+    (status, tanggal, nilai_tersimpan, nilai_seharusnya) yang berbeda; nilai
+    berupa (jumlah, total, kumulatifJumlah, kumulatifTotal) atau None.
+    """
+    seharusnya = {(row.statusSewa, row.tanggal): _nilai(row) for row in expected_rows()}
+    tersimpan = {(row.statusSewa, row.tanggal): _nilai(row) for row in PendapatanHarian.objects.all()}
+    return [
+        (status, tanggal, tersimpan.get((status, tanggal)), seharusnya.get((status, tanggal)))
+        for status, tanggal in sorted(seharusnya.keys() | tersimpan.keys())
+        if tersimpan.get((status, tanggal)) != seharusnya.get((status, tanggal))
+    ]
+
+
+def rebuild():
+    """Hitung ulang seluruh fakta harian dari tabel Penyewaan."""
+    rows = expected_rows()
+    with transaction.atomic():
+        PendapatanHarian.objects.all().delete()
+        PendapatanHarian.objects.bulk_create(rows, batch_size=1000)
@@ -0,0 +1,103 @@
+# core/signals.py
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Barang, DetailSewa, Pelanggan, Penyewaan
+
+
+@receiver(connection_created)
+def atur_pragma_sqlite(sender, connection, **kwargs):
+    # Profil SQLite (settings.SQLITE_PRAGMAS) untuk setiap koneksi baru; WAL
+    # hanya jika SQLITE_WAL=1. Database :memory: tetap berjalan;
+    # journal_mode-nya saja yang tidak berubah.
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for nama, nilai in pragmas.items():
+            cursor.execute(f'PRAGMA {nama} = {nilai}')
+
+
+@receiver(post_delete, sender=DetailSewa)
+def lepas_pemakaian_detail(sender, instance, **kwargs):
+    # Dipanggil juga saat DetailSewa ikut terhapus karena cascade dari Penyewaan
+    from .availability import release_detail
+    release_detail(instance)
+
+
+# -----------------------------------------------------------------
+# Snapshot dashboard admin
+# -----------------------------------------------------------------
+@receiver(post_save, sender=Pelanggan)
+def tambah_total_pelanggan(sender, instance, created, **kwargs):
+    if created:
+        from .dashboard import apply_deltas
+        apply_deltas({'total_pelanggan': 1})
+
+
+@receiver(post_delete, sender=Pelanggan)
+def kurangi_total_pelanggan(sender, instance, **kwargs):
+    from .dashboard import apply_deltas
+    apply_deltas({'total_pelanggan': -1})
+
+
+@receiver(post_save, sender=Barang)
+def tambah_total_barang(sender, instance, created, **kwargs):
+    if created:
+        from .dashboard import apply_deltas
+        apply_deltas({'total_barang': 1})
+
+
+@receiver(post_delete, sender=Barang)
+def kurangi_total_barang(sender, instance, **kwargs):
+    from .dashboard import apply_deltas
+    apply_deltas({'total_barang': -1})
+
+
+@receiver(post_delete, sender=Penyewaan)
+def kurangi_pendapatan_penyewaan(sender, instance, **kwargs):
+    from .dashboard import penyewaan_deleted
+    penyewaan_deleted(instance)
+
+
+@receiver(post_delete, sender=Penyewaan)
+def kurangi_pendapatan_harian(sender, instance, **kwargs):
+    from . import revenue
+    revenue.penyewaan_deleted(instance)
+
+
+# -----------------------------------------------------------------
+# Cache Pelanggan yang login (core/middleware.py)
+# -----------------------------------------------------------------
+@receiver(post_save, sender=Pelanggan)
+@receiver(post_delete, sender=Pelanggan)
+def hapus_cache_pelanggan(sender, instance, **kwargs):
+    from django.core.cache import cache
+    from .middleware import pelanggan_cache_key
+    cache.delete(pelanggan_cache_key(instance.pk))
+
+
+# -----------------------------------------------------------------
+# Cache halaman anonim (core/page_cache.py)
+# -----------------------------------------------------------------
+@receiver(post_save, sender=Barang)
+@receiver(post_delete, sender=Barang)
+def invalidasi_cache_halaman(sender, instance, **kwargs):
+    from .page_cache import invalidate
+    invalidate()
+
+
+# -----------------------------------------------------------------
+# Cache jumlah baris laporan admin (core/report_cache.py)
+# -----------------------------------------------------------------
+@receiver(post_save, sender=Pelanggan)
+@receiver(post_delete, sender=Pelanggan)
+@receiver(post_save, sender=Penyewaan)
+@receiver(post_delete, sender=Penyewaan)
+@receiver(post_save, sender=DetailSewa)
+@receiver(post_delete, sender=DetailSewa)
+def invalidasi_cache_laporan(sender, instance, **kwargs):
+    from .report_cache import invalidate
+    invalidate(sender)
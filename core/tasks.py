@@ -0,0 +1,27 @@
+from celery import shared_task
+
+from . import page_cache, report_jobs
+from .images import generate_derivatives
+from .models import Barang
+from .report_cache import shared_cache
+
+
+@shared_task(bind=True, ignore_result=True)
+def buat_laporan(self, job_id):
+    """Buat berkas PDF/ekspor untuk PekerjaanLaporan `job_id` (lihat core/report_jobs.py)."""
+    # Di proses worker terpisah cache laporan hanya berlaku bila backendnya
+    # dipakai bersama; mode eager berjalan di proses web itu sendiri
+    report_jobs.run(job_id, use_cache=self.request.is_eager or shared_cache())
+
+
+@shared_task(ignore_result=True)
+def buat_turunan_foto(barang_id):
+    """Buat turunan foto Barang `barang_id` lalu isi fotoHash-nya (lihat core/images.py)."""
+    barang = Barang.objects.filter(pk=barang_id).only('pk', 'foto').first()
+    if barang is None or not barang.foto:
+        return
+    foto_hash = generate_derivatives(barang.foto)
+    # Foto bisa sudah diganti lagi selama turunannya dibuat
+    if Barang.objects.filter(pk=barang_id, foto=barang.foto.name).update(fotoHash=foto_hash):
+        # UPDATE langsung tidak memicu signal Barang
+        page_cache.invalidate()
@@ -0,0 +1,41 @@
+# core/templatetags/barang_images.py
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..images import VARIANTS, derivative_urls
+
+register = template.Library()
+
+
+@register.simple_tag
+def foto_barang(barang, variant='card', sizes=None, **attrs):
+    """
+    Render foto Barang sebagai <picture> responsif (WebP + JPEG progresif).
+
+    Contoh: {% foto_barang barang 'card' sizes='(max-width: 576px) 100vw, 33vw' class='card-img-top' %}
+    """
+    alt = attrs.pop('alt', barang.namaBarang)
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    sizes = sizes or f'{VARIANTS[variant]}px'
+
+    try:
+        urls = derivative_urls(barang)
+    except (OSError, ValueError):
+        # Storage turunan tidak bisa dibaca: pakai foto asli
+        urls = None
+    if urls is None:
+        if not barang.foto:
+            return ''
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', barang.foto.url, alt, extra)
+
+    def srcset(fmt):
+        return ', '.join(f'{url} {width}w' for url, width in urls[fmt])
+
+    src = next(url for url, width in urls['jpeg'] if width == VARIANTS[variant])
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy" decoding="async"{}>'
+        '</picture>',
+        srcset('webp'), sizes, src, srcset('jpeg'), sizes, alt, extra,
+    )
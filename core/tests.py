@@ -1,3 +1,1306 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import re
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models import Count, F, Max, Sum
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from PasirMas.celery import app as celery_app
+
+from . import cart as cart_store, dashboard, report_jobs, revenue
+from .models import (
+    Barang, DetailSewa, ItemKeranjang, PekerjaanLaporan, PemakaianHarian, Pelanggan, PendapatanHarian, Penyewaan,
+    RingkasanDashboard, TrackedFieldsMixin,
+)
+from .availability import (
+    TRANSISI_MASSAL, available_quantities, bulk_set_status, free_units, rebuild as rebuild_pemakaian, try_reserve,
+)
+from .dashboard import KUNCI_DIBANGUN, STATUS_SUKSES
+from .images import generate_derivatives
+from .pagination import KeysetPaginator
+from .report_cache import exact_count, report_result, row_count
+
+# Baris rencana SQLite untuk pemindaian tabel penuh, misalnya "SCAN core_barang"
+# (SQLite lama menulis "SCAN TABLE core_barang"). Pemindaian lewat index
+# ("SCAN core_barang USING INDEX ...") tidak dihitung.
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+def explain_full_scans(sql):
+    """Nama tabel yang dipindai penuh oleh `sql` menurut EXPLAIN QUERY PLAN."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        plan = [row[-1] for row in cursor.fetchall()]
+    return {match.group(1) for match in map(FULL_SCAN.match, plan) if match}
+
+
+def seed_dataset():
+    """Data contoh kecil tapi representatif untuk halaman pelanggan dan laporan admin."""
+    pelanggan = Pelanggan(namaPelanggan='Pelanggan Uji', noHp='081200000000')
+    pelanggan.set_password('rahasia123')
+    pelanggan.save()
+    Pelanggan.objects.bulk_create(
+        [Pelanggan(namaPelanggan=f'Pelanggan {i}', noHp=f'0813{i:08d}', password='!') for i in range(50)]
+    )
+    pelanggan_ids = list(Pelanggan.objects.values_list('pk', flat=True))
+
+    Barang.objects.bulk_create([
+        Barang(namaBarang=f'Barang {i:03d}', harga=Decimal(10000 + i * 500), stok=(i % 7),
+               deskripsi='Barang uji', ukuran='Sedang')
+        for i in range(40)
+    ])
+    barang_ids = list(Barang.objects.values_list('pk', flat=True))
+
+    statuses = ['Pending', 'Confirmed', 'Completed', 'Cancelled']
+    awal = date.today() - timedelta(days=200)
+    Penyewaan.objects.bulk_create([
+        Penyewaan(
+            tanggalAcara=awal + timedelta(days=i % 240), durasiSewa=1 + i % 3,
+            tanggalPembongkaran=awal + timedelta(days=i % 240 + 2 + i % 3),
+            totalBayar=Decimal(50000 + i * 100), statusSewa=statuses[i % 4],
+            alamatPemasangan='Jl. Uji', idPelanggan_id=pelanggan_ids[i % len(pelanggan_ids)],
+        )
+        for i in range(400)
+    ])
+    # tanggalPesan memakai auto_now_add, sebar ke beberapa bulan agar filter tanggal bermakna
+    for i, pk in enumerate(Penyewaan.objects.values_list('pk', flat=True)):
+        if i % 5:
+            Penyewaan.objects.filter(pk=pk).update(tanggalPesan=awal + timedelta(days=i % 200))
+
+    DetailSewa.objects.bulk_create([
+        DetailSewa(idPenyewaan_id=penyewaan_id, idBarang_id=barang_ids[(penyewaan_id + j) % len(barang_ids)],
+                   jumlahBarang=1 + j, statusBarang=['Baik', 'Rusak', 'Hilang'][(penyewaan_id + j) % 3],
+                   subTotal=Decimal(10000))
+        for penyewaan_id in Penyewaan.objects.values_list('pk', flat=True)
+        for j in range(2)
+    ])
+    rebuild_pemakaian()
+    return pelanggan
+
+
+class QueryPlanTests(TestCase):
+    """
+    Menangkap SQL setiap halaman panas lewat test client, lalu memastikan
+    tabel yang dijaga tidak dipindai penuh (EXPLAIN QUERY PLAN SQLite).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pelanggan = seed_dataset()
+        cls.admin = User.objects.create_superuser('admin_uji', 'admin@example.com', 'rahasia123')
+        cls.penyewaan = Penyewaan.objects.filter(idPelanggan=cls.pelanggan).first()
+
+    def setUp(self):
+        cache.clear()
+        # Pekerjaan PDF/ekspor dijalankan langsung di proses uji (tanpa worker)
+        # (konfigurasi dibaca dari settings dengan namespace CELERY)
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.CELERY_TASK_ALWAYS_EAGER = True
+        self.addCleanup(setattr, celery_app.conf, 'CELERY_TASK_ALWAYS_EAGER', eager)
+        berkas = tempfile.TemporaryDirectory()
+        self.addCleanup(berkas.cleanup)
+        override = self.settings(REPORT_JOBS_DIR=berkas.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def login_pelanggan(self):
+        session = self.client.session
+        session['pelanggan_id'] = self.pelanggan.pk
+        session.save()
+
+    def capture(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            # PDF/ekspor diarahkan ke halaman pekerjaannya; query laporan ikut tertangkap
+            response = self.client.get(url, follow=True)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        return [query['sql'] for query in ctx.captured_queries]
+
+    def assertNoFullScan(self, url, tables):
+        queries = self.capture(url)
+        self.assertTrue(queries, url)
+        for sql in queries:
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            scanned = explain_full_scans(sql) & set(tables)
+            self.assertFalse(scanned, f'{url}: full scan {scanned} pada\n{sql}')
+
+    def test_halaman_pelanggan(self):
+        besok = (date.today() + timedelta(days=1)).isoformat()
+        self.assertNoFullScan('/barang/', ['core_barang'])
+        self.assertNoFullScan(f'/barang/?tanggalAcara={besok}&durasiSewa=2', ['core_barang', 'core_pemakaianharian'])
+
+        self.login_pelanggan()
+        self.assertNoFullScan('/history/', ['core_penyewaan', 'core_pelanggan'])
+        self.assertNoFullScan(f'/history/detail/{self.penyewaan.pk}/', ['core_penyewaan', 'core_detailsewa'])
+
+    def test_laporan_admin(self):
+        self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+        dari = (date.today() - timedelta(days=60)).isoformat()
+        sampai = (date.today() - timedelta(days=30)).isoformat()
+        rentang = f'tanggalPesan__gte={dari}&tanggalPesan__lte={sampai}'
+
+        for prefix in ('/admin/laporan/penyewaan/', '/admin/laporan/penyewaan/pdf/'):
+            with self.subTest(prefix=prefix):
+                self.assertNoFullScan(f'{prefix}?statusSewa=Confirmed', ['core_penyewaan'])
+                self.assertNoFullScan(f'{prefix}?{rentang}', ['core_penyewaan'])
+                self.assertNoFullScan(f'{prefix}?statusSewa=Pending&{rentang}', ['core_penyewaan'])
+
+        for prefix in ('/admin/laporan/keuangan/', '/admin/laporan/keuangan/pdf/', '/admin/laporan/keuangan/export/'):
+            with self.subTest(prefix=prefix):
+                self.assertNoFullScan(prefix, ['core_penyewaan'])
+                self.assertNoFullScan(f'{prefix}?{rentang}', ['core_penyewaan'])
+
+        for prefix in ('/admin/laporan/barang/', '/admin/laporan/barang/pdf/', '/admin/laporan/barang/export/'):
+            with self.subTest(prefix=prefix):
+                self.assertNoFullScan(f'{prefix}?statusBarang=Rusak', ['core_detailsewa', 'core_penyewaan', 'core_barang'])
+
+
+class AdminQueryCountTests(TestCase):
+    """Jumlah query changelist admin tidak boleh bertambah seiring jumlah baris."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_uji', 'admin@example.com', 'rahasia123')
+        cls.barang = Barang.objects.create(namaBarang='Tenda', harga=Decimal('100000'), stok=1000,
+                                           deskripsi='Tenda uji', ukuran='Besar')
+
+    def setUp(self):
+        self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+        self.nomor = 0
+
+    def tambah_penyewaan(self, jumlah, detail_per_sewa=2):
+        for _ in range(jumlah):
+            self.nomor += 1
+            pelanggan = Pelanggan.objects.create(namaPelanggan=f'Pelanggan {self.nomor}', noHp=f'0812{self.nomor:08d}',
+                                                 password='!')
+            penyewaan = Penyewaan.objects.create(
+                tanggalAcara=date.today(), durasiSewa=1, tanggalPembongkaran=date.today() + timedelta(days=2),
+                statusSewa='Pending', alamatPemasangan='Jl. Uji', idPelanggan=pelanggan,
+            )
+            for _ in range(detail_per_sewa):
+                DetailSewa.objects.create(idPenyewaan=penyewaan, idBarang=self.barang, jumlahBarang=1)
+        return penyewaan
+
+    def jumlah_query(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def test_changelist_konstan(self):
+        urls = ['/admin/core/penyewaan/', '/admin/core/pelanggan/', '/admin/core/barang/']
+        self.tambah_penyewaan(3)
+        awal = {url: self.jumlah_query(url) for url in urls}
+        self.tambah_penyewaan(30)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.jumlah_query(url), awal[url])
+
+    def test_changelist_kolom_agregat(self):
+        self.tambah_penyewaan(1, detail_per_sewa=3)
+        response = self.client.get('/admin/core/penyewaan/')
+        self.assertContains(response, 'Rp 300,000')
+        self.assertContains(response, 'Pelanggan 1')
+
+    def test_inline_detail_konstan(self):
+        sedikit = self.tambah_penyewaan(1, detail_per_sewa=1)
+        banyak = self.tambah_penyewaan(1, detail_per_sewa=12)
+        self.jumlah_query(f'/admin/core/penyewaan/{sedikit.pk}/change/')  # Pemanasan cache ContentType dll.
+        self.assertEqual(
+            self.jumlah_query(f'/admin/core/penyewaan/{banyak.pk}/change/'),
+            self.jumlah_query(f'/admin/core/penyewaan/{sedikit.pk}/change/'),
+        )
+
+    def jumlah_query_post(self, url, data):
+        """Jumlah query satu POST admin; perubahannya di-rollback agar bisa diulang dari keadaan yang sama."""
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(url, data)
+            self.assertEqual(response.status_code, 302, url)
+            transaction.set_rollback(True)
+        return len(ctx.captured_queries)
+
+    def test_ubah_penyewaan_tanpa_select_ulang(self):
+        # Menyelesaikan penyewaan sambil mengubah jumlah tiga DetailSewa: nilai
+        # lama diambil dari TrackedFieldsMixin, bukan satu SELECT per save()
+        penyewaan = self.tambah_penyewaan(1, detail_per_sewa=3)
+        url = f'/admin/core/penyewaan/{penyewaan.pk}/change/'
+        data = {
+            'idPelanggan': penyewaan.idPelanggan_id, 'tanggalAcara': penyewaan.tanggalAcara,
+            'tanggalPembongkaran': penyewaan.tanggalPembongkaran, 'durasiSewa': 1, 'alamatPemasangan': 'Jl. Uji',
+            'statusSewa': 'Completed', 'feedback': '', '_save': 'Simpan',
+            'detailsewa_set-TOTAL_FORMS': 3, 'detailsewa_set-INITIAL_FORMS': 3,
+            'detailsewa_set-MIN_NUM_FORMS': 0, 'detailsewa_set-MAX_NUM_FORMS': 1000,
+        }
+        for i, detail in enumerate(penyewaan.detailsewa_set.order_by('pk')):
+            data.update({
+                f'detailsewa_set-{i}-idDetailSewa': detail.pk, f'detailsewa_set-{i}-idPenyewaan': penyewaan.pk,
+                f'detailsewa_set-{i}-idBarang': self.barang.pk, f'detailsewa_set-{i}-jumlahBarang': 2,
+                f'detailsewa_set-{i}-jumlahBermasalah': 0, f'detailsewa_set-{i}-statusBarang': 'Baik',
+            })
+
+        self.jumlah_query_post(url, data)  # Pemanasan cache ContentType dll.
+        dilacak = self.jumlah_query_post(url, data)
+        # Tanpa nilai yang diingat setiap save() kembali membaca barisnya
+        with mock.patch.object(TrackedFieldsMixin, '_ingat_nilai'):
+            tanpa_lacak = self.jumlah_query_post(url, data)
+        # Tiga save() Penyewaan (form admin, lalu dua kali totalBayar) dan tiga DetailSewa
+        self.assertEqual(tanpa_lacak - dilacak, 6)
+
+        self.client.post(url, data)
+        penyewaan.refresh_from_db()
+        self.assertEqual(penyewaan.statusSewa, 'Completed')
+        self.assertEqual(list(penyewaan.detailsewa_set.values_list('jumlahBarang', flat=True)), [2, 2, 2])
+        self.assertFalse(PemakaianHarian.objects.filter(jumlahDipesan__gt=0).exists())
+
+
+class StatusMassalTests(TestCase):
+    """
+    bulk_set_status() pada pilihan campuran harus meninggalkan pemakaian
+    harian, snapshot dashboard dan fakta pendapatan yang sama dengan hasil
+    hitung ulang dari data sumber (termasuk SUM per hari di release_penyewaan).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset()
+        # Dua DetailSewa dengan barang yang sama dalam satu penyewaan aktif
+        detail = DetailSewa.objects.filter(idPenyewaan__statusSewa='Pending').select_related('idPenyewaan').first()
+        DetailSewa.objects.bulk_create([DetailSewa(idPenyewaan=detail.idPenyewaan, idBarang_id=detail.idBarang_id,
+                                                   jumlahBarang=3, subTotal=Decimal(30000))])
+        rebuild_pemakaian()
+        dashboard.rebuild()
+        revenue.rebuild()
+
+    def pemakaian(self):
+        return {
+            (barang, tanggal): jumlah
+            for barang, tanggal, jumlah in PemakaianHarian.objects.values_list('idBarang_id', 'tanggal', 'jumlahDipesan')
+            if jumlah
+        }
+
+    def ringkasan(self):
+        return {
+            kunci: nilai
+            for kunci, nilai in RingkasanDashboard.objects.exclude(kunci=KUNCI_DIBANGUN).values_list('kunci', 'nilai')
+            if nilai
+        }
+
+    def assertSamaDenganHitungUlang(self):
+        self.assertEqual(revenue.check(), [])
+        pemakaian, ringkasan = self.pemakaian(), self.ringkasan()
+        rebuild_pemakaian()
+        dashboard.rebuild()
+        self.assertEqual(pemakaian, self.pemakaian())
+        self.assertEqual(ringkasan, self.ringkasan())
+
+    def test_pilihan_campuran(self):
+        pks = list(Penyewaan.objects.order_by('pk').values_list('pk', flat=True))
+        langkah = [
+            ('Confirmed', pks[0:120]),
+            ('Completed', pks[60:200]),
+            ('Cancelled', pks[150:300]),
+            ('Completed', pks),
+        ]
+        for status, pilihan in langkah:
+            with self.subTest(status=status, dari=pilihan[0], sampai=pilihan[-1]):
+                dipilih = Penyewaan.objects.filter(pk__in=pilihan)
+                sebelum = dict(dipilih.values_list('pk', 'statusSewa'))
+                self.assertGreater(len(set(sebelum.values())), 1)
+                boleh = [pk for pk, lama in sebelum.items() if lama in TRANSISI_MASSAL[status]]
+
+                self.assertEqual(bulk_set_status(dipilih, status), len(boleh))
+                sesudah = dict(dipilih.values_list('pk', 'statusSewa'))
+                self.assertEqual(sesudah, {pk: status if pk in boleh else lama for pk, lama in sebelum.items()})
+                self.assertSamaDenganHitungUlang()
+
+
+class PendapatanHarianTests(TestCase):
+    """
+    Fakta pendapatan harian (core/revenue.py) harus selalu sama dengan hitung
+    ulang dari tabel Penyewaan (`cek_pendapatan`), dan total rentang dari
+    kumulatifnya sama dengan SUM langsung atas Penyewaan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pelanggan = seed_dataset()
+        revenue.rebuild()
+
+    def langsung(self, mulai=None, selesai=None):
+        penyewaan = Penyewaan.objects.filter(statusSewa__in=STATUS_SUKSES)
+        if mulai is not None:
+            penyewaan = penyewaan.filter(tanggalPesan__gte=mulai)
+        if selesai is not None:
+            penyewaan = penyewaan.filter(tanggalPesan__lte=selesai)
+        hasil = penyewaan.aggregate(jumlah=Count('pk'), total=Sum('totalBayar'))
+        return hasil['jumlah'], hasil['total'] or Decimal('0')
+
+    def assertKonsisten(self):
+        self.assertEqual(revenue.check(), [])
+        hari_ini = date.today()
+        for mulai, selesai in [(None, None), (hari_ini - timedelta(days=90), hari_ini - timedelta(days=30)),
+                               (hari_ini, hari_ini), (hari_ini - timedelta(days=150), None)]:
+            self.assertEqual(revenue.revenue(mulai, selesai), self.langsung(mulai, selesai), (mulai, selesai))
+
+    def test_rentang_sama_dengan_sum(self):
+        self.assertKonsisten()
+        awal = date.today() - timedelta(days=200)
+        for mulai in range(0, 200, 37):
+            for panjang in (0, 1, 13, 90):
+                with self.subTest(mulai=mulai, panjang=panjang):
+                    dari = awal + timedelta(days=mulai)
+                    sampai = dari + timedelta(days=panjang)
+                    self.assertEqual(revenue.revenue(dari, sampai), self.langsung(dari, sampai))
+        # Sebelum penyewaan pertama
+        self.assertEqual(revenue.revenue(None, awal - timedelta(days=1)), (0, Decimal('0')))
+
+    def test_buat_ubah_status_hapus(self):
+        penyewaan = Penyewaan.objects.create(
+            idPelanggan=self.pelanggan, tanggalAcara=date.today() + timedelta(days=5), durasiSewa=2,
+            tanggalPembongkaran=date.today() + timedelta(days=7), totalBayar=Decimal('250000'),
+            statusSewa='Pending', alamatPemasangan='Jl. Uji',
+        )
+        self.assertKonsisten()
+
+        langkah = [
+            # Tanggal pesan di tengah data menggeser kumulatif semua tanggal sesudahnya
+            {'tanggalPesan': date.today() - timedelta(days=60)},
+            {'statusSewa': 'Confirmed'},
+            {'totalBayar': Decimal('300000')},
+            {'statusSewa': 'Completed', 'tanggalPesan': date.today() - timedelta(days=100)},
+            {'statusSewa': 'Cancelled'},
+            {'statusSewa': 'Confirmed'},
+        ]
+        for perubahan in langkah:
+            with self.subTest(**{k: str(v) for k, v in perubahan.items()}):
+                for field, nilai in perubahan.items():
+                    setattr(penyewaan, field, nilai)
+                penyewaan.save()
+                self.assertKonsisten()
+
+        penyewaan.delete()
+        self.assertKonsisten()
+
+    def test_cek_pendapatan(self):
+        out = io.StringIO()
+        call_command('cek_pendapatan', stdout=out)
+        self.assertIn('konsisten', out.getvalue())
+
+        baris = PendapatanHarian.objects.filter(statusSewa='Confirmed').order_by('tanggal')[5]
+        PendapatanHarian.objects.filter(pk=baris.pk).update(total=F('total') + 1)
+        with self.assertRaises(CommandError):
+            call_command('cek_pendapatan', stdout=io.StringIO())
+        call_command('cek_pendapatan', '--perbaiki', stdout=io.StringIO())
+        self.assertEqual(revenue.check(), [])
+
+
+def serbu(fungsi, argumen):
+    """
+    Jalankan fungsi(arg) untuk setiap arg di thread sendiri, dimulai serentak
+    lewat barrier. Setiap thread memakai koneksi database sendiri yang ditutup
+    setelah selesai. Mengembalikan (hasil, galat) dengan galat berisi repr exception.
+    """
+    argumen = list(argumen)
+    mulai = threading.Barrier(len(argumen))
+    hasil, galat = [], []
+
+    def jalankan(arg):
+        try:
+            mulai.wait()
+            hasil.append(fungsi(arg))
+        except Exception as exc:  # Dilaporkan ke pemanggil
+            galat.append(repr(exc))
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=jalankan, args=(arg,)) for arg in argumen]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return hasil, galat
+
+
+class CheckoutBersamaanTests(TransactionTestCase):
+    """
+    N pelanggan checkout barang yang sama pada detik yang sama, masing-masing
+    dengan koneksi database sendiri (satu thread per request). Tidak boleh ada
+    lock error dan stok tidak boleh terpesan melebihi jumlahnya.
+    """
+
+    JUMLAH_THREAD = 16
+    STOK = 10
+
+    def setUp(self):
+        cache.clear()
+        self.assertEqual(connection.vendor, 'sqlite')
+        with connection.cursor() as cursor:
+            # Profil produksi (SQLITE_WAL=1); tersimpan di file database uji
+            # sehingga koneksi setiap thread juga memakai WAL
+            cursor.execute('PRAGMA journal_mode = WAL')
+            self.assertEqual(cursor.fetchone()[0].lower(), 'wal')
+        self.barang = Barang.objects.create(namaBarang='Kursi', harga=Decimal('5000'), stok=self.STOK,
+                                            deskripsi='Kursi uji', ukuran='Sedang')
+        self.clients = []
+        for i in range(self.JUMLAH_THREAD):
+            pelanggan = Pelanggan.objects.create(namaPelanggan=f'Pelanggan {i}', noHp=f'0812{i:08d}', password='!')
+            ItemKeranjang.objects.create(idPelanggan=pelanggan, idBarang=self.barang, jumlah=1)
+            client = Client()
+            session = client.session
+            session['pelanggan_id'] = pelanggan.pk
+            session.save()
+            self.clients.append(client)
+
+    def test_checkout_bersamaan_tanpa_lock_error(self):
+        data = {
+            'alamatPemasangan': 'Jl. Uji',
+            'tanggalAcara': (date.today() + timedelta(days=3)).isoformat(),
+            'durasiSewa': '2',
+        }
+
+        def checkout(client):
+            response = client.post(reverse('process_checkout'), data)
+            return [str(pesan) for pesan in get_messages(response.wsgi_request)]
+
+        hasil, galat = serbu(checkout, self.clients)
+
+        self.assertEqual(galat, [])
+        pesan = [teks for daftar in hasil for teks in daftar]
+        self.assertFalse([teks for teks in pesan if 'locked' in teks.lower()], pesan)
+        berhasil = [teks for teks in pesan if teks.startswith('Sewa berhasil')]
+        ditolak = [teks for teks in pesan if teks.startswith('Stok untuk')]
+        self.assertEqual(len(berhasil), self.STOK)
+        self.assertEqual(len(ditolak), self.JUMLAH_THREAD - self.STOK)
+        self.assertEqual(Penyewaan.objects.count(), self.STOK)
+        self.assertEqual(
+            PemakaianHarian.objects.filter(idBarang=self.barang).aggregate(puncak=Max('jumlahDipesan'))['puncak'],
+            self.STOK,
+        )
+
+
+class ReservasiOptimistisTests(TransactionTestCase):
+    """try_reserve(): satu UPDATE bersyarat per barang, tanpa baca stok dan tanpa lock baris."""
+
+    def setUp(self):
+        self.mulai = date.today() + timedelta(days=10)
+        self.selesai = self.mulai + timedelta(days=2)
+        self.panas = Barang.objects.create(namaBarang='Tenda Panas', harga=Decimal('100000'), stok=25,
+                                           deskripsi='Barang uji', ukuran='Besar')
+        self.lain = Barang.objects.create(namaBarang='Meja', harga=Decimal('20000'), stok=3,
+                                          deskripsi='Barang uji', ukuran='Sedang')
+
+    def puncak(self, barang):
+        return PemakaianHarian.objects.filter(idBarang=barang).aggregate(puncak=Max('jumlahDipesan'))['puncak']
+
+    def test_hasil_per_item(self):
+        with transaction.atomic():
+            kurang = try_reserve({self.panas.pk: 5, self.lain.pk: 4}, self.mulai, self.selesai)
+        self.assertEqual(kurang, {self.lain.pk})
+        self.assertEqual(self.puncak(self.panas), 5)
+        # Barang yang gagal tidak meninggalkan baris pemakaian
+        self.assertFalse(PemakaianHarian.objects.filter(idBarang=self.lain).exists())
+
+    def test_rentang_sebagian_penuh_ditolak_utuh(self):
+        with transaction.atomic():
+            self.assertEqual(try_reserve({self.lain.pk: 3}, self.selesai, self.selesai), set())
+            self.assertEqual(try_reserve({self.lain.pk: 1}, self.mulai, self.selesai), {self.lain.pk})
+        # Hari lain dalam rentang tidak ikut bertambah
+        self.assertEqual(
+            list(PemakaianHarian.objects.filter(idBarang=self.lain).values_list('tanggal', 'jumlahDipesan')),
+            [(self.selesai, 3)],
+        )
+
+    def test_barang_panas_dari_banyak_thread(self):
+        percobaan_per_thread = 4
+
+        def pesan(_):
+            berhasil = 0
+            for _ in range(percobaan_per_thread):
+                with transaction.atomic():
+                    if not try_reserve({self.panas.pk: 1}, self.mulai, self.selesai):
+                        berhasil += 1
+            return berhasil
+
+        hasil, galat = serbu(pesan, range(20))
+
+        self.assertEqual(galat, [])
+        self.assertEqual(sum(hasil), self.panas.stok)
+        self.assertEqual(
+            set(PemakaianHarian.objects.filter(idBarang=self.panas).values_list('jumlahDipesan', flat=True)),
+            {self.panas.stok},
+        )
+
+
+class CheckoutQueryCountTests(TestCase):
+    """Jumlah query checkout tidak bergantung pada jumlah barang di keranjang."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barang = [
+            Barang.objects.create(namaBarang=f'Barang {i}', harga=Decimal('10000'), stok=10,
+                                  deskripsi='Barang uji', ukuran='Sedang')
+            for i in range(15)
+        ]
+        cls.data = {
+            'alamatPemasangan': 'Jl. Uji',
+            'tanggalAcara': (date.today() + timedelta(days=3)).isoformat(),
+            'durasiSewa': '2',
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def klien_dengan_keranjang(self, nomor, barang):
+        pelanggan = Pelanggan.objects.create(namaPelanggan=f'Pelanggan {nomor}', noHp=f'0812{nomor:08d}', password='!')
+        ItemKeranjang.objects.bulk_create([ItemKeranjang(idPelanggan=pelanggan, idBarang=b, jumlah=2) for b in barang])
+        client = Client()
+        session = client.session
+        session['pelanggan_id'] = pelanggan.pk
+        session.save()
+        return client, pelanggan
+
+    def checkout(self, client):
+        response = client.post(reverse('process_checkout'), self.data)
+        return [str(pesan) for pesan in get_messages(response.wsgi_request)]
+
+    def test_satu_dan_lima_belas_barang(self):
+        satu, pelanggan_satu = self.klien_dengan_keranjang(1, self.barang[:1])
+        banyak, pelanggan_banyak = self.klien_dengan_keranjang(2, self.barang)
+        # Pemanasan cache ContentType, sesi, dll. dengan pelanggan lain
+        self.checkout(self.klien_dengan_keranjang(3, self.barang[:1])[0])
+
+        with CaptureQueriesContext(connection) as ctx:
+            pesan = self.checkout(satu)
+        self.assertTrue(pesan[0].startswith('Sewa berhasil'), pesan)
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            pesan = self.checkout(banyak)
+        self.assertTrue(pesan[0].startswith('Sewa berhasil'), pesan)
+
+        self.assertEqual(DetailSewa.objects.filter(idPenyewaan__idPelanggan=pelanggan_banyak).count(), 15)
+        self.assertEqual(
+            set(PemakaianHarian.objects.filter(idBarang__in=self.barang[1:]).values_list('jumlahDipesan', flat=True)),
+            {2},
+        )
+
+    def test_harga_dan_kirim_ulang(self):
+        client, pelanggan = self.klien_dengan_keranjang(5, self.barang[:3])
+        ItemKeranjang.objects.filter(idPelanggan=pelanggan, idBarang=self.barang[0]).update(jumlah=4)
+        self.assertTrue(self.checkout(client)[0].startswith('Sewa berhasil'))
+
+        penyewaan = Penyewaan.objects.get(idPelanggan=pelanggan)
+        self.assertEqual(penyewaan.statusSewa, 'Pending')
+        self.assertEqual(penyewaan.tanggalPembongkaran, date.today() + timedelta(days=5))
+        # (4 + 2 + 2) unit x Rp 10.000 per hari x 2 hari
+        self.assertEqual(penyewaan.totalBayar, Decimal('160000'))
+        self.assertEqual(
+            dict(penyewaan.detailsewa_set.values_list('idBarang', 'subTotal')),
+            {self.barang[0].pk: Decimal('40000'), self.barang[1].pk: Decimal('20000'), self.barang[2].pk: Decimal('20000')},
+        )
+        self.assertFalse(ItemKeranjang.objects.filter(idPelanggan=pelanggan).exists())
+        self.assertEqual(
+            PemakaianHarian.objects.get(idBarang=self.barang[0], tanggal=date.today() + timedelta(days=3)).jumlahDipesan, 4,
+        )
+
+        # Formulir yang terkirim dua kali menemukan keranjang sudah kosong
+        pesan = self.checkout(client)
+        self.assertTrue(pesan[-1].startswith('Keranjang Anda kosong'), pesan)
+        self.assertEqual(Penyewaan.objects.filter(idPelanggan=pelanggan).count(), 1)
+        self.assertEqual(
+            PemakaianHarian.objects.get(idBarang=self.barang[0], tanggal=date.today() + timedelta(days=3)).jumlahDipesan, 4,
+        )
+
+    def test_stok_kurang_ditolak_utuh(self):
+        # Barang terakhir hanya tersisa 1 unit: seluruh checkout dibatalkan
+        try_reserve({self.barang[-1].pk: 9}, date.today() + timedelta(days=3), date.today() + timedelta(days=6))
+        client, pelanggan = self.klien_dengan_keranjang(4, self.barang)
+        pesan = self.checkout(client)
+        self.assertEqual(len(pesan), 1)
+        self.assertTrue(pesan[0].startswith(f'Stok untuk {self.barang[-1].namaBarang}'), pesan)
+        self.assertFalse(Penyewaan.objects.filter(idPelanggan=pelanggan).exists())
+        self.assertEqual(
+            list(PemakaianHarian.objects.filter(jumlahDipesan__gt=0).values_list('idBarang', flat=True).distinct()),
+            [self.barang[-1].pk],
+        )
+
+
+class CacheHalamanTests(TestCase):
+    """Cache halaman anonim: versi ikut naik saat Barang berubah, dan mati tanpa backend bersama."""
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        override = self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': folder.name,
+        }})
+        override.enable()
+        self.addCleanup(override.disable)
+        self.barang = Barang.objects.create(namaBarang='Tenda', harga=Decimal('100000'), stok=3,
+                                            deskripsi='Barang uji', ukuran='Besar')
+
+    def test_hit_dan_invalidasi(self):
+        self.assertEqual(self.client.get('/barang/')['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/barang/')['X-Page-Cache'], 'HIT')
+        self.barang.stok = 4
+        self.barang.save()
+        self.assertEqual(self.client.get('/barang/')['X-Page-Cache'], 'MISS')
+
+    def test_tanpa_cache_bersama(self):
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            for _ in range(2):
+                response = self.client.get('/barang/')
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('X-Page-Cache'))
+
+
+class JumlahLaporanCacheTests(TestCase):
+    """Cache jumlah baris laporan: ikut versi data, dan tidak dipakai tanpa backend bersama."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset()
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        override = self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': folder.name,
+        }})
+        override.enable()
+        self.addCleanup(override.disable)
+        self.queryset = Penyewaan.objects.filter(statusSewa='Pending')
+        self.params = [('statusSewa', 'Pending')]
+
+    def tambah_pending(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Penyewaan.objects.create(
+                tanggalAcara=date.today(), durasiSewa=1, tanggalPembongkaran=date.today() + timedelta(days=2),
+                statusSewa='Pending', alamatPemasangan='Jl. Uji', idPelanggan=Pelanggan.objects.first(),
+            )
+
+    def test_versi_naik_setelah_tulis(self):
+        jumlah = self.queryset.count()
+        self.assertEqual(row_count('report_penyewaan', self.queryset, self.params), (jumlah, False))
+        with self.assertNumQueries(0):
+            self.assertEqual(row_count('report_penyewaan', self.queryset, self.params), (jumlah, False))
+        self.tambah_pending()
+        self.assertEqual(row_count('report_penyewaan', self.queryset, self.params), (jumlah + 1, False))
+
+    def test_daftar_pk_bersama(self):
+        queryset = self.queryset.order_by('-tanggalPesan', '-pk')
+        ids = list(queryset.values_list('pk', flat=True))
+        self.assertEqual(report_result('report_penyewaan', queryset, self.params), ids)
+        # Pekerjaan berikutnya dengan filter yang sama (mis. CSV setelah PDF) tidak query lagi
+        with self.assertNumQueries(0):
+            self.assertEqual(report_result('report_penyewaan', queryset, self.params), ids)
+            self.assertEqual(row_count('report_penyewaan', queryset, self.params), (len(ids), False))
+        self.tambah_pending()
+        self.assertEqual(len(report_result('report_penyewaan', queryset, self.params)), len(ids) + 1)
+
+    def test_tanpa_cache_bersama(self):
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            jumlah = self.queryset.count()
+            self.assertEqual(row_count('report_penyewaan', self.queryset, self.params), (jumlah, False))
+            # Proses lain menulis: versi di cache proses ini tidak ikut naik
+            with mock.patch('core.report_cache.invalidate'):
+                self.tambah_pending()
+            self.assertEqual(row_count('report_penyewaan', self.queryset, self.params), (jumlah + 1, False))
+            self.assertEqual(exact_count('report_penyewaan', self.queryset, self.params), jumlah + 1)
+
+
+class RenderAsyncTests(TestCase):
+    """View pelanggan async merender template di thread, bukan di event loop."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pelanggan = Pelanggan.objects.create(namaPelanggan='Pelanggan Uji', noHp='081200000002', password='!')
+        barang = Barang.objects.create(namaBarang='Kursi', harga=Decimal('5000'), stok=10,
+                                       deskripsi='Barang uji', ukuran='Kecil')
+        ItemKeranjang.objects.create(idPelanggan=cls.pelanggan, idBarang=barang, jumlah=1)
+        cls.penyewaan = Penyewaan.objects.create(
+            tanggalAcara=date.today(), durasiSewa=1, tanggalPembongkaran=date.today() + timedelta(days=2),
+            statusSewa='Pending', alamatPemasangan='Jl. Uji', idPelanggan=cls.pelanggan,
+        )
+
+    def setUp(self):
+        session = self.client.session
+        session['pelanggan_id'] = self.pelanggan.pk
+        session.save()
+
+    def test_render_di_luar_event_loop(self):
+        from . import views
+
+        di_event_loop = []
+
+        def render(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                di_event_loop.append(args[1])
+            except RuntimeError:
+                pass
+            return views_render(*args, **kwargs)
+
+        views_render = views.render
+        urls = [
+            reverse('view_cart'), reverse('rental_history'),
+            reverse('rental_detail', kwargs={'pk': self.penyewaan.pk}), reverse('akun_pelanggan'),
+        ]
+        with mock.patch.object(views, 'render', render):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(di_event_loop, [])
+
+
+class KetersediaanTests(TestCase):
+    """Unit bebas per rentang tanggal dengan penyewaan yang jadwalnya bertumpuk."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pelanggan = Pelanggan.objects.create(namaPelanggan='Pelanggan Uji', noHp='081200000003', password='!')
+        cls.barang = Barang.objects.create(namaBarang='Tenda', harga=Decimal('100000'), stok=5,
+                                           deskripsi='Barang uji', ukuran='Besar')
+        cls.hari = [date.today() + timedelta(days=10 + i) for i in range(7)]
+
+    def sewa(self, mulai, selesai, jumlah):
+        penyewaan = Penyewaan.objects.create(
+            tanggalAcara=mulai, durasiSewa=(selesai - mulai).days, tanggalPembongkaran=selesai,
+            statusSewa='Pending', alamatPemasangan='Jl. Uji', idPelanggan=self.pelanggan,
+        )
+        DetailSewa.objects.create(idPenyewaan=penyewaan, idBarang=self.barang, jumlahBarang=jumlah)
+        return penyewaan
+
+    def bebas(self, mulai, selesai):
+        return free_units(self.barang, mulai, selesai)
+
+    def test_jadwal_bertumpuk(self):
+        h = self.hari
+        self.sewa(h[1], h[3], 2)
+        self.sewa(h[3], h[5], 3)
+        self.assertEqual(self.bebas(h[0], h[0]), 5)
+        self.assertEqual(self.bebas(h[1], h[2]), 3)
+        self.assertEqual(self.bebas(h[3], h[3]), 0)
+        self.assertEqual(self.bebas(h[4], h[5]), 2)
+        self.assertEqual(self.bebas(h[6], h[6]), 5)
+        # Rentang yang menyentuh hari tersibuk ikut puncaknya
+        self.assertEqual(self.bebas(h[0], h[6]), 0)
+        self.assertEqual(available_quantities([self.barang], h[4], h[6]), {self.barang.pk: 2})
+
+    def test_lepas_per_hari_saat_batal_dan_selesai(self):
+        h = self.hari
+        pertama = self.sewa(h[1], h[3], 2)
+        kedua = self.sewa(h[3], h[5], 3)
+
+        pertama.statusSewa = 'Cancelled'
+        pertama.save()
+        self.assertEqual(self.bebas(h[1], h[2]), 5)
+        self.assertEqual(self.bebas(h[3], h[3]), 2)
+        # Hari yang sudah kosong tidak menyisakan baris
+        self.assertEqual(
+            list(PemakaianHarian.objects.filter(idBarang=self.barang).values_list('tanggal', 'jumlahDipesan')),
+            [(h[3], 3), (h[4], 3), (h[5], 3)],
+        )
+
+        kedua.statusSewa = 'Completed'
+        kedua.save()
+        self.assertEqual(self.bebas(h[0], h[6]), 5)
+        self.assertFalse(PemakaianHarian.objects.filter(idBarang=self.barang).exists())
+
+    def test_ubah_keranjang_dibatasi_unit_bebas(self):
+        h = self.hari
+        self.sewa(h[3], h[5], 3)
+        ItemKeranjang.objects.create(idPelanggan=self.pelanggan, idBarang=self.barang, jumlah=1)
+        session = self.client.session
+        session['pelanggan_id'] = self.pelanggan.pk
+        session['jadwal_sewa'] = {'tanggalAcara': h[2].isoformat(), 'durasiSewa': '2'}
+        session.save()
+        url = reverse('update_cart', kwargs={'pk': self.barang.pk})
+
+        response = self.client.post(url, {'quantity': 3})
+        self.assertIn(f'Stok {self.barang.namaBarang} hanya tersedia 2 unit.',
+                      [str(pesan) for pesan in get_messages(response.wsgi_request)])
+        self.client.post(url, {'action': 'increase'})
+        self.client.post(url, {'action': 'increase'})
+        self.assertEqual(ItemKeranjang.objects.get(idPelanggan=self.pelanggan).jumlah, 2)
+
+
+class LoginPelangganTests(TestCase):
+    """Login pelanggan memverifikasi password sekali dan memperbarui hash lama."""
+
+    def setUp(self):
+        self.pelanggan = Pelanggan(namaPelanggan='Pelanggan Login', noHp='081234567890')
+        self.pelanggan.set_password('rahasia123')
+        self.pelanggan.save()
+
+    def login(self, noHp, password):
+        return self.client.post(reverse('login_pelanggan'), {'noHp': noHp, 'password': password})
+
+    def test_satu_verifikasi(self):
+        with mock.patch('core.models.check_password', wraps=check_password) as verifikasi:
+            response = self.login('081234567890', 'rahasia123')
+        self.assertRedirects(response, reverse('home_pelanggan'), fetch_redirect_response=False)
+        self.assertEqual(verifikasi.call_count, 1)
+        self.assertEqual(self.client.session['pelanggan_id'], self.pelanggan.pk)
+
+    def test_password_salah(self):
+        with mock.patch('core.models.check_password', wraps=check_password) as verifikasi:
+            response = self.login('081234567890', 'salah')
+        self.assertEqual(verifikasi.call_count, 1)
+        self.assertContains(response, 'Nomor HP atau password salah.')
+        self.assertNotIn('pelanggan_id', self.client.session)
+
+    def test_nomor_tidak_terdaftar_tetap_hash(self):
+        with mock.patch('core.models.make_password', wraps=make_password) as hash_:
+            response = self.login('089999999999', 'rahasia123')
+        self.assertEqual(hash_.call_count, 1)
+        self.assertContains(response, 'Nomor HP atau password salah.')
+
+    def test_hash_lama_diperbarui(self):
+        hasher = PBKDF2PasswordHasher()
+        hash_lama = hasher.encode('rahasia123', hasher.salt(), iterations=1000)
+        Pelanggan.objects.filter(pk=self.pelanggan.pk).update(password=hash_lama)
+
+        self.login('081234567890', 'rahasia123')
+        hash_baru = Pelanggan.objects.get(pk=self.pelanggan.pk).password
+        self.assertNotEqual(hash_baru, hash_lama)
+        self.assertEqual(hasher.decode(hash_baru)['iterations'], hasher.iterations)
+
+        # Login berikutnya tidak menulis ulang hash yang sudah baru
+        self.client.logout()
+        with CaptureQueriesContext(connection) as ctx:
+            self.login('081234567890', 'rahasia123')
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_pelanggan"')])
+
+
+class KeranjangTests(TestCase):
+    """Operasi keranjang di tabel ItemKeranjang (core/cart.py) dan impor keranjang session lama."""
+
+    def setUp(self):
+        self.pelanggan = Pelanggan.objects.create(namaPelanggan='Pelanggan Keranjang', noHp='081200000001', password='!')
+        self.tenda = Barang.objects.create(namaBarang='Tenda', harga=Decimal('100000'), stok=5,
+                                           deskripsi='Barang uji', ukuran='Besar')
+        self.kursi = Barang.objects.create(namaBarang='Kursi', harga=Decimal('5000'), stok=50,
+                                           deskripsi='Barang uji', ukuran='Sedang')
+
+    def test_tambah_sampai_batas(self):
+        pk = self.pelanggan.pk
+        self.assertTrue(cart_store.add(pk, self.tenda.pk, 3, batas=5))
+        self.assertTrue(cart_store.add(pk, self.tenda.pk, 2, batas=5))
+        self.assertFalse(cart_store.add(pk, self.tenda.pk, 1, batas=5))
+        self.assertFalse(cart_store.increment(pk, self.tenda.pk, batas=5))
+        self.assertEqual(cart_store.get_items(pk), {self.tenda.pk: 5})
+
+        # Penambahan pertama yang melebihi batas tidak meninggalkan baris kosong
+        self.assertFalse(cart_store.add(pk, self.kursi.pk, 60, batas=50))
+        self.assertFalse(ItemKeranjang.objects.filter(idBarang=self.kursi).exists())
+
+    def test_kurangi_ubah_hapus(self):
+        pk = self.pelanggan.pk
+        cart_store.add(pk, self.tenda.pk, 2, batas=5)
+        cart_store.add(pk, self.kursi.pk, 10, batas=50)
+        self.assertEqual(cart_store.decrement(pk, self.tenda.pk), 'dikurangi')
+        self.assertEqual(cart_store.decrement(pk, self.tenda.pk), 'dihapus')
+        self.assertIsNone(cart_store.decrement(pk, self.tenda.pk))
+        self.assertFalse(cart_store.set_quantity(pk, self.tenda.pk, 3))
+
+        self.assertTrue(cart_store.set_quantity(pk, self.kursi.pk, 20))
+        self.assertEqual(cart_store.total_quantity(pk), 20)
+        self.assertTrue(cart_store.remove(pk, self.kursi.pk))
+        self.assertFalse(cart_store.remove(pk, self.kursi.pk))
+        self.assertEqual(cart_store.get_items(pk), {})
+
+    def test_impor_keranjang_session(self):
+        cart_store.add(self.pelanggan.pk, self.kursi.pk, 4, batas=50)
+        session = self.client.session
+        session['pelanggan_id'] = self.pelanggan.pk
+        # Format lama: {str(idBarang): {...}}; barang yang sudah dihapus dilewati
+        session['cart'] = {
+            str(self.tenda.pk): {'barang_id': self.tenda.pk, 'nama': 'Tenda', 'harga': 100000.0, 'quantity': 2},
+            str(self.kursi.pk): {'barang_id': self.kursi.pk, 'nama': 'Kursi', 'harga': 5000.0, 'quantity': 3},
+            '9999': {'barang_id': 9999, 'nama': 'Terhapus', 'harga': 1.0, 'quantity': 1},
+        }
+        session.save()
+
+        response = self.client.get(reverse('view_cart'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cart_store.get_items(self.pelanggan.pk), {self.tenda.pk: 2, self.kursi.pk: 7})
+        self.assertNotIn('cart', self.client.session)
+
+        # Sekali saja: kunjungan berikutnya tidak menambah lagi
+        self.client.get(reverse('view_cart'))
+        self.assertEqual(cart_store.get_items(self.pelanggan.pk), {self.tenda.pk: 2, self.kursi.pk: 7})
+
+    def test_tambah_tanpa_menulis_session(self):
+        session = self.client.session
+        session['pelanggan_id'] = self.pelanggan.pk
+        session.save()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('add_to_cart', args=[self.tenda.pk]), {'quantity': 2})
+        self.assertEqual(cart_store.get_items(self.pelanggan.pk), {self.tenda.pk: 2})
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'django_session' in q['sql'] and
+                          not q['sql'].startswith('SELECT')])
+
+
+class KeranjangBersamaanTests(TransactionTestCase):
+    """Dua tab (koneksi) menambah barang yang sama bersamaan: batas stok tetap dipegang."""
+
+    def test_tambah_bersamaan(self):
+        pelanggan = Pelanggan.objects.create(namaPelanggan='Pelanggan Tab', noHp='081200000002', password='!')
+        barang = Barang.objects.create(namaBarang='Meja', harga=Decimal('20000'), stok=6,
+                                       deskripsi='Barang uji', ukuran='Sedang')
+
+        hasil, galat = serbu(lambda _: cart_store.add(pelanggan.pk, barang.pk, 1, batas=barang.stok), range(10))
+
+        self.assertEqual(galat, [])
+        self.assertEqual(hasil.count(True), barang.stok)
+        self.assertEqual(cart_store.get_items(pelanggan.pk), {barang.pk: barang.stok})
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    Pagination keyset laporan: berjalan maju/mundur lewat cursor menghasilkan
+    semua baris tepat sekali dalam urutan yang sama dengan ORDER BY biasa,
+    termasuk saat banyak baris berbagi tanggalPesan.
+    """
+
+    ORDERING = ('-tanggalPesan', '-idPenyewaan')
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset()
+        cls.admin = User.objects.create_superuser('admin_keyset', 'keyset@example.com', 'rahasia123')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+
+    def halaman(self, paginator, queryset):
+        """Semua halaman maju dari awal, lalu semua halaman mundur dari halaman terakhir."""
+        batas = queryset.count() // paginator.per_page + 1
+        maju = [paginator.page(queryset)]
+        while maju[-1].has_next and len(maju) <= batas:
+            maju.append(paginator.page(queryset, paginator.load(maju[-1].next_cursor)))
+        mundur = [maju[-1]]
+        while mundur[-1].has_previous and len(mundur) <= batas:
+            mundur.append(paginator.page(queryset, paginator.load(mundur[-1].previous_cursor)))
+        return maju, mundur[::-1]
+
+    def test_maju_mundur_sama_dengan_order_by(self):
+        queryset = Penyewaan.objects.all()
+        harapan = list(queryset.order_by(*self.ORDERING).values_list('pk', flat=True))
+        # Urutan harus memutus seri tanggalPesan lewat idPenyewaan
+        self.assertGreater(Penyewaan.objects.filter(tanggalPesan=date.today()).count(), 25)
+
+        paginator = KeysetPaginator(self.ORDERING, 25, salt='uji')
+        maju, mundur = self.halaman(paginator, queryset)
+        self.assertEqual([obj.pk for page in maju for obj in page.object_list], harapan)
+        self.assertEqual([[obj.pk for obj in page.object_list] for page in mundur],
+                         [[obj.pk for obj in page.object_list] for page in maju])
+        self.assertFalse(mundur[0].has_previous)
+        self.assertFalse(maju[-1].has_next)
+
+    def test_cursor_ditandatangani_per_laporan(self):
+        paginator = KeysetPaginator(self.ORDERING, 25, salt='laporan.A')
+        token = paginator.page(Penyewaan.objects.all()).next_cursor
+        self.assertIsNotNone(paginator.load(token))
+        self.assertIsNone(KeysetPaginator(self.ORDERING, 25, salt='laporan.B').load(token))
+        self.assertIsNone(paginator.load(token[:-2] + 'xx'))
+
+    def test_laporan_membawa_filter_tanpa_offset(self):
+        url = reverse('report_penyewaan')
+        harapan = list(
+            Penyewaan.objects.filter(statusSewa='Confirmed').order_by(*self.ORDERING).values_list('pk', flat=True)
+        )
+        response = self.client.get(url, {'statusSewa': 'Confirmed'})
+        dilihat = [obj.pk for obj in response.context['cursor_page'].object_list]
+        while response.context['cursor_page'].has_next and len(dilihat) <= len(harapan):
+            # Tautan berikutnya hanya berisi cursor; filter dibawa di dalamnya
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, {'cursor': response.context['cursor_page'].next_cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([q['sql'] for q in ctx.captured_queries if ' OFFSET ' in q['sql']])
+            dilihat += [obj.pk for obj in response.context['cursor_page'].object_list]
+        self.assertEqual(dilihat, harapan)
+
+        # Cursor rusak kembali ke halaman pertama tanpa filter
+        response = self.client.get(url, {'cursor': 'rusak'})
+        self.assertTrue(response.context['cursor_page'].is_first)
+        self.assertEqual(len(response.context['cursor_page'].object_list), 25)
+
+
+class PekerjaanLaporanTests(TestCase):
+    """Antrean pekerjaan PDF/ekspor (core/report_jobs.py): daftar, pakai ulang, jalankan, unduh dan bersihkan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset()
+        cls.admin = User.objects.create_superuser('admin_pekerjaan', 'pekerjaan@example.com', 'rahasia123')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+        berkas = tempfile.TemporaryDirectory()
+        self.addCleanup(berkas.cleanup)
+        self.folder = berkas.name
+        override = self.settings(REPORT_JOBS_DIR=self.folder)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Pekerjaan tidak dijalankan otomatis; uji memanggil report_jobs.run sendiri
+        patcher = mock.patch('core.tasks.buat_laporan.delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def minta(self, query):
+        response = self.client.get(f"{reverse('report_penyewaan_export')}?{query}")
+        self.assertEqual(response.status_code, 302)
+        return PekerjaanLaporan.objects.get(pk=response.url.rstrip('/').split('/')[-1])
+
+    def test_daftar_dan_pakai_ulang(self):
+        job = self.minta('format=csv&statusSewa=Confirmed&tanggalPesan__gte=2020-01-01')
+        self.assertEqual(job.status, 'Menunggu')
+        self.delay.assert_called_once_with(job.pk)
+
+        # Filter sama dengan urutan berbeda: pekerjaan yang masih menunggu dipakai ulang
+        self.assertEqual(self.minta('tanggalPesan__gte=2020-01-01&statusSewa=Confirmed&format=csv').pk, job.pk)
+        self.assertNotEqual(self.minta('format=csv&statusSewa=Pending').pk, job.pk)
+        self.assertNotEqual(self.minta('format=jsonl&statusSewa=Confirmed&tanggalPesan__gte=2020-01-01').pk, job.pk)
+        self.assertEqual(self.delay.call_count, 3)
+
+        # Hasil yang sudah selesai dipakai ulang selama datanya belum berubah
+        report_jobs.run(job.pk)
+        self.assertEqual(self.minta('format=csv&statusSewa=Confirmed&tanggalPesan__gte=2020-01-01').pk, job.pk)
+        self.assertEqual(self.delay.call_count, 3)
+
+        penyewaan = Penyewaan.objects.filter(statusSewa='Pending').first()
+        penyewaan.statusSewa = 'Confirmed'
+        # Versi data laporan naik setelah commit
+        with self.captureOnCommitCallbacks(execute=True):
+            penyewaan.save()
+        baru = self.minta('format=csv&statusSewa=Confirmed&tanggalPesan__gte=2020-01-01')
+        self.assertNotEqual(baru.pk, job.pk)
+        self.assertEqual(self.delay.call_count, 4)
+
+    def test_jalankan_dan_unduh(self):
+        job = self.minta('format=csv&statusSewa=Completed')
+        report_jobs.run(job.pk)
+        job.refresh_from_db()
+        jumlah = Penyewaan.objects.filter(statusSewa='Completed').count()
+        self.assertEqual(job.status, 'Selesai')
+        self.assertEqual((job.barisSelesai, job.barisTotal), (jumlah, jumlah))
+        self.assertEqual(os.listdir(self.folder), [job.berkas])
+
+        status = self.client.get(reverse('report_job_status', args=[job.pk])).json()
+        self.assertEqual(status['unduh'], reverse('report_job_download', args=[job.pk]))
+        response = self.client.get(status['unduh'])
+        isi = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(isi), jumlah + 1)
+
+        # Pekerjaan yang sudah diambil tidak dijalankan dua kali
+        with mock.patch('core.views.write_report') as tulis:
+            report_jobs.run(job.pk)
+        tulis.assert_not_called()
+
+    def test_gagal_tanpa_berkas_setengah_jadi(self):
+        job = self.minta('format=csv&statusSewa=Pending')
+        with mock.patch('core.views.write_report', side_effect=RuntimeError('rusak')), \
+                self.assertLogs('core.report_jobs', 'ERROR'):
+            report_jobs.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.pesanGalat), ('Gagal', 'rusak'))
+        self.assertEqual(os.listdir(self.folder), [])
+        self.assertEqual(self.client.get(reverse('report_job_download', args=[job.pk])).status_code, 404)
+
+    def test_bersihkan(self):
+        lama = self.minta('format=csv&statusSewa=Completed')
+        report_jobs.run(lama.pk)
+        macet = self.minta('format=csv&statusSewa=Cancelled')
+        baru = self.minta('format=csv&statusSewa=Pending')
+        report_jobs.run(baru.pk)
+        lama.refresh_from_db()
+        baru.refresh_from_db()
+
+        # Lewat masa simpan (default satu hari) dan lewat batas waktu pembuatan (30 menit)
+        dua_hari_lalu = timezone.now() - timedelta(days=2)
+        PekerjaanLaporan.objects.filter(pk=lama.pk).update(dibuat=dua_hari_lalu)
+        PekerjaanLaporan.objects.filter(pk=macet.pk).update(dibuat=timezone.now() - timedelta(hours=1))
+        waktu = dua_hari_lalu.timestamp()
+        os.utime(os.path.join(self.folder, lama.berkas), (waktu, waktu))
+
+        out = io.StringIO()
+        call_command('bersihkan_laporan', stdout=out)
+        self.assertIn('1 pekerjaan', out.getvalue())
+        self.assertFalse(PekerjaanLaporan.objects.filter(pk=lama.pk).exists())
+        macet.refresh_from_db()
+        self.assertEqual(macet.status, 'Gagal')
+        self.assertEqual(os.listdir(self.folder), [baru.berkas])
+
+        # Permintaan berikutnya dengan filter yang sama membuat pekerjaan baru
+        self.assertNotEqual(self.minta('format=csv&statusSewa=Cancelled').pk, macet.pk)
+        self.assertEqual(report_jobs.purge(), 0)
+
+
+class KatalogFotoTests(TestCase):
+    """Katalog async dengan Barang berfoto: tag foto_barang tidak boleh jalan di event loop."""
+
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        # Turunan foto dibuat oleh task Celery setelah commit
+        eager = celery_app.conf.CELERY_TASK_ALWAYS_EAGER
+        celery_app.conf.CELERY_TASK_ALWAYS_EAGER = True
+        self.addCleanup(setattr, celery_app.conf, 'CELERY_TASK_ALWAYS_EAGER', eager)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.barang = Barang.objects.create(
+                namaBarang='Tenda Berfoto', harga=Decimal('150000'), stok=5, deskripsi='Barang uji', ukuran='Besar',
+                foto=self.foto('tenda.jpg'),
+            )
+
+    def foto(self, nama, warna=(200, 120, 40)):
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), warna).save(buffer, format='JPEG')
+        return SimpleUploadedFile(nama, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_katalog_dengan_foto(self):
+        response = self.client.get('/barang/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Tenda Berfoto')
+        self.assertContains(response, 'image/webp')
+
+    def test_katalog_foto_tanpa_hash(self):
+        # Seperti foto lama sebelum migrasi fotoHash: foto asli, tanpa menulis ke database
+        Barang.objects.filter(pk=self.barang.pk).update(fotoHash='')
+        with CaptureQueriesContext(connection) as ctx, self.assertLogs('core.images', 'WARNING'):
+            response = self.client.get('/barang/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.barang.foto.url)
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_barang"')])
+
+    def test_turunan_dibuat_setelah_commit(self):
+        barang = Barang.objects.get(pk=self.barang.pk)
+        hash_lama = barang.fotoHash
+        barang.foto = self.foto('tenda-baru.jpg', warna=(20, 90, 160))
+        with mock.patch('core.tasks.generate_derivatives', wraps=generate_derivatives) as buat:
+            with self.captureOnCommitCallbacks() as callbacks:
+                barang.save()
+            # Selama transaksi penyimpanan belum ada Pillow; halaman memakai foto asli
+            buat.assert_not_called()
+            self.assertEqual(Barang.objects.get(pk=barang.pk).fotoHash, '')
+            for callback in callbacks:
+                callback()
+            buat.assert_called_once()
+        self.assertNotIn(Barang.objects.get(pk=barang.pk).fotoHash, ('', hash_lama))
+
+
+class TrackedFieldsTests(TestCase):
+    """TrackedFieldsMixin: nilai tersimpan mengikuti database tanpa SELECT tambahan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pelanggan = Pelanggan.objects.create(namaPelanggan='Pelanggan Uji', noHp='081200000001', password='!')
+        cls.penyewaan = Penyewaan.objects.create(
+            tanggalAcara=date.today(), durasiSewa=1, tanggalPembongkaran=date.today() + timedelta(days=2),
+            totalBayar=Decimal('100000'), statusSewa='Pending', alamatPemasangan='Jl. Uji', idPelanggan=cls.pelanggan,
+        )
+
+    def nilai_db(self, pk):
+        return Penyewaan.objects.filter(pk=pk).values(*Penyewaan.tracked_fields).get()
+
+    def test_dari_database(self):
+        penyewaan = Penyewaan.objects.get(pk=self.penyewaan.pk)
+        with self.assertNumQueries(0):
+            tersimpan = penyewaan.stored_values()
+        self.assertEqual(tersimpan, self.nilai_db(penyewaan.pk))
+
+    def test_baris_baru(self):
+        penyewaan = Penyewaan(tanggalAcara=date.today(), durasiSewa=1, statusSewa='Pending', idPelanggan=self.pelanggan)
+        with self.assertNumQueries(0):
+            self.assertIsNone(penyewaan.stored_values())
+
+    def test_setelah_save(self):
+        penyewaan = Penyewaan.objects.get(pk=self.penyewaan.pk)
+        penyewaan.statusSewa = 'Confirmed'
+        penyewaan.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(penyewaan.stored_values()['statusSewa'], 'Confirmed')
+
+    def test_save_update_fields(self):
+        penyewaan = Penyewaan.objects.get(pk=self.penyewaan.pk)
+        penyewaan.statusSewa = 'Confirmed'
+        penyewaan.totalBayar = Decimal('250000')
+        penyewaan.save(update_fields=['totalBayar'])
+        # Hanya totalBayar yang ditulis; statusSewa di database masih Pending
+        with self.assertNumQueries(0):
+            tersimpan = penyewaan.stored_values()
+        self.assertEqual(tersimpan, self.nilai_db(penyewaan.pk))
+        self.assertEqual((tersimpan['statusSewa'], tersimpan['totalBayar']), ('Pending', Decimal('250000')))
+
+    def test_refresh_from_db(self):
+        penyewaan = Penyewaan.objects.get(pk=self.penyewaan.pk)
+        Penyewaan.objects.filter(pk=penyewaan.pk).update(statusSewa='Confirmed', totalBayar=Decimal('300000'))
+        # Perubahan lewat QuerySet.update() belum terlihat
+        self.assertEqual(penyewaan.stored_values()['statusSewa'], 'Pending')
+
+        penyewaan.refresh_from_db(fields=['statusSewa'])
+        self.assertEqual(
+            (penyewaan.stored_values()['statusSewa'], penyewaan.stored_values()['totalBayar']),
+            ('Confirmed', Decimal('100000')),
+        )
+        penyewaan.refresh_from_db()
+        with self.assertNumQueries(0):
+            tersimpan = penyewaan.stored_values()
+        self.assertEqual(tersimpan, self.nilai_db(penyewaan.pk))
+
+    def test_field_ditunda(self):
+        penyewaan = Penyewaan.objects.only('pk', 'statusSewa').get(pk=self.penyewaan.pk)
+        with self.assertNumQueries(1):
+            tersimpan = penyewaan.stored_values()
+        self.assertEqual(tersimpan, self.nilai_db(penyewaan.pk))
+
+        # Setelah field yang ditunda dimuat, nilainya lengkap lagi
+        penyewaan.refresh_from_db(fields=['tanggalAcara', 'tanggalPembongkaran', 'totalBayar', 'tanggalPesan'])
+        with self.assertNumQueries(0):
+            tersimpan = penyewaan.stored_values()
+        self.assertEqual(tersimpan, self.nilai_db(penyewaan.pk))
+
+    def test_instance_manual_dengan_pk(self):
+        penyewaan = Penyewaan(
+            pk=self.penyewaan.pk, tanggalAcara=date.today(), durasiSewa=1, statusSewa='Completed',
+            totalBayar=Decimal('1'), alamatPemasangan='Jl. Uji', idPelanggan=self.pelanggan,
+        )
+        # Nilai di instance belum tentu sama dengan database, jadi dibaca ulang
+        with self.assertNumQueries(1):
+            tersimpan = penyewaan.stored_values()
+        self.assertEqual(tersimpan, self.nilai_db(penyewaan.pk))
+
+    def test_detail_sewa(self):
+        barang = Barang.objects.create(namaBarang='Kursi', harga=Decimal('5000'), stok=10,
+                                       deskripsi='Barang uji', ukuran='Kecil')
+        DetailSewa.objects.create(idPenyewaan=self.penyewaan, idBarang=barang, jumlahBarang=2)
+        detail = DetailSewa.objects.get(idPenyewaan=self.penyewaan)
+        with self.assertNumQueries(0):
+            self.assertEqual(detail.stored_values(), {'idBarang_id': barang.pk, 'jumlahBarang': 2})
@@ -24,6 +24,21 @@ report_urls = [
     path('laporan/keuangan/pdf/', views.KeuanganPDFView, name='report_keuangan_pdf'),
     path('laporan/barang/pdf/', views.BarangPDFView, name='report_barang_pdf'),
     path('laporan/pelanggan/pdf/', views.PelangganPDFView, name='report_pelanggan_pdf'),
+    
+    # --------------------------------------------------------
+    # Export Views - Data mentah (CSV, JSON-lines, XLSX) dengan filter yang sama
+    # --------------------------------------------------------
+    path('laporan/penyewaan/export/', views.PenyewaanExportView, name='report_penyewaan_export'),
+    path('laporan/keuangan/export/', views.KeuanganExportView, name='report_keuangan_export'),
+    path('laporan/barang/export/', views.BarangExportView, name='report_barang_export'),
+    path('laporan/pelanggan/export/', views.PelangganExportView, name='report_pelanggan_export'),
+    
+    # --------------------------------------------------------
+    # Pekerjaan Laporan - PDF/ekspor dibuat di latar belakang
+    # --------------------------------------------------------
+    path('laporan/pekerjaan/<int:pk>/', views.ReportJobView, name='report_job'),
+    path('laporan/pekerjaan/<int:pk>/status/', views.ReportJobStatusView, name='report_job_status'),
+    path('laporan/pekerjaan/<int:pk>/unduh/', views.ReportJobDownloadView, name='report_job_download'),
 ]
 
 # URL patterns for customer-facing views
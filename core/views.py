@@ -1,26 +1,34 @@
-from django.db.models import Sum
-from django.db.models.functions import TruncMonth 
+import re
 from django.contrib.admin.views.decorators import staff_member_required
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
 from datetime import datetime, timedelta
 from calendar import month_abbr 
 
-# --- Import untuk Laporan PDF menggunakan ReportLab ---
-from django.http import HttpResponse
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.lib.pagesizes import A4
+# --- Import untuk Laporan PDF (ReportLab, lihat core/reports.py) ---
+from .reports import (
+    report_columns, report_ordering, iter_values, format_rows, write_pdf, write_export,
+    CONTENT_TYPES, EXPORT_FORMATS, XLSX_AVAILABLE,
+)
+from django.contrib import messages
+from django.shortcuts import redirect
 # ----------------------------------------------------
 
 # Import Models
-from .models import Pelanggan, Barang, Penyewaan, DetailSewa
+from .models import Pelanggan, Barang, Penyewaan, DetailSewa, PekerjaanLaporan
+from .dashboard import read_snapshot, kunci_bulan
+from .page_cache import stats as page_cache_stats
 
 # Import Tools untuk Laporan
 from django_tables2 import SingleTableView
 from django_filters.views import FilterView 
-from django_tables2.rows import BoundRow 
+from django_tables2.paginators import LazyPaginator
+from django.http import FileResponse, Http404, JsonResponse, QueryDict
+from django.urls import reverse
+from django.utils.http import urlencode
+from .pagination import KeysetPaginator, KnownCountPaginator
+from .report_cache import exact_count, report_result, result_version, row_count
+from . import report_jobs
+from .revenue import penyewaan_sukses, revenue
 
 # Import Table dan Filter yang sudah Anda buat (Diasumsikan ada di core/tables.py dan core/filters.py)
 from .tables import PenyewaanReportTable, KeuanganReportTable, DetailBarangReportTable, PelangganReportTable
@@ -33,152 +41,42 @@ from .filters import PenyewaanFilter, KeuanganFilter, DetailBarangFilter
 def admin_dashboard_context(request):
     """
     Mengambil data agregasi untuk ditampilkan di dashboard Admin.
-    Diperbarui untuk menampilkan data 6 bulan terakhir secara konsisten.
+    Data dibaca dari snapshot (core/dashboard.py) yang diperbarui setiap ada
+    perubahan data, sehingga tidak perlu agregasi ulang di setiap kunjungan.
     """
     
-    # --- 1. Data Cards ---
-    total_pelanggan = Pelanggan.objects.count()
-    total_barang = Barang.objects.count()
-    
-    # Total Penyewaan yang sukses (Confirmed/Completed)
-    penyewaan_sukses = Penyewaan.objects.filter(
-        statusSewa__in=['Confirmed', 'Completed']
-    )
-    total_penyewaan = penyewaan_sukses.count()
-    
-    # Total Pendapatan
-    total_pendapatan_agg = penyewaan_sukses.aggregate(Sum('totalBayar'))
-    total_pendapatan = total_pendapatan_agg.get('totalBayar__sum', 0.00) or 0.00
-    
-    
-    # --- 2. Data Grafik (Pendapatan 6 Bulan Terakhir) ---
-    
+    # --- 1. Tentukan 6 bulan terakhir (termasuk bulan ini) ---
     today = datetime.now()
+    current_date = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
-    # 2.1. Tentukan Tanggal Mulai (6 bulan terakhir termasuk bulan ini)
-    # Dapatkan bulan saat ini (hanya tahun dan bulan)
-    current_month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    # Mundur 5 bulan untuk mendapatkan awal periode (6 bulan termasuk bulan ini)
-    five_months_ago = current_month_start
-    for i in range(5):
-        # Cari hari pertama bulan sebelumnya
-        if five_months_ago.month == 1:
-            five_months_ago = five_months_ago.replace(year=five_months_ago.year - 1, month=12)
-        else:
-            five_months_ago = five_months_ago.replace(month=five_months_ago.month - 1)
-    
-    # print(f"Current month start: {current_month_start}")
-    # print(f"Five months ago (start of range): {five_months_ago}")
-    
-    # Gunakan five_months_ago sebagai awal periode
-    start_of_range = five_months_ago
-        
-    
-    # 2.2. Ambil data aktual dari database
-    # print(f"Filtering rentals from date: {start_of_range}")
-    filtered_rentals = penyewaan_sukses.filter(tanggalPesan__gte=start_of_range)
-    # print(f"Found {filtered_rentals.count()} rentals in the date range")
-    
-    # Print some sample rental data for debugging
-    # sample_rentals = filtered_rentals[:5]
-    # for rental in sample_rentals:
-    #     print(f"Rental ID: {rental.idPenyewaan}, Date: {rental.tanggalPesan}, Status: {rental.statusSewa}, Total: {rental.totalBayar}")
-    
-    pendapatan_per_bulan_qs = filtered_rentals.annotate(
-        month=TruncMonth('tanggalPesan')
-    ).values('month').annotate(
-        total=Sum('totalBayar')
-    ).order_by('month')
-    
-    # print(f"Aggregation query returned {pendapatan_per_bulan_qs.count()} grouped records")
-    # for item in pendapatan_per_bulan_qs:
-    #     print(f"  Month: {item['month']} (type: {type(item['month'])}), Total: {item['total']}")
-    
-    # Improved data processing to ensure correct data types
-    pendapatan_dict = {}
-    for p in pendapatan_per_bulan_qs:
-        month_value = p['month']
-        total_value = p['total']
-        
-        # Convert month to date if it's datetime
-        if isinstance(month_value, datetime):
-            key = month_value.date()
-        else:
-            key = month_value
-            
-        # print(f"Processing month_value: {month_value} (type: {type(month_value)}), converted key: {key} (type: {type(key)})")
-            
-        # Ensure total value is converted to float correctly
-        if total_value is not None:
-            pendapatan_dict[key] = float(total_value)
+    bulan_list = []
+    for i in range(6):
+        bulan_list.insert(0, current_date.date())
+        # Mundur ke hari pertama bulan sebelumnya
+        if current_date.month == 1:
+            current_date = current_date.replace(year=current_date.year - 1, month=12)
         else:
-            pendapatan_dict[key] = 0.0
-            
-        # print(f"Aggregated data - Month: {key}, Revenue: {pendapatan_dict[key]}")
-
-    
-    # 2.3. Generate 6 bulan lengkap (dari 6 bulan lalu hingga bulan ini)
-    bulan_label = []
-    pendapatan_bulanan = []
-    
-    # Mulai dari bulan ke-5 yang lalu (awal periode)
-    current_date = start_of_range 
+            current_date = current_date.replace(month=current_date.month - 1)
     
-    # print(f"Generating data for 6 months starting from: {start_of_range}")
-    # print(f"Keys in pendapatan_dict: {list(pendapatan_dict.keys())}")
+    # --- 2. Baca snapshot (satu query) ---
+    nilai, diperbarui = read_snapshot(bulan_list)
     
-    # Kita iterasi sebanyak 6 bulan
-    for i in range(6):
-        
-        # Format label: Singkatan Bulan Tahun (e.g., Jun 2025)
-        label = current_date.strftime('%b %Y') 
-        bulan_label.append(label)
-        
-        # Key pencarian harus dalam format datetime.date
-        data_key = current_date.date() 
-        
-        # Debug the key matching
-        # print(f"Checking month {i+1}: {data_key} (looking for this key in dict)")
-        # print(f"Available keys: {list(pendapatan_dict.keys())}")
-        
-        # Try to find matching key (handle potential type mismatches)
-        pendapatan = 0.0
-        for dict_key, dict_value in pendapatan_dict.items():
-            # Compare dates regardless of whether they're date or datetime objects
-            if hasattr(dict_key, 'date') and dict_key.date() == data_key:
-                pendapatan = dict_value
-                break
-            elif dict_key == data_key:
-                pendapatan = dict_value
-                break
-                
-        # print(f"  Found revenue: {pendapatan}")
-        pendapatan_bulanan.append(pendapatan)
-        
-        # Maju ke bulan berikutnya dengan cara yang lebih robust
-        if current_date.month == 12:
-            current_date = current_date.replace(year=current_date.year + 1, month=1)
-        else:
-            current_date = current_date.replace(month=current_date.month + 1)
-            
-    # Ensure we always have 6 data points, even if no data exists
-    if len(pendapatan_bulanan) == 0:
-        pendapatan_bulanan = [0.0] * 6
-            
+    total_penyewaan = int(nilai.get('total_penyewaan', 0))
+    total_pendapatan = nilai.get('total_pendapatan', 0)
     
-    # Debug print for troubleshooting
-    # print(f"Dashboard data - Total rentals: {total_penyewaan}, Total revenue: {total_pendapatan}")
-    # print(f"Monthly labels: {bulan_label}")
-    # print(f"Monthly revenue: {pendapatan_bulanan}")
+    # Format label: Singkatan Bulan Tahun (e.g., Jun 2025)
+    bulan_label = [bulan.strftime('%b %Y') for bulan in bulan_list]
+    pendapatan_bulanan = [float(nilai.get(kunci_bulan(bulan), 0)) for bulan in bulan_list]
     
     context = {
-        'total_pelanggan': total_pelanggan,
-        'total_barang': total_barang,
+        'total_pelanggan': int(nilai.get('total_pelanggan', 0)),
+        'total_barang': int(nilai.get('total_barang', 0)),
         'total_penyewaan': total_penyewaan,
         'total_pendapatan': total_pendapatan,
         'pendapatan_bulanan': pendapatan_bulanan,
         'bulan_label': bulan_label,
+        'dashboard_diperbarui': diperbarui,
+        'page_cache_stats': page_cache_stats(),
         'has_real_data': total_penyewaan > 0 or total_pendapatan > 0
     }
     
@@ -189,26 +87,132 @@ def admin_dashboard_context(request):
 # FUNGSI MIXIN DAN VIEW UNTUK LAPORAN (HTML/Filter View)
 # =================================================================
 
+def report_name(request):
+    """Nama laporan bersama untuk halaman HTML, PDF dan ekspornya (mis. 'report_keuangan')."""
+    return re.sub(r'_(pdf|export)$', '', request.resolver_match.url_name)
+
+
+def filter_cache_params(filterset):
+    """Parameter filter ternormalisasi (cleaned_data) sebagai kunci cache laporan."""
+    if not getattr(filterset, 'is_bound', False):
+        return []
+    if not filterset.is_valid():
+        # Filter tidak valid diberi kunci sendiri, terpisah dari "tanpa filter"
+        return [('tidak_valid', '1')] + [(nama, filterset.data.get(nama)) for nama in filterset.filters]
+    return list(filterset.form.cleaned_data.items())
+
+
 class AdminReportMixin:
     """Mixin untuk mengatur template AdminLTE dan pembatasan akses."""
     template_name = 'admin/report_template.html'
+
+    # Urutan kunci untuk pagination keyset (lihat core/pagination.py). Harus
+    # unik dan didukung index; None berarti pagination LIMIT/OFFSET biasa.
+    cursor_ordering = None
+    cursor_per_page = 25
+    # False jika queryset dasar laporan sudah tersaring (lihat report_cache.row_count)
+    count_estimate = True
     
     @classmethod
     def as_view(cls, **initkwargs):
         """Memastikan hanya staff/admin yang bisa mengakses laporan."""
         view = super().as_view(**initkwargs)
         return staff_member_required(view)
+
+    def get(self, request, *args, **kwargs):
+        if 'hitung' not in request.GET:
+            return super().get(request, *args, **kwargs)
+        # ?hitung=1: jumlah baris pasti untuk halaman yang menampilkan perkiraan
+        if hasattr(self, 'get_filterset_class'):
+            self.filterset = self.get_filterset(self.get_filterset_class())
+            if not self.filterset.is_bound or self.filterset.is_valid() or not self.get_strict():
+                self.object_list = self.filterset.qs
+            else:
+                self.object_list = self.filterset.queryset.none()
+        else:
+            self.object_list = self.get_queryset()
+        return JsonResponse({'jumlah': exact_count(report_name(request), self.object_list, self.get_count_params())})
+
+    def get_count_params(self):
+        """Parameter filter yang sudah dinormalisasi sebagai kunci cache jumlah baris/hasil."""
+        return filter_cache_params(getattr(self, 'filterset', None))
+
+    def get_row_count(self):
+        """(jumlah, perkiraan) untuk object_list, lihat report_cache.row_count()."""
+        if not hasattr(self, '_row_count'):
+            self._row_count = row_count(
+                report_name(self.request), self.object_list, self.get_count_params(), estimate=self.count_estimate,
+            )
+        return self._row_count
+
+    def get_keyset_paginator(self):
+        return KeysetPaginator(self.cursor_ordering, self.cursor_per_page, salt=f'laporan.{type(self).__name__}')
+
+    def get_cursor(self):
+        """Cursor dari ?cursor=..., atau None (halaman pertama / mode cursor tidak aktif)."""
+        if not hasattr(self, '_cursor'):
+            token = self.request.GET.get('cursor')
+            self._cursor = None
+            if self.cursor_ordering and token:
+                self._cursor = self.get_keyset_paginator().load(token)
+        return self._cursor
+
+    def get_filter_params(self):
+        """Parameter filter aktif sebagai list (key, value); dibawa oleh cursor jika ada."""
+        cursor = self.get_cursor()
+        if cursor is not None:
+            return cursor.params
+        return [(k, v) for k, v in self.request.GET.items() if k not in ['page', 'sort', 'cursor', 'hitung']]
+
+    def get_filterset_kwargs(self, filterset_class):
+        kwargs = super().get_filterset_kwargs(filterset_class)
+        if self.get_cursor() is not None:
+            params = self.get_filter_params()
+            kwargs['data'] = QueryDict(urlencode(params)) if params else None
+        return kwargs
+
+    def get_table_pagination(self, table):
+        # Mode cursor: tabel menerima satu halaman yang sudah dipotong
+        if self.cursor_ordering:
+            return False
+        paginate = super().get_table_pagination(table)
+        if paginate is False:
+            return False
+        paginate = {} if paginate is True else dict(paginate)
+        # Jumlah baris dari cache; jika belum pasti, paginator tidak menghitung sama sekali
+        jumlah, perkiraan = self.get_row_count()
+        if perkiraan:
+            paginate['paginator_class'] = LazyPaginator
+        else:
+            paginate.update(paginator_class=KnownCountPaginator, count=jumlah)
+        return paginate
+
+    def get_table_kwargs(self):
+        kwargs = super().get_table_kwargs()
+        if self.cursor_ordering:
+            # Urutan mengikuti kunci keyset, bukan klik judul kolom
+            kwargs['orderable'] = False
+        return kwargs
+
+    def get_table_data(self):
+        data = super().get_table_data()
+        if not self.cursor_ordering:
+            return data
+        self.cursor_page = self.get_keyset_paginator().page(data, self.get_cursor(), self.get_filter_params())
+        return self.cursor_page.object_list
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = self.report_title
+        context['cursor_page'] = getattr(self, 'cursor_page', None)
+        context['jumlah_baris'], context['jumlah_perkiraan'] = self.get_row_count()
         
         # 🔥 PENTING: Untuk mempertahankan sidebar, kita beri tahu Jazzmin aplikasi apa yang aktif.
         self.request.current_app = 'core'
         context['current_app'] = 'core'
         
         # Tambahkan filter ke context agar bisa digunakan di tombol PDF
-        safe_params = {k: v for k, v in self.request.GET.items() if k not in ['page', 'sort']}
+        safe_params = dict(self.get_filter_params())
         context['current_filter_params'] = "&" + "&".join(f"{k}={v}" for k, v in safe_params.items())
         return context
 
@@ -221,6 +225,11 @@ class PenyewaanReportView(AdminReportMixin, FilterView, SingleTableView):
     table_class = PenyewaanReportTable
     filterset_class = PenyewaanFilter
     report_title = "Laporan Data Penyewaan"
+    # Index sewa_tglpesan_idx / sewa_status_tglpesan_idx (+ rowid idPenyewaan)
+    cursor_ordering = ('-tanggalPesan', '-idPenyewaan')
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('idPelanggan')
     
 # -----------------------------------------------------------------
 # 2. Laporan Keuangan (HTML View)
@@ -230,17 +239,32 @@ class KeuanganReportView(AdminReportMixin, FilterView, SingleTableView):
     table_class = KeuanganReportTable
     filterset_class = KeuanganFilter
     report_title = "Laporan Keuangan (Pendapatan)"
+    cursor_ordering = ('-tanggalPesan', '-idPenyewaan')
 
     def get_queryset(self):
-        # Default Querset hanya Confirmed/Completed
-        queryset = super().get_queryset().filter(statusSewa__in=['Confirmed', 'Completed'])
-        return queryset.order_by('-tanggalPesan') # Pengurutan default
+        # Default Querset hanya Confirmed/Completed, dengan predikat yang sama
+        # seperti PDF/ekspor dan fakta pendapatan (lihat penyewaan_sukses)
+        queryset = penyewaan_sukses(super().get_queryset())
+        return queryset.select_related('idPelanggan').order_by('-tanggalPesan') # Pengurutan default
+
+    def get_revenue(self):
+        """(jumlah, total) sesuai filter tanggal, dari tabel fakta pendapatan harian."""
+        if not hasattr(self, '_revenue'):
+            filterset = self.filterset
+            if filterset.is_bound and not filterset.is_valid() and self.get_strict():
+                # FilterView strict: filter tidak valid menampilkan tabel kosong
+                self._revenue = (0, 0)
+            else:
+                self._revenue = filter_revenue(filterset)
+        return self._revenue
+
+    def get_row_count(self):
+        # Jumlah baris pasti langsung dari kumulatif harian, tanpa COUNT(*)
+        return self.get_revenue()[0], False
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        total_pendapatan_agg = self.object_list.aggregate(Sum('totalBayar'))
-        total_pendapatan = total_pendapatan_agg.get('totalBayar__sum', 0.00) or 0.00
-        context['total_pendapatan'] = total_pendapatan
+        context['total_pendapatan'] = self.get_revenue()[1]
         return context
 
 
@@ -252,6 +276,8 @@ class BarangReportView(AdminReportMixin, FilterView, SingleTableView):
     table_class = DetailBarangReportTable
     filterset_class = DetailBarangFilter
     report_title = "Laporan Status Barang Sewa"
+    # Index detail_status_sewa_idx / index FK idPenyewaan (+ rowid idDetailSewa)
+    cursor_ordering = ('idPenyewaan', 'idDetailSewa')
 
     def get_queryset(self):
         return super().get_queryset().select_related('idPenyewaan', 'idBarang').order_by('idPenyewaan')
@@ -266,170 +292,226 @@ class PelangganReportView(AdminReportMixin, SingleTableView):
 
 
 # =================================================================
-# FUNGSI PDF GENERATOR (REPORTLAB)
+# FUNGSI PDF GENERATOR (REPORTLAB) DAN EKSPOR
+# PDF/ekspor dibuat sebagai pekerjaan latar belakang (core/report_jobs.py)
 # =================================================================
 
-def generate_reportlab_pdf(request, filterset_class, model_class, table_class, title, is_keuangan=False):
-    """Fungsi pembantu untuk menghasilkan PDF menggunakan ReportLab."""
-    
-    # 1. Siapkan Response dan Document
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{title.replace(" ", "_")}.pdf"'
+def filter_revenue(filterset):
+    """
+    (jumlah, total) pendapatan untuk filter tanggal KeuanganFilter, dari
+    core/revenue.py (beberapa lompatan index, berapa pun panjang rentangnya).
+    Seperti FilterSet.qs, field filter yang tidak valid diabaikan.
+    """
+    filterset.is_valid()  # Mengisi cleaned_data
+    data = getattr(filterset.form, 'cleaned_data', {})
+    return revenue(data.get('tanggalPesan__gte'), data.get('tanggalPesan__lte'))
+
+
+class PelangganFilterSet:
+    """FilterSet kosong untuk Pelanggan (laporan pelanggan tidak memiliki filter kustom)."""
+    def __init__(self, *args, **kwargs):
+        self.qs = Pelanggan.objects.all()
+
+
+# Laporan yang bisa dibuat sebagai PDF/ekspor, per nama laporan (report_name):
+# (FilterSet, model, Table, judul, khusus keuangan)
+REPORTS = {
+    'report_penyewaan': (PenyewaanFilter, Penyewaan, PenyewaanReportTable, "Laporan Data Penyewaan", False),
+    'report_keuangan': (KeuanganFilter, Penyewaan, KeuanganReportTable, "Laporan Keuangan (Pendapatan)", True),
+    # Catatan: DetailSewa sudah menangani join ke Barang
+    'report_barang': (DetailBarangFilter, DetailSewa, DetailBarangReportTable, "Laporan Status Barang Sewa", False),
+    'report_pelanggan': (PelangganFilterSet, Pelanggan, PelangganReportTable, "Laporan Data Pelanggan", False),
+}
 
-    doc = SimpleDocTemplate(response, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    styles = getSampleStyleSheet()
-    Story = []
 
-    # 2. Ambil Data dan Filter
+def get_report_queryset(query, filterset_class, model_class, table_class, is_keuangan=False):
+    """
+    Queryset laporan yang sudah difilter (`query`, QueryDict GET halaman
+    laporan) dan diurutkan dengan aman, beserta parameter filter
+    ternormalisasi untuk cache hasil laporan.
+    """
     queryset = model_class.objects.all()
     
-    # Khusus untuk Keuangan, filter data sukses sejak awal
+    # Khusus untuk Keuangan, filter data sukses sejak awal (predikat yang sama
+    # dengan halaman laporannya, sehingga isi PDF/ekspor sama dengan halaman)
     if model_class == Penyewaan and is_keuangan:
-        queryset = queryset.filter(statusSewa__in=['Confirmed', 'Completed'])
+        queryset = penyewaan_sukses(queryset)
     
     # Inisialisasi FilterSet
-    f = filterset_class(request.GET, queryset=queryset)
-    
-    # Dapatkan field pengurutan yang aman (safe ordering field)
-    ordering_field = None
-    try:
-        ordering_field = getattr(table_class.Meta, 'order_by', None)
-        
-        if ordering_field is None:
-            ordering_field = table_class.Meta.fields[0]
-            
-    except (AttributeError, IndexError):
-        ordering_field = 'pk'
+    f = filterset_class(query, queryset=queryset)
     
     # Lakukan pengurutan dengan field yang aman
-    if ordering_field:
-        filtered_queryset = f.qs.order_by(ordering_field)
-    else:
-        filtered_queryset = f.qs.all()
-    
-    # 3. Judul
-    p_title = Paragraph(title, styles['Title'])
-    Story.append(p_title)
-    Story.append(Spacer(1, 0.25 * inch))
+    return f.qs.order_by(report_ordering(table_class)), filter_cache_params(f)
 
-    # 4. Data Tabel (Header dan Data)
-    table_instance = table_class(filtered_queryset)
-    
-    # Header Tabel (verbose_name dari Table Class)
-    header = [column.header for column in table_instance.columns]
-    data = [header]
-    
-    # Data Baris
-    for row in filtered_queryset: 
-        bound_row = BoundRow(row, table_instance)
-        
-        data_row = []
-        for column in table_instance.columns:
-            rendered_value = bound_row.get_cell(column.name)
-            data_row.append(str(rendered_value))
 
-        data.append(data_row)
-        
-    # 5. Buat dan Gaya Tabel
-    table = Table(data)
-    
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007bff')), # Header Biru
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige), # Baris data
-    ])
-    
-    table.setStyle(style)
-    Story.append(table)
-    Story.append(Spacer(1, 0.5 * inch))
-
-    # 6. Total Pendapatan (Khusus Keuangan)
+def write_report(report, fmt, query, fileobj, progress=None, use_cache=True):
+    """
+    Tulis laporan `report` (lihat REPORTS) dengan filter `query` sebagai PDF
+    atau ekspor `fmt` ke `fileobj` biner. Dipanggil oleh pekerjaan laporan
+    (core/report_jobs.py); `progress` menghitung baris yang sudah ditulis.
+    Baris dibaca per-chunk (values_list) dan PDF digambar per halaman,
+    sehingga memori tidak bertambah seiring jumlah data. Dengan `use_cache`
+    False cache hasil dan jumlah laporan tidak dibaca maupun diisi.
+    """
+    filterset_class, model_class, table_class, title, is_keuangan = REPORTS[report]
+
+    # 1. Ambil Data dan Filter (daftar pk dari cache hasil laporan jika
+    #    sudah dihitung untuk filter yang sama)
+    filtered_queryset, params = get_report_queryset(query, filterset_class, model_class, table_class, is_keuangan)
+    ids = report_result(report, filtered_queryset, params) if use_cache else None
+    columns = report_columns(table_class)
+    values = iter_values(filtered_queryset, columns, pks=ids)
+    if progress is not None:
+        if ids is not None:
+            total = len(ids)
+        elif use_cache:
+            total = exact_count(report, filtered_queryset, params)
+        else:
+            total = filtered_queryset.count()
+        values = progress.track(values, total)
+
+    if fmt != 'pdf':
+        write_export(fileobj, fmt, title, columns, values)
+        return
+
+    # 2. Total Pendapatan (Khusus Keuangan), dari tabel fakta pendapatan harian
+    footer_text = None
     if is_keuangan:
-        total_pendapatan_agg = filtered_queryset.aggregate(Sum('totalBayar'))
-        total_pendapatan = total_pendapatan_agg.get('totalBayar__sum', 0.00) or 0.00
+        total_pendapatan = filter_revenue(filterset_class(query))[1]
         
         # Format angka agar sesuai standar Indonesia (misal: 1.000.000,00)
         total_formatted = "Rp {:,.2f}".format(total_pendapatan).replace(",", "X").replace(".", ",").replace("X", ".")
         
-        total_text = f"<b>Total Pendapatan Terfilter:</b> {total_formatted}"
-        Story.append(Paragraph(total_text, styles['Normal']))
+        footer_text = f"<b>Total Pendapatan Terfilter:</b> {total_formatted}"
+
+    # 3. Gambar PDF per halaman
+    write_pdf(fileobj, title, columns, format_rows(columns, values), footer_text=footer_text)
+
+
+def enqueue_report_job(request, fmt):
+    """
+    Daftarkan PDF/ekspor laporan halaman ini sebagai pekerjaan latar belakang
+    (atau pakai ulang pekerjaan dengan filter yang sama), lalu arahkan ke
+    halaman pekerjaannya.
+    """
+    report = report_name(request)
+    filterset_class, model_class = REPORTS[report][:2]
+    query = request.GET.copy()
+    query.pop('format', None)
+    job = report_jobs.enqueue(
+        report, fmt, filter_cache_params(filterset_class(query)), query.urlencode(),
+        result_version(model_class), user=request.user,
+    )
+    return redirect('report_job', pk=job.pk)
 
 
-    # 7. Build Dokumen
-    doc.build(Story)
-    return response
+def generate_report_export(request):
+    """
+    Ekspor data mentah laporan (?format=csv|jsonl|xlsx) dengan FilterSet dan
+    parameter filter yang sama dengan halaman laporan.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt == 'xlsx' and not XLSX_AVAILABLE:
+        messages.error(request, 'Ekspor XLSX membutuhkan paket openpyxl. Silakan gunakan CSV.')
+        return redirect(request.resolver_match.url_name.replace('_export', ''))
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    return enqueue_report_job(request, fmt)
 
 # -----------------------------------------------------------------
-# PDF View Laporan Penyewaan
+# PDF View Laporan Penyewaan, Keuangan, Status Barang dan Pelanggan
 # -----------------------------------------------------------------
 @staff_member_required
 def PenyewaanPDFView(request):
-    return generate_reportlab_pdf(
-        request, 
-        PenyewaanFilter, 
-        Penyewaan, 
-        PenyewaanReportTable, 
-        "Laporan Data Penyewaan"
-    )
+    return enqueue_report_job(request, 'pdf')
 
-# -----------------------------------------------------------------
-# PDF View Laporan Keuangan
-# -----------------------------------------------------------------
 @staff_member_required
 def KeuanganPDFView(request):
-    return generate_reportlab_pdf(
-        request, 
-        KeuanganFilter, 
-        Penyewaan, 
-        KeuanganReportTable, 
-        "Laporan Keuangan (Pendapatan)",
-        is_keuangan=True
-    )
+    return enqueue_report_job(request, 'pdf')
+
+@staff_member_required
+def BarangPDFView(request):
+    return enqueue_report_job(request, 'pdf')
+
+@staff_member_required
+def PelangganPDFView(request):
+    return enqueue_report_job(request, 'pdf')
+
 
 # -----------------------------------------------------------------
-# PDF View Laporan Status Barang
+# Ekspor Data Mentah (CSV / JSON-lines / XLSX)
 # -----------------------------------------------------------------
 @staff_member_required
-def BarangPDFView(request):
-    # Catatan: DetailSewa sudah menangani join ke Barang
-    return generate_reportlab_pdf(
-        request, 
-        DetailBarangFilter, 
-        DetailSewa, 
-        DetailBarangReportTable, 
-        "Laporan Status Barang Sewa"
-    )
+def PenyewaanExportView(request):
+    return generate_report_export(request)
+
+@staff_member_required
+def KeuanganExportView(request):
+    return generate_report_export(request)
+
+@staff_member_required
+def BarangExportView(request):
+    return generate_report_export(request)
+
+@staff_member_required
+def PelangganExportView(request):
+    return generate_report_export(request)
+
 
 # -----------------------------------------------------------------
-# PDF View Laporan Pelanggan
+# Halaman Pekerjaan Laporan (progres dan unduhan)
 # -----------------------------------------------------------------
+def report_job_status(job):
+    """Status pekerjaan untuk halaman pekerjaan dan polling JSON-nya."""
+    return {
+        'status': job.status,
+        'progres': job.progres,
+        'barisSelesai': job.barisSelesai,
+        'barisTotal': job.barisTotal,
+        'pesan': job.pesanGalat,
+        'unduh': reverse('report_job_download', kwargs={'pk': job.pk}) if job.status == 'Selesai' else None,
+    }
+
+
 @staff_member_required
-def PelangganPDFView(request):
-    # Buat kelas filter kosong untuk Pelanggan jika tidak ada filter kustom
-    class DummyFilterSet:
-        def __init__(self, *args, **kwargs):
-             # Lakukan pengurutan default di sini atau biarkan Table.Meta.order_by menanganinya
-            self.qs = Pelanggan.objects.all()
-    
-    return generate_reportlab_pdf(
-        request, 
-        DummyFilterSet, 
-        Pelanggan, 
-        PelangganReportTable, 
-        "Laporan Data Pelanggan"
+def ReportJobView(request, pk):
+    job = get_object_or_404(PekerjaanLaporan, pk=pk)
+    context = {
+        'job': job,
+        'status': report_job_status(job),
+        'title': f'{REPORTS[job.laporan][3]} ({job.format.upper()})',
+        'report_url': f'{reverse(job.laporan)}?{job.parameter}',
+    }
+    return render(request, 'admin/report_job.html', context)
+
+
+@staff_member_required
+def ReportJobStatusView(request, pk):
+    return JsonResponse(report_job_status(get_object_or_404(PekerjaanLaporan, pk=pk)))
+
+
+@staff_member_required
+def ReportJobDownloadView(request, pk):
+    job = get_object_or_404(PekerjaanLaporan, pk=pk, status='Selesai')
+    try:
+        berkas = open(report_jobs.job_path(job), 'rb')
+    except FileNotFoundError:
+        raise Http404('Berkas laporan sudah dihapus karena melewati masa simpan.')
+    return FileResponse(
+        berkas,
+        as_attachment=True,
+        filename=f'{REPORTS[job.laporan][3].replace(" ", "_")}.{job.format}',
+        content_type=CONTENT_TYPES[job.format],
     )
+
 # =================================================================
 # CUSTOMER-FACING VIEWS
 # =================================================================
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db import transaction
+from django.http import Http404
+from asgiref.sync import sync_to_async
 from django.utils import timezone
 from datetime import datetime, date, timedelta
 from django.contrib.humanize.templatetags.humanize import intcomma
@@ -439,22 +521,45 @@ from django import forms
 from .models import Pelanggan, Barang, Penyewaan, DetailSewa
 from .forms import PelangganRegisterForm, PelangganLoginForm
 from .decorators import pelanggan_required
+from .middleware import get_pelanggan, aget_pelanggan, aload_session
+from .page_cache import anonymous_page_cache
+from .availability import aannotate_available, available_quantities, free_units, try_reserve
+from . import cart as cart_store
+from . import report_cache, write_lane
 
 
+@anonymous_page_cache
 def home_pelanggan(request):
     """Display home page with static content"""
     context = {}
     return render(request, 'pelanggan/home.html', context)
 
 
-def katalog_barang(request):
-    """Display catalog of available products"""
+@anonymous_page_cache
+async def katalog_barang(request):
+    """Display catalog of available products, optionally for a rental date range"""
+    await aload_session(request)
     barang_list = Barang.objects.filter(stok__gt=0).order_by('namaBarang')
     
+    # If the customer picked an event date, show availability for that window
+    jadwal = parse_jadwal_sewa(request.GET.get('tanggalAcara', ''), request.GET.get('durasiSewa', ''))
+    if jadwal:
+        request.session['jadwal_sewa'] = {
+            'tanggalAcara': request.GET['tanggalAcara'],
+            'durasiSewa': request.GET['durasiSewa'],
+        }
+        barang_list = [b for b in await aannotate_available(barang_list, *jadwal) if b.tersedia > 0]
+    else:
+        barang_list = [barang async for barang in barang_list]
+    
     context = {
         'barang_list': barang_list,
+        'jadwal': jadwal,
+        'jadwal_input': request.session.get('jadwal_sewa', {}),
     }
-    return render(request, 'pelanggan/barang.html', context)
+    # The foto_barang tag checks storage for each derivative (blocking I/O),
+    # so the template is rendered in a worker thread, not on the event loop
+    return await sync_to_async(render)(request, 'pelanggan/barang.html', context)
 
 
 def add_to_cart(request, pk):
@@ -474,31 +579,23 @@ def add_to_cart(request, pk):
                 messages.error(request, 'Jumlah barang harus lebih dari 0.')
                 return redirect('katalog_barang')
             
-            if quantity > barang.stok:
-                messages.error(request, f'Maaf, stok hanya tersedia {barang.stok} unit.')
-                return redirect('katalog_barang')
+            # Units free for the chosen rental window (or total owned units)
+            jadwal = get_jadwal_sewa(request)
+            tersedia = free_units(barang, *jadwal) if jadwal else barang.stok
             
-            # Get cart from session
-            cart = get_cart(request)
+            if quantity > tersedia:
+                messages.error(request, f'Maaf, stok hanya tersedia {tersedia} unit.')
+                return redirect('katalog_barang')
             
-            # Add or update item in cart
-            if str(pk) in cart:
-                # Check if total quantity would exceed stock
-                current_qty = cart[str(pk)]['quantity']
-                if current_qty + quantity > barang.stok:
-                    messages.error(request, f'Maaf, stok hanya tersedia {barang.stok} unit. Anda sudah memiliki {current_qty} unit di keranjang.')
-                    return redirect('katalog_barang')
-                cart[str(pk)]['quantity'] += quantity
-            else:
-                cart[str(pk)] = {
-                    'barang_id': pk,
-                    'quantity': quantity,
-                    'harga': float(barang.harga),
-                    'nama': barang.namaBarang,
-                }
+            # Add to the cart; the stock limit is checked in the same UPDATE,
+            # so two tabs adding at once cannot push the total past it
+            pelanggan_id = request.session['pelanggan_id']
+            cart_store.import_session_cart(request)
+            if not cart_store.add(pelanggan_id, pk, quantity, tersedia):
+                current_qty = cart_store.get_quantity(pelanggan_id, pk)
+                messages.error(request, f'Maaf, stok hanya tersedia {tersedia} unit. Anda sudah memiliki {current_qty} unit di keranjang.')
+                return redirect('katalog_barang')
             
-            # Save cart to session
-            save_cart(request, cart)
             messages.success(request, f'{barang.namaBarang} berhasil ditambahkan ke keranjang.')
             
         except ValueError:
@@ -509,67 +606,80 @@ def add_to_cart(request, pk):
     return redirect('katalog_barang')
 
 
+def parse_jadwal_sewa(tanggal_acara_str, durasi_sewa_str):
+    """Parse event date and duration into a (tanggalAcara, tanggalPembongkaran) window"""
+    try:
+        tanggal_acara = datetime.strptime(tanggal_acara_str, '%Y-%m-%d').date()
+        durasi_sewa = int(durasi_sewa_str)
+    except ValueError:
+        return None
+    if durasi_sewa <= 0:
+        return None
+    return tanggal_acara, tanggal_acara + timedelta(days=durasi_sewa)
+
+def get_jadwal_sewa(request):
+    """Get the rental window chosen in the catalog, if any"""
+    jadwal = request.session.get('jadwal_sewa')
+    if not jadwal:
+        return None
+    return parse_jadwal_sewa(jadwal['tanggalAcara'], jadwal['durasiSewa'])
+
 def get_cart(request):
-    """Get cart from session or initialize empty cart"""
-    cart = request.session.get('cart', {})
-    return cart
+    """Get the logged-in customer's cart as {barang_id: quantity}"""
+    pelanggan_id = request.session.get('pelanggan_id')
+    if not pelanggan_id:
+        return {}
+    cart_store.import_session_cart(request)
+    return cart_store.get_items(pelanggan_id)
 
-def save_cart(request, cart):
-    """Save cart to session"""
-    request.session['cart'] = cart
-    request.session.modified = True
+def get_cart_lines(request):
+    """Get cart items together with their Barang (one query)"""
+    pelanggan_id = request.session.get('pelanggan_id')
+    if not pelanggan_id:
+        return []
+    cart_store.import_session_cart(request)
+    return cart_store.get_lines(pelanggan_id)
+
+async def aget_cart_lines(request):
+    """Async version of get_cart_lines"""
+    await aload_session(request)
+    pelanggan_id = request.session.get('pelanggan_id')
+    if not pelanggan_id:
+        return []
+    if 'cart' in request.session:
+        await sync_to_async(cart_store.import_session_cart)(request)
+    return await cart_store.aget_lines(pelanggan_id)
 
 def get_cart_count(request):
     """Get total number of items in cart"""
-    cart = get_cart(request)
-    return sum(item['quantity'] for item in cart.values())
-
-def get_pelanggan(request):
-    """Get pelanggan from session"""
     pelanggan_id = request.session.get('pelanggan_id')
-    if pelanggan_id:
-        try:
-            return Pelanggan.objects.get(idPelanggan=pelanggan_id)
-        except Pelanggan.DoesNotExist:
-            return None
-    return None
+    return cart_store.total_quantity(pelanggan_id) if pelanggan_id else 0
 
-def view_cart(request):
+async def view_cart(request):
     """Display cart items"""
-    cart = get_cart(request)
-    
     # Prepare cart items with full barang objects and calculated subtotals
     cart_items = []
     total_amount = 0
     
-    for item_id, item_data in cart.items():
-        try:
-            barang = Barang.objects.get(idBarang=item_data['barang_id'])
-            subtotal = barang.harga * item_data['quantity']
-            total_amount += subtotal
-            
-            cart_items.append({
-                'barang': barang,
-                'quantity': item_data['quantity'],
-                'subtotal': subtotal,
-            })
-        except Barang.DoesNotExist:
-            # Remove invalid items from cart
-            del cart[item_id]
-            save_cart(request, cart)
+    for item in await aget_cart_lines(request):
+        subtotal = item.idBarang.harga * item.jumlah
+        total_amount += subtotal
+        
+        cart_items.append({
+            'barang': item.idBarang,
+            'quantity': item.jumlah,
+            'subtotal': subtotal,
+        })
     
     context = {
         'cart_items': cart_items,
         'total_amount': total_amount,
     }
-    return render(request, 'pelanggan/cart.html', context)
-
+    return await sync_to_async(render)(request, 'pelanggan/cart.html', context)
 
 @pelanggan_required
 def checkout(request):
     """Display checkout page with cart items and rental form"""
-    cart = get_cart(request)
-    
     # Get pelanggan from session
     pelanggan = get_pelanggan(request)
     
@@ -577,21 +687,15 @@ def checkout(request):
     cart_items = []
     total_daily_amount = 0
     
-    for item_id, item_data in cart.items():
-        try:
-            barang = Barang.objects.get(idBarang=item_data['barang_id'])
-            subtotal = barang.harga * item_data['quantity']
-            total_daily_amount += subtotal
-            
-            cart_items.append({
-                'barang': barang,
-                'quantity': item_data['quantity'],
-                'subtotal': subtotal,
-            })
-        except Barang.DoesNotExist:
-            # Remove invalid items from cart
-            del cart[item_id]
-            save_cart(request, cart)
+    for item in get_cart_lines(request):
+        subtotal = item.idBarang.harga * item.jumlah
+        total_daily_amount += subtotal
+        
+        cart_items.append({
+            'barang': item.idBarang,
+            'quantity': item.jumlah,
+            'subtotal': subtotal,
+        })
     
     context = {
         'cart_items': cart_items,
@@ -601,9 +705,73 @@ def checkout(request):
     }
     return render(request, 'pelanggan/checkout.html', context)
 
+class CheckoutRejected(Exception):
+    """The cart can no longer be rented as is; the message is shown to the customer."""
+
+
+def create_rental(pelanggan, alamat_pemasangan, tanggal_acara, durasi_sewa, tanggal_pembongkaran):
+    """
+    Turn the customer's cart into a Penyewaan with its DetailSewa rows and
+    reservations, then clear the cart. Must run inside a transaction (see
+    write_lane.run); raises CheckoutRejected when the cart is empty or an item
+    is gone or not available on the rental dates.
+    """
+    # Read the cart inside the transaction, so a double submit finds it already cleared
+    jumlah_per_barang = cart_store.get_items(pelanggan.pk)
+    if not jumlah_per_barang:
+        raise CheckoutRejected('Keranjang Anda kosong. Silakan tambahkan barang terlebih dahulu.')
+    
+    # Load every Barang in the cart with a single query (prices only, no locking)
+    barang_map = Barang.objects.in_bulk(list(jumlah_per_barang))
+    if len(barang_map) != len(jumlah_per_barang):
+        raise CheckoutRejected('Ada barang dalam keranjang yang tidak lagi tersedia. Silakan perbarui keranjang Anda.')
+    
+    # Reserve every item with one conditional UPDATE; there is no separate
+    # availability read, so two customers cannot both pass a check and oversell
+    kurang = try_reserve(jumlah_per_barang, tanggal_acara, tanggal_pembongkaran)
+    if kurang:
+        tersedia = available_quantities([barang_map[barang_id] for barang_id in kurang], tanggal_acara, tanggal_pembongkaran)
+        pesan = ' '.join(
+            f'Stok untuk {barang_map[barang_id].namaBarang} tidak mencukupi pada tanggal tersebut (tersedia {tersedia[barang_id]} unit).'
+            for barang_id in sorted(kurang)
+        )
+        # Raising rolls back the reservations that did succeed
+        raise CheckoutRejected(f'{pesan} Silakan perbarui keranjang Anda.')
+    
+    # Price every item in memory (daily rate x quantity), then x duration
+    detail_list = [
+        DetailSewa(
+            idBarang=barang_map[barang_id],
+            jumlahBarang=quantity,
+            subTotal=barang_map[barang_id].harga * quantity,
+            statusBarang='Baik',  # Default status
+        )
+        for barang_id, quantity in jumlah_per_barang.items()
+    ]
+    total_daily_amount = sum(detail.subTotal for detail in detail_list)
+    
+    # bulk_create bypasses DetailSewa.save(), so the daily usage stays as
+    # reserved above and is not counted twice.
+    penyewaan = Penyewaan.objects.create(
+        idPelanggan=pelanggan,
+        tanggalAcara=tanggal_acara,
+        durasiSewa=durasi_sewa,
+        alamatPemasangan=alamat_pemasangan,
+        tanggalPembongkaran=tanggal_pembongkaran,
+        statusSewa='Pending',  # Default status
+        totalBayar=total_daily_amount * durasi_sewa,  # Set calculated total
+    )
+    for detail in detail_list:
+        detail.idPenyewaan = penyewaan
+    DetailSewa.objects.bulk_create(detail_list)
+    # bulk_create sends no post_save, so report counts are invalidated here
+    report_cache.invalidate(DetailSewa)
+    # Clear cart
+    cart_store.clear(pelanggan.pk)
+    return penyewaan
+
 
 @pelanggan_required
-@transaction.atomic
 def process_checkout(request):
     """Process the rental form and create penyewaan and detailsewa records"""
     if request.method == 'POST':
@@ -650,61 +818,19 @@ def process_checkout(request):
             # Calculate tanggal_pembongkaran
             tanggal_pembongkaran = tanggal_acara + timedelta(days=durasi_sewa)
             
-            # Check if all items in cart are still available
-            for item_id, item_data in cart.items():
-                try:
-                    barang = Barang.objects.get(idBarang=item_data['barang_id'])
-                    if item_data['quantity'] > barang.stok:
-                        messages.error(request, f'Stok untuk {barang.namaBarang} tidak mencukupi. Silakan perbarui keranjang Anda.')
-                        return redirect('checkout')
-                except Barang.DoesNotExist:
-                    messages.error(request, 'Ada barang dalam keranjang yang tidak lagi tersedia. Silakan perbarui keranjang Anda.')
-                    return redirect('checkout')
-            
-            # Calculate total amount based on daily rate and duration
-            total_daily_amount = 0
-            for item_id, item_data in cart.items():
-                barang = Barang.objects.get(idBarang=item_data['barang_id'])
-                subtotal = barang.harga * item_data['quantity']
-                total_daily_amount += subtotal
-            
-            total_amount = total_daily_amount * durasi_sewa
-            
-            # Create Penyewaan
+            # Availability check and all inserts run as one unit in the write lane,
+            # so concurrent checkouts take turns instead of failing with a lock error
             try:
-                penyewaan = Penyewaan.objects.create(
-                    idPelanggan=pelanggan,
-                    tanggalAcara=tanggal_acara,
-                    durasiSewa=durasi_sewa,
-                    alamatPemasangan=alamat_pemasangan,
-                    tanggalPembongkaran=tanggal_pembongkaran,
-                    statusSewa='Pending',  # Default status
-                    totalBayar=total_amount,  # Set calculated total
+                penyewaan = write_lane.run(
+                    create_rental, pelanggan, alamat_pemasangan, tanggal_acara, durasi_sewa, tanggal_pembongkaran,
                 )
-            except Exception as e:
-                messages.error(request, f'Gagal membuat data penyewaan: {str(e)}')
+            except CheckoutRejected as e:
+                messages.error(request, str(e))
                 return redirect('checkout')
-            
-            # Create DetailSewa for each item in cart
-            try:
-                for item_id, item_data in cart.items():
-                    barang = Barang.objects.get(idBarang=item_data['barang_id'])
-                    detail_sewa = DetailSewa.objects.create(
-                        idPenyewaan=penyewaan,
-                        idBarang=barang,
-                        jumlahBarang=item_data['quantity'],
-                        subTotal=None,  # Will be calculated by DetailSewa.save()
-                        statusBarang='Baik',  # Default status
-                    )
             except Exception as e:
-                messages.error(request, f'Gagal menyimpan detail sewa: {str(e)}')
-                # If there's an error creating DetailSewa, we should delete the Penyewaan
-                penyewaan.delete()
+                messages.error(request, f'Gagal menyimpan data penyewaan: {str(e)}')
                 return redirect('checkout')
-            
-            # Clear cart
-            request.session['cart'] = {}
-            request.session.modified = True
+            total_amount = penyewaan.totalBayar
             
             # Success message
             messages.success(request, f'Sewa berhasil diajukan dengan ID #{penyewaan.idPenyewaan}. Total biaya: Rp {total_amount:,}. Silakan tunggu konfirmasi dari admin.')
@@ -717,60 +843,55 @@ def process_checkout(request):
     return redirect('checkout')
 
 @pelanggan_required
-def rental_history(request):
+async def rental_history(request):
     """Display rental history for logged in user"""
-    # Get pelanggan from session
-    pelanggan = get_pelanggan(request)
+    # Get pelanggan from request (already loaded by pelanggan_required)
+    pelanggan = await aget_pelanggan(request)
     # Get all penyewaan for this pelanggan
-    penyewaan_list = Penyewaan.objects.filter(idPelanggan=pelanggan).order_by('-tanggalPesan')
+    penyewaan_list = [
+        penyewaan async for penyewaan in
+        Penyewaan.objects.filter(idPelanggan=pelanggan).order_by('-tanggalPesan')
+    ]
     
     context = {
         'penyewaan_list': penyewaan_list,
     }
-    return render(request, 'pelanggan/rental_history.html', context)
+    return await sync_to_async(render)(request, 'pelanggan/rental_history.html', context)
 
 @pelanggan_required
-def rental_detail(request, pk):
+async def rental_detail(request, pk):
     """Display rental detail for a specific penyewaan"""
-    # Check if user is authenticated
-    if 'pelanggan_id' not in request.session:
-        messages.error(request, 'Anda harus login terlebih dahulu.')
-        return redirect('login_pelanggan')
-    
-    # Get pelanggan from session
-    pelanggan = get_pelanggan(request)
-    if not pelanggan:
-        messages.error(request, 'Data pelanggan tidak ditemukan.')
-        return redirect('login_pelanggan')
+    # Get pelanggan from request (already validated by pelanggan_required)
+    pelanggan = await aget_pelanggan(request)
     
-    # Get penyewaan that belongs to this pelanggan
-    penyewaan = get_object_or_404(Penyewaan, idPenyewaan=pk, idPelanggan=pelanggan)
-    detail_sewa_list = DetailSewa.objects.filter(idPenyewaan=penyewaan)
+    # Get penyewaan that belongs to this pelanggan; the template reads the
+    # related rows, so they are joined up front instead of loaded lazily
+    try:
+        penyewaan = await Penyewaan.objects.select_related('idPelanggan').aget(idPenyewaan=pk, idPelanggan=pelanggan)
+    except Penyewaan.DoesNotExist:
+        raise Http404('Penyewaan tidak ditemukan.')
+    detail_sewa_list = [
+        detail async for detail in
+        DetailSewa.objects.filter(idPenyewaan=penyewaan).select_related('idBarang')
+    ]
     
     context = {
         'penyewaan': penyewaan,
         'detail_sewa_list': detail_sewa_list,
     }
-    return render(request, 'pelanggan/rental_detail.html', context)
+    return await sync_to_async(render)(request, 'pelanggan/rental_detail.html', context)
 
 
-def akun_pelanggan(request):
+@pelanggan_required
+async def akun_pelanggan(request):
     """Display customer account profile"""
-    # Check if user is authenticated
-    if 'pelanggan_id' not in request.session:
-        messages.error(request, 'Anda harus login terlebih dahulu.')
-        return redirect('login_pelanggan')
-    
-    # Get pelanggan from session
-    pelanggan = get_pelanggan(request)
-    if not pelanggan:
-        messages.error(request, 'Data pelanggan tidak ditemukan.')
-        return redirect('login_pelanggan')
+    # Get pelanggan from request (already validated by pelanggan_required)
+    pelanggan = await aget_pelanggan(request)
     
     context = {
         'pelanggan': pelanggan,
     }
-    return render(request, 'pelanggan/akun.html', context)
+    return await sync_to_async(render)(request, 'pelanggan/akun.html', context)
 
 
 @pelanggan_required
@@ -778,20 +899,19 @@ def update_cart(request, pk):
     """Update item quantity in cart"""
     if request.method == 'POST':
         try:
-            # Get cart from session
-            cart = get_cart(request)
-            
-            # Check if item exists in cart
-            if str(pk) not in cart:
-                messages.error(request, 'Item tidak ditemukan di keranjang.')
-                return redirect('view_cart')
+            pelanggan_id = request.session['pelanggan_id']
+            cart_store.import_session_cart(request)
             
             # Get action and current item
             action = request.POST.get('action')
             quantity_str = request.POST.get('quantity')
-            item = cart[str(pk)]
             barang = get_object_or_404(Barang, idBarang=pk)
             
+            # Same limit as add_to_cart: units free for the chosen rental window
+            # (or total owned units when no dates are chosen yet)
+            jadwal = get_jadwal_sewa(request)
+            tersedia = free_units(barang, *jadwal) if jadwal else barang.stok
+            
             # Handle manual quantity input
             if quantity_str is not None:
                 try:
@@ -799,35 +919,33 @@ def update_cart(request, pk):
                     if new_quantity < 1:
                         messages.error(request, 'Jumlah barang minimal 1.')
                         return redirect('view_cart')
-                    elif new_quantity > barang.stok:
-                        messages.error(request, f'Stok {barang.namaBarang} hanya tersedia {barang.stok} unit.')
+                    elif new_quantity > tersedia:
+                        messages.error(request, f'Stok {barang.namaBarang} hanya tersedia {tersedia} unit.')
                         return redirect('view_cart')
-                    else:
-                        cart[str(pk)]['quantity'] = new_quantity
+                    elif cart_store.set_quantity(pelanggan_id, pk, new_quantity):
                         messages.success(request, f'Jumlah {barang.namaBarang} berhasil diubah menjadi {new_quantity}.')
+                    else:
+                        messages.error(request, 'Item tidak ditemukan di keranjang.')
                 except ValueError:
                     messages.error(request, 'Jumlah barang tidak valid.')
                     return redirect('view_cart')
-            # Handle increment/decrement actions
-            elif action:
-                current_quantity = item['quantity']
-                if action == 'increase':
-                    if current_quantity < barang.stok:
-                        cart[str(pk)]['quantity'] += 1
-                        messages.success(request, f'Jumlah {barang.namaBarang} berhasil ditambah.')
-                    else:
-                        messages.error(request, f'Stok {barang.namaBarang} hanya tersedia {barang.stok} unit.')
-                elif action == 'decrease':
-                    if current_quantity > 1:
-                        cart[str(pk)]['quantity'] -= 1
-                        messages.success(request, f'Jumlah {barang.namaBarang} berhasil dikurangi.')
-                    else:
-                        # If quantity is 1, remove the item
-                        del cart[str(pk)]
-                        messages.success(request, f'{barang.namaBarang} berhasil dihapus dari keranjang.')
-            
-            # Save updated cart
-            save_cart(request, cart)
+            # Handle increment/decrement actions (each is a single conditional UPDATE/DELETE)
+            elif action == 'increase':
+                if cart_store.increment(pelanggan_id, pk, tersedia):
+                    messages.success(request, f'Jumlah {barang.namaBarang} berhasil ditambah.')
+                elif cart_store.get_quantity(pelanggan_id, pk):
+                    messages.error(request, f'Stok {barang.namaBarang} hanya tersedia {tersedia} unit.')
+                else:
+                    messages.error(request, 'Item tidak ditemukan di keranjang.')
+            elif action == 'decrease':
+                hasil = cart_store.decrement(pelanggan_id, pk)
+                if hasil == 'dikurangi':
+                    messages.success(request, f'Jumlah {barang.namaBarang} berhasil dikurangi.')
+                elif hasil == 'dihapus':
+                    # If quantity was 1, the item is removed
+                    messages.success(request, f'{barang.namaBarang} berhasil dihapus dari keranjang.')
+                else:
+                    messages.error(request, 'Item tidak ditemukan di keranjang.')
             
         except Exception as e:
             messages.error(request, 'Terjadi kesalahan saat memperbarui keranjang.')
@@ -839,14 +957,9 @@ def remove_from_cart(request, pk):
     """Remove item from cart"""
     if request.method == 'POST':
         try:
-            # Get cart from session
-            cart = get_cart(request)
-            
-            # Check if item exists in cart
-            if str(pk) in cart:
-                barang = get_object_or_404(Barang, idBarang=pk)
-                del cart[str(pk)]
-                save_cart(request, cart)
+            cart_store.import_session_cart(request)
+            barang = get_object_or_404(Barang, idBarang=pk)
+            if cart_store.remove(request.session['pelanggan_id'], pk):
                 messages.success(request, f'{barang.namaBarang} berhasil dihapus dari keranjang.')
             else:
                 messages.error(request, 'Item tidak ditemukan di keranjang.')
@@ -873,27 +986,20 @@ def register_pelanggan(request):
 
 def login_pelanggan(request):
     if request.method == 'POST':
-        form = PelangganLoginForm(request.POST)
+        # The form authenticates once (PelangganAuthBackend) and keeps the result
+        form = PelangganLoginForm(request, data=request.POST)
         if form.is_valid():
-            noHp = form.cleaned_data['noHp']
-            password = form.cleaned_data['password']
+            pelanggan = form.get_user()
             
-            # Use Django's authenticate function with our custom backend
-            from django.contrib.auth import authenticate, login
-            pelanggan = authenticate(request, noHp=noHp, password=password)
-            
-            if pelanggan is not None:
-                # Store pelanggan in session
-                request.session['pelanggan_id'] = pelanggan.idPelanggan
-                messages.success(request, 'Login berhasil!')
-                return redirect('home_pelanggan')
-            else:
-                messages.error(request, 'Nomor HP atau password salah.')
+            # Store pelanggan in session
+            request.session['pelanggan_id'] = pelanggan.idPelanggan
+            messages.success(request, 'Login berhasil!')
+            return redirect('home_pelanggan')
         else:
             # Form is not valid, errors will be displayed in template
             pass
     else:
-        form = PelangganLoginForm()
+        form = PelangganLoginForm(request)
     
     context = {
         'form': form,
@@ -0,0 +1,85 @@
+# core/write_lane.py
+"""
+Jalur tulis berurutan untuk SQLite.
+
+SQLite hanya mengizinkan satu penulis dalam satu waktu. Transaksi Django
+dimulai dengan BEGIN biasa (deferred), sehingga dua transaksi yang sama-sama
+membaca lalu menulis bisa gagal seketika dengan "database is locked": yang
+kalah tidak dapat menaikkan lock-nya selama snapshot bacaannya sudah basi,
+dan busy_timeout tidak membantu untuk kasus ini.
+
+`run()` menjalankan satu unit tulis (checkout, simpan di admin) di bawah lock
+proses, sehingga thread dalam proses yang sama menulis bergantian dan tidak
+saling membuat lock error. Antar proses (beberapa worker) tabrakan masih
+mungkin; unit tulis itu diulang dengan backoff eksponensial + jitter. Karena
+transaksi yang gagal sudah di-rollback, pengulangan membaca data terbaru.
+
+Setting:
+
+    WRITE_LANE_RETRIES      jumlah pengulangan setelah percobaan pertama (default 5)
+    WRITE_LANE_BACKOFF      jeda awal dalam detik, dua kali lipat tiap ulang (default 0.05)
+    WRITE_LANE_TIMEOUT      batas menunggu giliran menulis dalam detik (default 10)
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+# RLock: unit tulis yang memanggil unit tulis lain tidak mengunci dirinya sendiri
+_lock = threading.RLock()
+
+BACKOFF_MAKS = 2.0
+
+
+def _setting(nama, default):
+    return getattr(settings, nama, default)
+
+
+def is_lock_error(exc):
+    """True untuk OperationalError SQLite akibat database/tabel sedang dikunci."""
+    pesan = str(exc).lower()
+    return isinstance(exc, OperationalError) and ('locked' in pesan or 'busy' in pesan)
+
+
+@contextmanager
+def serialized():
+    """Tahan giliran menulis proses ini selama blok berjalan."""
+    if not _lock.acquire(timeout=_setting('WRITE_LANE_TIMEOUT', 10)):
+        raise OperationalError('database is locked (menunggu giliran jalur tulis terlalu lama)')
+    try:
+        yield
+    finally:
+        _lock.release()
+
+
+def run(func, *args, atomic=True, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Jalankan `func(*args, **kwargs)` di jalur tulis dan kembalikan hasilnya.
+
+    Dengan atomic=True fungsi dibungkus transaction.atomic(); pakai
+    atomic=False jika fungsi membuka transaksinya sendiri (mis. view admin).
+    Lock error diulang hingga WRITE_LANE_RETRIES kali, kecuali bila sudah
+    berada di dalam transaksi luar, karena transaksi itu tidak bisa diulang
+    dari sini.
+    """
+    percobaan_maks = _setting('WRITE_LANE_RETRIES', 5)
+    jeda = _setting('WRITE_LANE_BACKOFF', 0.05)
+    bisa_ulang = not connections[using].in_atomic_block
+
+    percobaan = 0
+    while True:
+        try:
+            with serialized():
+                if atomic:
+                    with transaction.atomic(using=using):
+                        return func(*args, **kwargs)
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            if not (bisa_ulang and is_lock_error(exc)) or percobaan >= percobaan_maks:
+                raise
+        # Jeda di luar lock agar penulis lain bisa menyelesaikan transaksinya
+        time.sleep(random.uniform(0, min(BACKOFF_MAKS, jeda * 2 ** percobaan)))
+        percobaan += 1